@@ -1,41 +1,288 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file, session
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file, session, url_for
 import os
 import json
-import shutil
+import hashlib
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import FileStorage
 import time
+import shutil
+import tempfile
 from flask_cors import CORS
 from urllib.parse import unquote
-import zipfile
-import io
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import asset_store
+import chunked_upload
+import jobs
+import logs
+import metrics
+import scene_archive
+import scene_catalog
+import scene_store
+import mesh_utils
+import tasks
+import textures
+import thumbnail
+import deviation
+import zip_stream
+from original_index import OriginalImageIndex
+
+logs.setup()
+log = logs.get('app')
 
 app = Flask(__name__)
-print("Flask app created")
 app.secret_key = 'your-secret-key-here'
 CORS(app)
 
-# 配置文件保存路径
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-SCENES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenes')
-ORIGINAL_IMAGES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'original_images')
+# 配置文件保存路径；数据目录默认为程序所在目录，可用环境变量 DATA_DIR 指定（如基准测试使用临时目录）
+DATA_FOLDER = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+UPLOAD_FOLDER = os.path.join(DATA_FOLDER, 'uploads')
+SCENES_FOLDER = os.path.join(DATA_FOLDER, 'scenes')
+ORIGINAL_IMAGES_FOLDER = os.path.join(DATA_FOLDER, 'original_images')
+BLOBS_FOLDER = os.path.join(DATA_FOLDER, 'blobs')
+INDEX_DATABASE = os.path.join(DATA_FOLDER, 'index.db')
+JOBS_DATABASE = os.path.join(DATA_FOLDER, 'jobs.db')
+# 分块上传的暂存目录放在 blobs 下，完成后可直接 rename 进存储
+CHUNKED_FOLDER = os.path.join(BLOBS_FOLDER, 'chunked')
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['SCENES_FOLDER'] = SCENES_FOLDER
 app.config['ORIGINAL_IMAGES_FOLDER'] = ORIGINAL_IMAGES_FOLDER
+app.config['BLOBS_FOLDER'] = BLOBS_FOLDER
+app.config['INDEX_DATABASE'] = INDEX_DATABASE
+app.config['JOBS_DATABASE'] = JOBS_DATABASE
+# 后台任务进程数，默认等于 CPU 核数
+app.config['JOB_WORKERS'] = os.cpu_count()
+app.config['CHUNKED_FOLDER'] = CHUNKED_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+# 批量上传一次包含多组模型，单独放宽请求大小限制
+app.config['BATCH_MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024
+# 场景压缩包导入：请求大小上限，以及每个压缩包解压后的总大小上限（按条目头中记录的大小检查，防止压缩炸弹）
+app.config['IMPORT_MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024 * 1024
+app.config['IMPORT_MAX_EXTRACTED_BYTES'] = 8 * 1024 * 1024 * 1024
+# 场景存储后端：files（scenes 目录中的 JSON 文件）或 sqlite（index.db），
+# 切换前用 python scene_store.py migrate <源> <目标> 迁移已有场景
+app.config['SCENE_STORE'] = os.environ.get('SCENE_STORE', 'files')
+# 保存场景时等待网格统计后台任务的最长时间（秒），超时的模型 stats 记为 null，之后读取场景或列表时补上
+app.config['SAVE_STATS_TIMEOUT'] = 2
+# 请求带 ?profile=1 时用 cProfile 记录本次请求，报告写入 profiles/；仅在调试模式或设置 PROFILE_REQUESTS=1 时启用
+app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS') == '1'
+app.config['PROFILES_FOLDER'] = os.path.join(DATA_FOLDER, 'profiles')
 
 # 确保必要的文件夹存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(SCENES_FOLDER, exist_ok=True)
 os.makedirs(ORIGINAL_IMAGES_FOLDER, exist_ok=True)
+os.makedirs(BLOBS_FOLDER, exist_ok=True)
+os.makedirs(CHUNKED_FOLDER, exist_ok=True)
+
+# 原图索引，首次启动时从 original_images 目录建立
+original_index = OriginalImageIndex(INDEX_DATABASE, ORIGINAL_IMAGES_FOLDER)
+# 场景存储，所有场景接口都通过它读写场景和原图归属
+store = scene_store.open_store(app.config['SCENE_STORE'], SCENES_FOLDER, original_index)
 
 # 允许的文件类型
 ALLOWED_EXTENSIONS = {'obj', 'mtl', 'jpg', 'jpeg', 'png'}
 
+# 场景 JSON（scene_store.encode 的输出）中保存时尚未生成的网格统计
+PENDING_STATS = b'"stats": null'
+
+# 带内容哈希（?v=<sha256>）的上传 URL 内容不会变化，允许浏览器长期缓存
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# 派生资源（二进制网格、缩略图、偏差）由后台任务生成，尚未完成时返回 202，建议客户端重新请求的间隔（秒）
+JOB_RETRY_AFTER = 1
+
+# 上传后的网格处理作为后台任务在进程池中执行，上传请求立即返回；任务记录在 jobs.db 中，重启后继续
+job_queue = jobs.JobQueue(JOBS_DATABASE, {
+    'mesh': 'tasks:build_mesh',
+    'precompress': 'tasks:precompress',
+    'stats': 'tasks:compute_stats',
+    'thumbnail': 'tasks:render_scene_thumbnail',
+    'model-thumbnail': 'tasks:render_model_thumbnail',
+    'deviation': 'tasks:compute_deviation',
+    'textures': 'tasks:build_texture_variants',
+}, max_workers=app.config['JOB_WORKERS'])
+
+# 建立应用时启动任务队列，恢复上次退出时未完成的任务。以 python app.py 运行时在 __main__ 中启动：
+# spawn 的工作进程会以 __mp_main__ 的名称重新执行主模块，debug 重载器的父进程也会执行主模块，二者都不应恢复任务
+if __name__ not in ('__main__', '__mp_main__'):
+    job_queue.start()
+
+# 文本格式的网格资源，保存时生成 gzip/brotli 预压缩副本
+PRECOMPRESS_EXTENSIONS = {'obj', 'mtl'}
+
+# 批量上传时各组模型并行写入；分配文件夹名时加锁，避免同一秒内的组撞名
+batch_executor = ThreadPoolExecutor(max_workers=4)
+batch_folder_lock = threading.Lock()
+# 导入场景时分配场景名到写入场景数据之间加锁，同名压缩包同时导入也不会互相覆盖
+import_scene_lock = threading.Lock()
+# 补充网格统计时先读后写场景，同一时间只允许一个请求写回
+stats_backfill_lock = threading.Lock()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def file_extension(filename):
+    # 小写的扩展名（不含点），没有时返回 ''；secure_filename 会去掉非 ASCII 字符，'模型.obj' 保存为没有扩展名的 'obj'
+    return os.path.splitext(filename)[1][1:].lower()
+
+def resolve_upload_path(url_path):
+    # 把场景数据中的 /uploads/<时间戳>/<文件名> 解析为存储中的实际文件
+    rel_path = url_path.lstrip('/')
+    if rel_path.startswith('uploads/'):
+        return asset_store.resolve(app.config['UPLOAD_FOLDER'], rel_path[len('uploads/'):],
+                                   app.config['BLOBS_FOLDER'])
+    path = os.path.join(app.root_path, rel_path)
+    return path if os.path.exists(path) else None
+
+# 场景目录索引（与原图索引共用 index.db），首次启动时从场景存储建立
+catalog = scene_catalog.SceneCatalog(INDEX_DATABASE, store, resolve_upload_path, original_index)
+
+def store_upload(stream, filename, filepath):
+    # 边接收边写入存储；OBJ 文件同时检查材质声明，缺少时在 mtllib 行之后插入
+    blobs_folder = app.config['BLOBS_FOLDER']
+    if not filename.lower().endswith('.obj'):
+        return asset_store.save_stream(stream, blobs_folder, filepath)
+    
+    tmp_file, tmp_path = asset_store.new_temp_file(blobs_folder)
+    try:
+        with tmp_file:
+            writer = asset_store.HashingWriter(tmp_file)
+            normalizer = mesh_utils.normalize_obj(stream, writer)
+        digest = writer.hexdigest()
+        if normalizer.needs_rewrite:
+            normalizer.rewrite(tmp_path)
+            digest = None
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    if normalizer.inserted:
+        log.info('已添加材质声明', file=filename)
+    return asset_store.commit_blob(tmp_path, blobs_folder, filepath, digest)
+
+def send_asset(path, etag, immutable=False, **kwargs):
+    # 以内容哈希作为强 ETag 发送文件，支持 If-None-Match/If-Modified-Since（304）和 Range（206）
+    # immutable 为 False 时浏览器每次都需要用 ETag 重新验证
+    response = send_file(path, etag=etag, conditional=True,
+                         max_age=IMMUTABLE_MAX_AGE if immutable else None, **kwargs)
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def content_addressed(digest):
+    # 上传路径可能被重新链接到新内容（重新上传同名文件、去重），只按路径访问时每次用 ETag 重新验证；
+    # URL 带 ?v=<内容 sha256> 且与当前内容一致时，URL 与内容一一对应，才标记为 immutable
+    return request.args.get('v') == digest
+
+def schedule_precompress(blob, digest):
+    # 同一内容只排队一次（任务按内容哈希去重），返回任务ID
+    return job_queue.submit('precompress', digest, blob, app.config['BLOBS_FOLDER'], digest)
+
+def schedule_mesh_levels(blob, digest):
+    return job_queue.submit('mesh', digest, blob, app.config['BLOBS_FOLDER'], digest)
+
+def schedule_mesh_stats(blob, digest):
+    return job_queue.submit('stats', digest, blob, app.config['BLOBS_FOLDER'], digest)
+
+def schedule_texture_variants(blob, digest):
+    return job_queue.submit('textures', digest, blob, app.config['BLOBS_FOLDER'], digest)
+
+def schedule_missing(kind, schedule, blob, digest):
+    # 供 GET 请求使用：先只读查询，只有还没有 (kind, digest) 任务时才提交；
+    # 已排队、运行中、已完成或已失败的任务都不在每次访问时再写数据库（失败任务不会因为反复访问被重试）
+    if job_queue.find(kind, digest) is None:
+        schedule(blob, digest)
+
+def job_response(kind, key, *args, failed_status=500):
+    # 派生资源尚未生成时的响应，不在请求线程中解析或渲染：找到或安排 (kind, key) 后台任务，
+    # 返回 202 和任务ID，客户端在 Retry-After 秒后重新请求或通过 /jobs/<id> 轮询；
+    # 任务已失败（或已完成却没有生成结果）时返回 failed_status，不在每次访问时重试
+    job = job_queue.find(kind, key)
+    if job is None:
+        job = job_queue.get(job_queue.submit(kind, key, *args))
+    if job['status'] in (jobs.FAILED, jobs.DONE):
+        return jsonify({'error': job['error'] or '后台任务没有生成结果', 'job': job['id']}), failed_status
+    response = jsonify({'status': job['status'], 'job': job['id']})
+    response.headers['Retry-After'] = str(JOB_RETRY_AFTER)
+    return response, 202
+
+def thumbnail_model(model):
+    # 模型缩略图的渲染参数 [OBJ 路径, OBJ 哈希, MTL 路径, 贴图路径, 缓存键]，OBJ 不存在时返回 None
+    # 未给出 MTL/贴图时按 OBJ 中的 mtllib 和 MTL 中的 map_Kd 在 OBJ 所在的上传目录中查找
+    obj_url = model.get('objFile')
+    obj_path = resolve_upload_path(obj_url) if obj_url else None
+    if obj_path is None:
+        return None
+    folder_url = obj_url.rsplit('/', 1)[0]
+    mtl_url = model.get('mtlFile')
+    if not mtl_url:
+        name = thumbnail.mtllib_name(obj_path)
+        mtl_url = f'{folder_url}/{secure_filename(name)}' if name else None
+    mtl_path = resolve_upload_path(mtl_url) if mtl_url else None
+    texture_url = model.get('textureFile')
+    if not texture_url and mtl_path:
+        _, name = thumbnail.read_material(mtl_path)
+        texture_url = f'{folder_url}/{secure_filename(name)}' if name else None
+    texture_path = resolve_upload_path(texture_url) if texture_url else None
+    digests = [asset_store.cached_digest(path) if path else None for path in (obj_path, mtl_path, texture_path)]
+    return [obj_path, digests[0], mtl_path, texture_path, thumbnail.model_key(*digests)]
+
+def scene_thumbnail_models(scene_data):
+    # 场景缩略图的渲染参数和缓存键；键只由模型内容决定，重命名场景后仍然有效
+    models = []
+    for model in scene_data.get('models', []):
+        if isinstance(model, dict):
+            entry = thumbnail_model(model)
+            if entry is not None:
+                models.append(entry)
+    models = models[:thumbnail.SCENE_MAX_MODELS]
+    return models, thumbnail.scene_key([model[4] for model in models])
+
+def schedule_scene_thumbnail(scene_data):
+    models, key = scene_thumbnail_models(scene_data)
+    return job_queue.submit('thumbnail', key, models, app.config['BLOBS_FOLDER'], key)
+
+def model_stats(obj_url, deadline):
+    # 场景中某个 OBJ 的网格统计，由上传后的后台任务生成，不在请求中解析模型文件；
+    # 任务尚未完成时最多等到 deadline（time.monotonic()），仍未生成时返回 None
+    path = resolve_upload_path(obj_url)
+    if path is None:
+        return None
+    try:
+        digest = asset_store.cached_digest(path)
+        stats = tasks.read_stats(app.config['BLOBS_FOLDER'], digest)
+        if stats is None:
+            job_id = schedule_mesh_stats(path, digest)
+            while time.monotonic() < deadline:
+                job = job_queue.get(job_id)
+                if job is None or job['status'] in (jobs.DONE, jobs.FAILED):
+                    break
+                time.sleep(0.05)
+            stats = tasks.read_stats(app.config['BLOBS_FOLDER'], digest)
+        return stats
+    except Exception as e:
+        log.error('网格统计错误', obj=obj_url, error=str(e))
+        return None
+
+def backfill_stats(filename):
+    # 保存时统计任务尚未完成的模型（stats 为 null），读取场景时用后台任务生成的统计补上，
+    # 写回场景和索引；仍未生成时再次安排任务。返回补齐后的场景数据，没有补上任何统计时返回 None
+    with stats_backfill_lock:
+        scene_data = store.load(filename)
+        filled = False
+        for model in scene_data.get('models', []):
+            if isinstance(model, dict) and model.get('objFile') and 'stats' in model and model['stats'] is None:
+                model['stats'] = model_stats(model['objFile'], time.monotonic())
+                filled = filled or model['stats'] is not None
+        if not filled:
+            return None
+        store.put_document(filename, scene_store.encode(scene_data))
+    catalog.put(filename, scene_data)
+    log.info('已补充网格统计', scene=filename)
+    return scene_data
+
 # 主页路由
 @app.route('/')
 def index():
@@ -52,47 +299,39 @@ def save_scene():
         # 生成格式化的场景文件名: YY-MM-DD_HH-mm-ss
         timestamp = time.strftime("%y-%m-%d_%H-%M-%S", time.localtime())
         filename = f'scene-{timestamp}.json'
-        scene_name = f'scene-{timestamp}'
-        
-        # 遍历所有临时原图文件,重命名并记录到场景数据中
-        original_images = []
-        for file in os.listdir(app.config['ORIGINAL_IMAGES_FOLDER']):
-            if file.startswith('temp_'):
-                match = re.search(r'temp_\d+_model_(\d+)_', file)
-                if match:
-                    model_index = int(match.group(1))
-                    new_filename = file.replace(file[:file.find('_model_')], scene_name)
-                    old_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], file)
-                    new_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], new_filename)
-                    os.rename(old_path, new_path)
-                    original_images.append({
-                        'model_index': model_index,
-                        'filename': new_filename
-                    })
         
-        # 将原图信息添加到场景数据中
-        scene_data['original_images'] = original_images
+        # 记录每个模型的网格统计，读取场景时不需要再打开模型文件；所有模型共用一个等待时限，
+        # 大模型的统计任务尚未完成时记为 null，不阻塞保存
+        deadline = time.monotonic() + app.config['SAVE_STATS_TIMEOUT']
+        for model in scene_data.get('models', []):
+            if isinstance(model, dict) and model.get('objFile'):
+                model['stats'] = model_stats(model['objFile'], deadline)
         
-        # 保存场景数据
-        filepath = os.path.join(app.config['SCENES_FOLDER'], filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(scene_data, f, ensure_ascii=False)
+        # 保存场景数据，所有临时原图移到场景名下并记录到场景数据中
+        store.save(filename, scene_data, original_index.temp_scenes())
+        catalog.put(filename, scene_data)
+        # 缩略图在后台渲染，GET /scenes/<filename>/thumbnail 获取
+        job_id = schedule_scene_thumbnail(scene_data)
         
-        return jsonify({'success': True, 'filename': filename})
+        return jsonify({'success': True, 'filename': filename, 'jobs': {'thumbnail': job_id}})
     except Exception as e:
-        print(f"保存场景错误: {str(e)}")
+        log.error('保存场景错误', error=str(e))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/scenes/<filename>', methods=['GET'])
 def get_scene(filename):
     try:
-        filepath = os.path.join(app.config['SCENES_FOLDER'], filename)
-        if not os.path.exists(filepath):
-            return jsonify({'error': '场景不存在'}), 404
-            
-        with open(filepath, 'r', encoding='utf-8') as f:
-            scene_data = json.load(f)
-        return jsonify(scene_data)
+        # 直接返回保存的 JSON，不再解析后重新序列化
+        data, digest, modified = store.document(filename)
+        if PENDING_STATS in data and backfill_stats(filename) is not None:
+            data, digest, modified = store.document(filename)
+        response = Response(data, mimetype='application/json')
+        response.set_etag(digest)
+        response.last_modified = modified
+        response.cache_control.no_cache = True
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    except scene_store.SceneNotFound:
+        return jsonify({'error': '场景不存在'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -102,142 +341,717 @@ def delete_scene(filename):
         # URL解码文件名，处理中文和特殊字符
         decoded_filename = unquote(filename)
         
-        filepath = os.path.join(app.config['SCENES_FOLDER'], decoded_filename)
-        print(f"尝试删除文件: {filepath}")  # 调试日志
+        log.debug('尝试删除场景', scene=decoded_filename)
         
-        # 即使文件不存在也返回成功
-        if not os.path.exists(filepath):
-            print(f"文件不存在: {filepath}")  # 调试日志
-            return jsonify({'success': True})  # 修改这里，总是返回成功
-            
+        # 即使场景不存在也返回成功
         try:
-            # 删除场景文件
-            os.remove(filepath)
-            print(f"成功删除文件: {filepath}")  # 调试日志
+            # 删除场景
+            if store.delete(decoded_filename):
+                log.info('删除场景', scene=decoded_filename)
+            else:
+                log.debug('场景不存在', scene=decoded_filename)
+            catalog.delete(decoded_filename)
             return jsonify({'success': True})
         except Exception as e:
-            print(f"删除文件失败: {filepath}, 错误: {str(e)}")  # 调试日志
+            log.error('删除场景失败', scene=decoded_filename, error=str(e))
             return jsonify({'success': True})  # 即使删除失败也返回成功
             
     except Exception as e:
-        print(f"删除场景错误: {str(e)}")  # 调试日志
+        log.error('删除场景错误', error=str(e))
         return jsonify({'success': True})  # 所有情况都返回成功
 
 @app.route('/list-scenes', methods=['GET'])
 def list_scenes():
     try:
-        scenes = []
-        for filename in sorted(os.listdir(app.config['SCENES_FOLDER']), reverse=True):
-            if filename.endswith('.json'):
-                scenes.append({'filename': filename})
-        return jsonify(scenes)
+        # 从场景索引查询，不扫描 scenes 目录
+        # ?sort=name|created|modified|models|size&order=asc|desc&prefix=&limit=&cursor=
+        # 不带 limit 时返回全部场景；?stats=1 时附带各场景中模型的网格统计
+        sort = request.args.get('sort', 'name')
+        if sort not in scene_catalog.SORT_COLUMNS:
+            return jsonify({'error': f'不支持的排序字段: {sort}'}), 400
+        order = request.args.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': f'不支持的排序方向: {order}'}), 400
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = min(max(limit, 1), scene_catalog.MAX_LIMIT)
+
+        # 索引的版本号在每次修改时递增，未变化时直接返回 304
+        etag = hashlib.sha1(f'{catalog.version()}|'.encode('utf-8') + request.query_string).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            scenes, next_cursor = catalog.page(sort, order == 'desc', request.args.get('prefix'),
+                                               request.args.get('cursor'), limit,
+                                               request.args.get('stats') == '1')
+            if request.args.get('stats') == '1':
+                for scene in scenes:
+                    if any(model['stats'] is None and model['objFile'] for model in scene['models']):
+                        scene_data = backfill_stats(scene['filename'])
+                        if scene_data is not None:
+                            scene['models'] = scene_catalog.model_summary(scene_data)
+            response = jsonify(scenes)
+            if next_cursor:
+                # 保持响应体为数组，下一页游标放在响应头中
+                args = request.args.to_dict()
+                args['cursor'] = next_cursor
+                response.headers['X-Next-Cursor'] = next_cursor
+                response.headers['Link'] = f'<{url_for("list_scenes", **args)}>; rel="next"'
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except scene_catalog.CursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def save_uploaded_file(original_filename, store):
+    # 按上传规则保存一个文件：时间戳文件夹、写入存储、安排后台处理，返回响应数据
+    # store(filename, filepath) 负责写入内容并返回内容哈希
+    # 获取或创建新的时间戳文件夹名
+    timestamp = session.get('current_upload_timestamp')
+    if not timestamp:
+        current_time = time.localtime()
+        timestamp = time.strftime("%y-%m-%d_%H-%M-%S", current_time)
+        session['current_upload_timestamp'] = timestamp
+        log.debug('创建新的时间戳', timestamp=timestamp)
+    else:
+        log.debug('使用现有时间戳', timestamp=timestamp)
+    
+    folder_path = os.path.join(app.config['UPLOAD_FOLDER'], timestamp)
+    os.makedirs(folder_path, exist_ok=True)
+    
+    filename = secure_filename(original_filename)
+    filepath = os.path.join(folder_path, filename)
+    
+    digest = store(filename, filepath)
+    
+    size = os.path.getsize(filepath)
+    metrics.UPLOAD_BYTES.observe(size, (file_extension(filename),))
+    log.info('文件保存成功', path=filepath, bytes=size)
+    
+    result = finish_upload(timestamp, filename, digest)
+    
+    # 只在上传完整组文件后清除session
+    if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+        session.pop('current_upload_timestamp', None)
+        log.debug('上传完成，清除时间戳')
+    
+    return result
+
+def finish_upload(folder_name, filename, digest):
+    # 文件已保存到 uploads/<folder_name>/<filename>：安排后台处理并生成响应数据
+    result = {
+        'success': True, 
+        'filename': filename,
+        'filepath': f'/uploads/{folder_name}/{filename}',
+        'hash': digest
+    }
+    
+    blob = asset_store.blob_path(app.config['BLOBS_FOLDER'], digest)
+    job_ids = {}
+    
+    # 文本资源在后台生成预压缩副本
+    if file_extension(filename) in PRECOMPRESS_EXTENSIONS:
+        job_ids['precompress'] = schedule_precompress(blob, digest)
+    
+    # OBJ 文件在后台生成二进制网格和各级 LOD
+    if filename.lower().endswith('.obj'):
+        job_ids['mesh'] = schedule_mesh_levels(blob, digest)
+        job_ids['stats'] = schedule_mesh_stats(blob, digest)
+        mesh_url = f'/uploads/mesh/{folder_name}/{filename}'
+        result['mesh'] = mesh_url
+        result['lods'] = [{'level': level, 'url': f'{mesh_url}?lod={level}'}
+                          for level in mesh_utils.LOD_LEVELS]
+    
+    # 贴图在后台生成缩小的各级副本和 WebP 副本（需要 Pillow）
+    if file_extension(filename) in textures.TEXTURE_EXTENSIONS and textures.available():
+        job_ids['textures'] = schedule_texture_variants(blob, digest)
+    
+    if job_ids:
+        result['jobs'] = job_ids
+    return result
+
+def store_upload_file(path, filename, filepath):
+    # 把磁盘上已拼好的文件收入存储；非 OBJ 文件直接移动，不再复制
+    if filename.lower().endswith('.obj'):
+        with open(path, 'rb') as f:
+            return store_upload(f, filename, filepath)
+    return asset_store.commit_blob(path, app.config['BLOBS_FOLDER'], filepath)
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     try:
-        print("接收到上传请求")
-        print("请求文件:", request.files)
-        
         if 'file' not in request.files:
-            print("没有文件在请求中")
+            log.debug('没有文件在请求中')
             return jsonify({'error': '没有文件'}), 400
             
         file = request.files['file']
-        print(f"文件名: {file.filename}")
+        log.debug('接收到上传请求', file=file.filename)
         
         if file.filename == '':
             return jsonify({'error': '没有选择文件'}), 400
             
         if file and allowed_file(file.filename):
-            # 获取或创建新的时间戳文件夹名
-            timestamp = session.get('current_upload_timestamp')
-            if not timestamp:
-                current_time = time.localtime()
-                timestamp = time.strftime("%y-%m-%d_%H-%M-%S", current_time)
-                session['current_upload_timestamp'] = timestamp
-                print(f"创建新的时间戳: {timestamp}")
-            else:
-                print(f"使用现有时间戳: {timestamp}")
-            
-            folder_path = os.path.join(app.config['UPLOAD_FOLDER'], timestamp)
-            os.makedirs(folder_path, exist_ok=True)
-            
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(folder_path, filename)
+            result = save_uploaded_file(
+                file.filename,
+                lambda filename, filepath: store_upload(file.stream, filename, filepath))
             
-            # 如果是OBJ文件，检查并添加材质声明
-            if filename.lower().endswith('.obj'):
-                # 先保存文件
-                file.save(filepath)
-                
-                # 读取文件内容
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检查是否包含材质声明
-                if 'usemtl material_0' not in content:
-                    print(f"OBJ文件缺少材质声明，正在添加: {filename}")
-                    
-                    # 在文件开头添加材质声明（在mtllib行之后）
-                    lines = content.split('\n')
-                    insert_index = 0
-                    
-                    # 找到mtllib行的位置
-                    for i, line in enumerate(lines):
-                        if line.startswith('mtllib'):
-                            insert_index = i + 1
-                            break
-                    
-                    # 插入材质声明
-                    lines.insert(insert_index, 'usemtl material_0')
-                    
-                    # 保存修改后的文件
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(lines))
-                    
-                    print(f"已添加材质声明到文件: {filename}")
-            else:
-                # 非OBJ文件直接保存
-                file.save(filepath)
-            
-            print(f"文件保存成功: {filepath}")
-            
-            # 只在上传完整组文件后清除session
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                session.pop('current_upload_timestamp', None)
-                print("上传完成，清除时间戳")
-            
-            return jsonify({
-                'success': True, 
-                'filename': filename,
-                'filepath': f'/uploads/{timestamp}/{filename}'
-            })
+            return jsonify(result)
         
         return jsonify({'error': '不支持的文件类型'}), 400
     except Exception as e:
-        print(f"上传处理错误: {str(e)}")
+        log.error('上传处理错误', error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+def chunk_error_response(e):
+    status = 404 if isinstance(e, chunked_upload.UploadNotFound) else 400
+    return jsonify({'error': str(e)}), status
+
+@app.route('/upload/chunked', methods=['POST'])
+def create_chunked_upload():
+    # 大文件分块上传：先登记文件名和大小，再按偏移并行 PUT 各分块，最后调用 complete
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename', '')
+        if not filename or not allowed_file(filename):
+            return jsonify({'error': '不支持的文件类型'}), 400
+        try:
+            size = int(data.get('size'))
+            chunk_size = int(data.get('chunkSize') or chunked_upload.CHUNK_SIZE)
+        except (TypeError, ValueError):
+            return jsonify({'error': '缺少文件大小'}), 400
+        upload_id, meta = chunked_upload.create(app.config['CHUNKED_FOLDER'], filename, size,
+                                                chunk_size, data.get('sha256'))
+        log.info('创建分块上传', upload=upload_id, file=filename, bytes=size)
+        return jsonify({
+            'success': True,
+            'uploadId': upload_id,
+            'chunkSize': meta['chunk_size'],
+            'chunkCount': meta['chunk_count']
+        })
+    except chunked_upload.ChunkError as e:
+        return chunk_error_response(e)
+    except Exception as e:
+        log.error('创建分块上传错误', error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    try:
+        offset = request.args.get('offset', '')
+        if not offset.isdigit():
+            return jsonify({'error': '缺少分块偏移'}), 400
+        index = chunked_upload.write_chunk(app.config['CHUNKED_FOLDER'], upload_id, int(offset),
+                                           request.stream, request.headers.get('X-Chunk-SHA256'))
+        return jsonify({'success': True, 'chunk': index})
+    except chunked_upload.ChunkError as e:
+        return chunk_error_response(e)
+    except Exception as e:
+        log.error('分块上传错误', upload=upload_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/<upload_id>', methods=['GET'])
+def chunked_upload_progress(upload_id):
+    # 断点续传时查询已收到的分块
+    try:
+        return jsonify(chunked_upload.progress(app.config['CHUNKED_FOLDER'], upload_id))
+    except chunked_upload.ChunkError as e:
+        return chunk_error_response(e)
+
+@app.route('/upload/chunked/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    # 分块齐全后按普通上传的规则保存（时间戳文件夹、OBJ 材质修正、后台处理）
+    folder = app.config['CHUNKED_FOLDER']
+    try:
+        meta, path = chunked_upload.check_complete(folder, upload_id)
+        result = save_uploaded_file(
+            meta['filename'],
+            lambda filename, filepath: store_upload_file(path, filename, filepath))
+        chunked_upload.remove(folder, upload_id)
+        log.info('分块上传完成', upload=upload_id)
+        return jsonify(result)
+    except chunked_upload.ChunkError as e:
+        return chunk_error_response(e)
+    except Exception as e:
+        log.error('分块上传完成错误', upload=upload_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/<upload_id>', methods=['DELETE'])
+def abort_chunked_upload(upload_id):
+    try:
+        chunked_upload.remove(app.config['CHUNKED_FOLDER'], upload_id)
+        return jsonify({'success': True})
+    except chunked_upload.ChunkError as e:
+        return chunk_error_response(e)
+
+def save_upload_group(files):
+    # 一组模型文件先写入临时目录，全部成功后整体 rename 为时间戳文件夹，失败时不留下半成品
+    upload_folder = app.config['UPLOAD_FOLDER']
+    tmp_dir = tempfile.mkdtemp(prefix='.batch-', dir=upload_folder)
+    try:
+        saved = []
+        for file in files:
+            filename = secure_filename(file.filename)
+            digest = store_upload(file.stream, filename, os.path.join(tmp_dir, filename))
+            saved.append((filename, digest))
+        with batch_folder_lock:
+            folder_name = time.strftime("%y-%m-%d_%H-%M-%S", time.localtime())
+            suffix = 1
+            while os.path.exists(os.path.join(upload_folder, folder_name)):
+                suffix += 1
+                folder_name = f"{time.strftime('%y-%m-%d_%H-%M-%S', time.localtime())}_{suffix}"
+            with metrics.fs_timer('rename'):
+                os.rename(tmp_dir, os.path.join(upload_folder, folder_name))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    log.info('模型组保存成功', folder=folder_name, files=len(saved))
+    return folder_name, [finish_upload(folder_name, filename, digest) for filename, digest in saved]
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    # 一次请求上传多组模型：同一表单字段名下的文件（OBJ + MTL + 贴图）为一组，各组保存到独立的文件夹
+    try:
+        # 按请求放宽大小限制（Flask 3.1 起支持），需在读取表单之前设置
+        request.max_content_length = app.config['BATCH_MAX_CONTENT_LENGTH']
+        groups = [(name, files) for name, files in request.files.lists()
+                  if any(file.filename for file in files)]
+        if not groups:
+            return jsonify({'error': '没有文件'}), 400
+        for name, files in groups:
+            for file in files:
+                if not allowed_file(file.filename):
+                    return jsonify({'error': f'不支持的文件类型: {file.filename}'}), 400
+        log.debug('接收到批量上传请求', groups=len(groups))
+        
+        futures = [(name, batch_executor.submit(save_upload_group, files)) for name, files in groups]
+        results = []
+        for name, future in futures:
+            try:
+                folder_name, files = future.result()
+                results.append({'group': name, 'success': True, 'folder': folder_name, 'files': files})
+            except Exception as e:
+                log.error('模型组保存失败', group=name, error=str(e))
+                results.append({'group': name, 'success': False, 'error': str(e)})
+        
+        success = all(result['success'] for result in results)
+        return jsonify({'success': success, 'groups': results}), 200 if success else 500
+    except Exception as e:
+        log.error('批量上传错误', error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+def spool_request_body():
+    # 请求体直接为 ZIP 时按块写入临时文件（ZIP 需要从末尾的中央目录读起，不能边收边解压），内存占用与文件大小无关
+    spool = tempfile.TemporaryFile(dir=app.config['BLOBS_FOLDER'])
+    try:
+        for chunk in iter(lambda: request.stream.read(zip_stream.CHUNK_SIZE), b''):
+            spool.write(chunk)
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+    return spool
+
+def import_archived_model(zf, model):
+    # 一个 模型N/ 文件夹中的 OBJ/MTL/贴图按批量上传的规则保存为一个时间戳文件夹（OBJ 同样做材质声明修正），
+    # 条目逐块解压写入存储；各模型在 batch_executor 中并行处理，ZipFile 支持多线程同时读取不同条目
+    streams = [zf.open(info) for _, info in model['files']]
+    try:
+        folder_name, files = save_upload_group(
+            [FileStorage(stream, filename=name) for stream, (name, _) in zip(streams, model['files'])])
+    finally:
+        for stream in streams:
+            stream.close()
+    # 按压缩包中的文件名区分类型：secure_filename 去掉中文后保存的文件名可能没有扩展名
+    urls = {}
+    for (name, _), result in zip(model['files'], files):
+        extension = file_extension(name)
+        key = 'objFile' if extension == 'obj' else 'mtlFile' if extension == 'mtl' else 'textureFile'
+        urls.setdefault(key, result['filepath'])
+    return folder_name, files, urls
+
+def unique_scene_filename(name):
+    # 沿用压缩包中的场景名，已被占用（或不能作为文件名）时加 _2、_3 后缀或使用新的时间戳名称
+    name = name.replace('\\', '_').strip()
+    if name in ('', '.', '..'):
+        name = f'scene-{time.strftime("%y-%m-%d_%H-%M-%S", time.localtime())}'
+    filename, suffix = f'{name}.json', 1
+    while store.exists(filename) or original_index.list_scene(scene_store.scene_name(filename)):
+        suffix += 1
+        filename = f'{name}_{suffix}.json'
+    return filename
+
+def import_archived_scene(zf, scene):
+    # 导入压缩包中的一个场景：并行解压各模型，再在一步中登记原图、写入场景数据和目录索引，返回响应数据
+    document = scene_archive.read_document(zf, scene['document']) if scene['document'] else None
+    numbers = sorted(scene['models'])
+    futures = {number: batch_executor.submit(import_archived_model, zf, scene['models'][number])
+               for number in numbers if scene['models'][number]['files']}
+    imported = {number: future.result() for number, future in futures.items()}
+    # 网格统计与保存场景相同：全部解压完成后在同一时限内等待后台任务，未完成的记为 null
+    deadline = time.monotonic() + app.config['SAVE_STATS_TIMEOUT']
+
+    # 有 scene.json 时第 N 个模型对应其中 models 的第 N 项，保留摆放等属性、替换文件路径；
+    # 其余模型（没有 scene.json，或超出其中的模型数）按文件夹顺序追加在后面，使用默认摆放
+    scene_data = dict(document) if document else {}
+    scene_data.pop('original_images', None)
+    models = scene_data.get('models')
+    models = [dict(model) if isinstance(model, dict) else {} for model in models] if isinstance(models, list) else []
+    indexes = {}
+    for number in numbers:
+        if number - 1 < len(models):
+            index = number - 1
+        else:
+            index = len(models)
+            models.append({'position': {'x': 0, 'y': 0, 'z': 0}, 'rotation': {'x': 0, 'y': 0, 'z': 0},
+                           'scale': {'x': 1, 'y': 1, 'z': 1}})
+        indexes[number] = index
+        if number in imported:
+            _, _, urls = imported[number]
+            for key in ('objFile', 'mtlFile', 'textureFile', 'stats'):
+                models[index].pop(key, None)
+            models[index].update(urls)
+            if 'objFile' in urls:
+                models[index]['stats'] = model_stats(urls['objFile'], deadline)
+    scene_data['models'] = models
+
+    with import_scene_lock:
+        filename = unique_scene_filename(scene['name'])
+        name = scene_store.scene_name(filename)
+        originals = []
+        try:
+            for number in numbers:
+                original = scene['models'][number]['original']
+                if original:
+                    original_name, info = original
+                    with zf.open(info) as stream:
+                        saved = original_index.save(name, indexes[number], secure_filename(original_name),
+                                                    FileStorage(stream))
+                    originals.append({'model_index': indexes[number], 'filename': saved})
+            scene_data['original_images'] = originals
+            store.put_document(filename, scene_store.encode(scene_data))
+        except Exception:
+            for image in originals:
+                original_index.delete(name, image['model_index'])
+            raise
+    catalog.put(filename, scene_data)
+    job_id = schedule_scene_thumbnail(scene_data)
+    log.info('导入场景', scene=filename, models=len(imported), originals=len(originals))
+    return {
+        'scene': scene['name'],
+        'success': True,
+        'filename': filename,
+        'models': [{'model': number, 'folder': imported[number][0], 'files': imported[number][1]}
+                   for number in numbers if number in imported],
+        'originalImages': len(originals),
+        'skipped': scene['skipped'],
+        'jobs': {'thumbnail': job_id},
+    }
+
+@app.route('/import-scenes', methods=['POST'])
+def import_scenes():
+    # 导入 /scenes/<filename>/download 导出的场景压缩包：multipart 表单中的任意多个 ZIP，
+    # 或请求体直接为一个 ZIP（Content-Type: application/zip，?name= 为没有顶层文件夹时的场景名）
+    archives = []
+    try:
+        # 与批量上传相同，按请求放宽大小限制（Flask 3.1 起支持），需在读取请求体之前设置
+        request.max_content_length = app.config['IMPORT_MAX_CONTENT_LENGTH']
+        if request.mimetype in ('application/zip', 'application/x-zip-compressed', 'application/octet-stream'):
+            archives.append((request.args.get('name', ''), spool_request_body()))
+        else:
+            archives += [(os.path.splitext(file.filename or '')[0], file.stream)
+                         for _, file in request.files.items(multi=True)]
+        if not archives:
+            return jsonify({'error': '没有文件'}), 400
+
+        # 先读取全部压缩包的目录，任一无效时整个请求返回 400，不导入任何场景
+        plans = []
+        for default_name, stream in archives:
+            zf = scene_archive.open_archive(stream)
+            plans.append((zf, scene_archive.read_scenes(zf, default_name, allowed_file,
+                                                        app.config['IMPORT_MAX_EXTRACTED_BYTES'])))
+
+        results = []
+        for zf, scenes in plans:
+            for scene in scenes:
+                try:
+                    results.append(import_archived_scene(zf, scene))
+                except Exception as e:
+                    log.error('导入场景失败', scene=scene['name'], error=str(e))
+                    results.append({'scene': scene['name'], 'success': False, 'error': str(e)})
+
+        success = all(result['success'] for result in results)
+        return jsonify({'success': success, 'scenes': results}), 200 if success else 500
+    except scene_archive.ArchiveError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        log.error('导入场景错误', error=str(e))
         return jsonify({'error': str(e)}), 500
+    finally:
+        for _, stream in archives:
+            stream.close()
 
 @app.route('/uploads/<path:filepath>')
 def uploaded_file(filepath):
     try:
-        # 从路径中分离文件夹和文件
-        folder = os.path.dirname(filepath)
+        # 通过资源存储解析实际文件（硬链接或引用文件）
+        path = asset_store.resolve(app.config['UPLOAD_FOLDER'], filepath, app.config['BLOBS_FOLDER'])
+        if path is None:
+            return jsonify({'error': '文件不存在'}), 404
+        digest = asset_store.cached_digest(path)
         filename = os.path.basename(filepath)
-        return send_from_directory(os.path.join(app.config['UPLOAD_FOLDER'], folder), filename)
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if extension in textures.TEXTURE_EXTENSIONS and ('size' in request.args or 'format' in request.args):
+            return send_texture_variant(path, digest, filename)
+        if extension not in PRECOMPRESS_EXTENSIONS:
+            return send_asset(path, digest, immutable=content_addressed(digest), download_name=filename)
+        
+        # 文本资源按 Accept-Encoding 返回预压缩副本，不在请求中压缩；副本还没生成时先返回原文件
+        variant = asset_store.compressed_variant(app.config['BLOBS_FOLDER'], digest, request.accept_encodings)
+        if variant:
+            encoding, variant_path = variant
+            response = send_asset(variant_path, f'{digest}-{encoding}', immutable=content_addressed(digest),
+                                  download_name=filename)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            if not asset_store.has_compressed(app.config['BLOBS_FOLDER'], digest):
+                schedule_missing('precompress', schedule_precompress, path, digest)
+            response = send_asset(path, digest, immutable=content_addressed(digest), download_name=filename)
+        response.vary.add('Accept-Encoding')
+        return response
     except Exception as e:
-        print(f"文件访问错误: {str(e)}")
+        log.error('文件访问错误', path=filepath, error=str(e))
         return jsonify({'error': str(e)}), 404
 
+def send_texture_variant(path, digest, filename):
+    # 按 ?size=<长边像素>&format=original|webp|auto 返回后台生成的贴图副本，不在请求中编码
+    # 副本尚未生成时安排后台任务并返回原图；此时即使带 ?v= 也不标记 immutable，生成后浏览器能取到副本
+    size = request.args.get('size', type=int)
+    fmt = request.args.get('format', 'original')
+    if (size is not None and size <= 0) or fmt not in textures.FORMATS:
+        return jsonify({'error': '参数无效'}), 400
+    negotiated = fmt == 'auto'
+    if negotiated:
+        fmt = 'webp' if any(value == 'image/webp' for value, _ in request.accept_mimetypes) else 'original'
+
+    manifest = textures.read_manifest(textures.manifest_path(app.config['BLOBS_FOLDER'], digest))
+    if manifest is None:
+        if textures.available():
+            schedule_missing('textures', schedule_texture_variants, path, digest)
+        response = send_asset(path, digest, download_name=filename)
+    else:
+        choice = textures.select_variant(manifest, size, fmt)
+        if choice is None:
+            response = send_asset(path, digest, immutable=content_addressed(digest), download_name=filename)
+        else:
+            level, variant_format = choice
+            name = filename.rsplit('.', 1)[0] + '.webp' if variant_format == 'webp' else filename
+            response = send_asset(textures.variant_path(app.config['BLOBS_FOLDER'], digest, level, variant_format),
+                                  f'{digest}-{level or "full"}-{variant_format}', immutable=content_addressed(digest),
+                                  mimetype=textures.mimetype(variant_format), download_name=name)
+    if negotiated:
+        response.vary.add('Accept')
+    return response
+
+@app.route('/uploads/mesh/<path:filepath>')
+def uploaded_mesh(filepath):
+    # 返回 OBJ 的二进制网格（格式见 mesh_utils），?lod=50/10/2 返回简化后的层级，按源文件哈希缓存
+    # 后台任务尚未完成时返回 202；转换失败（如多材质模型）时返回 422，前端收到非 200 响应时改用 OBJLoader 加载原文件
+    try:
+        if not filepath.lower().endswith('.obj'):
+            return jsonify({'error': '只支持OBJ文件'}), 400
+        lod = request.args.get('lod', type=int)
+        if lod is not None and lod not in mesh_utils.LOD_LEVELS:
+            return jsonify({'error': '不支持的LOD层级'}), 400
+        path = asset_store.resolve(app.config['UPLOAD_FOLDER'], filepath, app.config['BLOBS_FOLDER'])
+        if path is None:
+            return jsonify({'error': '文件不存在'}), 404
+        digest = asset_store.cached_digest(path)
+        mesh_path, lod_paths = tasks.mesh_level_paths(app.config['BLOBS_FOLDER'], digest)
+        target = lod_paths[lod] if lod else mesh_path
+        if not os.path.exists(target):
+            return job_response('mesh', digest, path, app.config['BLOBS_FOLDER'], digest, failed_status=422)
+        etag = f'{digest}-lod{lod}' if lod else digest
+        return send_asset(target, etag, immutable=content_addressed(digest), mimetype='application/octet-stream')
+    except Exception as e:
+        log.error('网格转换错误', path=filepath, error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/uploads/thumbnail/<path:filepath>')
+def uploaded_thumbnail(filepath):
+    # 返回 OBJ 的 2x2 多视角缩略图（PNG），尚未生成时安排后台渲染并返回 202
+    # 同一上传目录中的 MTL、贴图变化时缓存键随之变化，因此不标记为 immutable
+    try:
+        if not filepath.lower().endswith('.obj'):
+            return jsonify({'error': '只支持OBJ文件'}), 400
+        model = thumbnail_model({'objFile': f'/uploads/{filepath}'})
+        if model is None:
+            return jsonify({'error': '文件不存在'}), 404
+        path = tasks.thumbnail_path(app.config['BLOBS_FOLDER'], model[4], thumbnail.MODEL_SUFFIX)
+        if not os.path.exists(path):
+            return job_response('model-thumbnail', model[4], *model[:4], app.config['BLOBS_FOLDER'], model[4])
+        return send_asset(path, model[4], mimetype='image/png')
+    except Exception as e:
+        log.error('缩略图渲染错误', error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/scenes/<path:filename>/thumbnail')
+def scene_thumbnail(filename):
+    # 场景中各模型斜视图的拼图（PNG），保存场景时已安排后台渲染，尚未完成时返回 202
+    try:
+        try:
+            scene_data = store.load(unquote(filename))
+        except scene_store.SceneNotFound:
+            return jsonify({'error': '场景不存在'}), 404
+        models, key = scene_thumbnail_models(scene_data)
+        path = tasks.thumbnail_path(app.config['BLOBS_FOLDER'], key, thumbnail.SCENE_SUFFIX)
+        if not os.path.exists(path):
+            return job_response('thumbnail', key, models, app.config['BLOBS_FOLDER'], key)
+        return send_asset(path, key, mimetype='image/png')
+    except Exception as e:
+        log.error('缩略图渲染错误', error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/scenes/<path:filename>/deviation')
+def scene_deviation(filename):
+    # 比较场景中两个模型（a、b 为 models 中的下标）的网格偏差，坐标为 OBJ 原始坐标，不含场景中的变换
+    # 默认返回两个方向的统计和直方图；format=f32&side=a|b 返回该方向逐顶点距离的二进制数组
+    # 结果尚未计算时安排后台任务并返回 202，客户端通过 /jobs/<id> 轮询后重新请求
+    try:
+        try:
+            scene_data = store.load(unquote(filename))
+        except scene_store.SceneNotFound:
+            return jsonify({'error': '场景不存在'}), 404
+        scene_models = scene_data.get('models', [])
+        indices = (request.args.get('a', 0, type=int), request.args.get('b', 1, type=int))
+        if any(index < 0 or index >= len(scene_models) for index in indices) or indices[0] == indices[1]:
+            return jsonify({'error': '模型下标无效'}), 400
+        bins = request.args.get('bins', deviation.DEFAULT_BINS, type=int)
+        if not 1 <= bins <= deviation.MAX_BINS:
+            return jsonify({'error': f'bins 必须在 1~{deviation.MAX_BINS} 之间'}), 400
+        output = request.args.get('format', 'json')
+        side = request.args.get('side', 'a')
+        if output not in ('json', 'f32') or side not in ('a', 'b'):
+            return jsonify({'error': '参数无效'}), 400
+
+        models = []
+        for index in indices:
+            model = scene_models[index]
+            obj_url = model.get('objFile') if isinstance(model, dict) else None
+            path = resolve_upload_path(obj_url) if obj_url else None
+            if path is None:
+                return jsonify({'error': f'模型 {index} 的OBJ文件不存在'}), 404
+            models.append((obj_url, path, asset_store.cached_digest(path)))
+        (url_a, path_a, digest_a), (url_b, path_b, digest_b) = models
+        keys = {'a': deviation.pair_key(digest_a, digest_b), 'b': deviation.pair_key(digest_b, digest_a)}
+        paths = {name: tasks.deviation_paths(app.config['BLOBS_FOLDER'], key) for name, key in keys.items()}
+
+        if not all(os.path.exists(summary_path) for _, summary_path in paths.values()):
+            # 同一对内容只排队一次（与 a、b 的先后无关）
+            job_key = ':'.join(sorted((digest_a, digest_b)))
+            return job_response('deviation', job_key, path_a, digest_a, path_b, digest_b, app.config['BLOBS_FOLDER'])
+
+        if output == 'f32':
+            distance_path, summary_path = paths[side]
+            response = send_asset(distance_path, keys[side], mimetype='application/octet-stream')
+            response.headers['X-Vertex-Count'] = str(deviation.read_summary(summary_path)['vertices'])
+            return response
+
+        result = {}
+        for name, obj_url in (('a', url_a), ('b', url_b)):
+            distance_path, summary_path = paths[name]
+            summary = deviation.read_summary(summary_path)
+            summary['objFile'] = obj_url
+            summary['histogram'] = deviation.histogram(deviation.read_distances(distance_path), bins)
+            result[name] = summary
+        maxima = [result[name]['max'] for name in ('a', 'b') if result[name]['max'] is not None]
+        result['hausdorff'] = max(maxima) if maxima else None
+        return jsonify(result)
+    except Exception as e:
+        log.error('网格偏差计算错误', scene=filename, error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    # 查询后台任务的状态和进度（progress 为 0~1）
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(job)
+
+@app.route('/jobs')
+def list_jobs():
+    status = request.args.get('status')
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    return jsonify(job_queue.list(status, limit))
+
+@app.before_request
+def start_request_metrics():
+    environ = request.environ
+    environ['metrics.start'] = time.perf_counter()
+    if (app.config['PROFILE_REQUESTS'] or app.debug) and request.args.get('profile') == '1':
+        environ['metrics.profiler'] = metrics.start_profile()
+
+@app.after_request
+def record_request_metrics(response):
+    # 按路由模板记录耗时和收发字节数；在响应发送完毕（close）时记录，流式响应（ZIP 下载）也包含发送时间。
+    # 热路径上每个请求只增加几微秒：直接读 environ 和响应体，不经过会解析请求头的属性
+    req = request._get_current_object()
+    environ = req.environ
+    start = environ.get('metrics.start')
+    if start is None:
+        return response
+    rule = req.url_rule
+    route = rule.rule if rule is not None else 'unmatched'
+    method = environ['REQUEST_METHOD']
+    status = str(response.status_code)
+    try:
+        bytes_in = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        bytes_in = 0
+    counter = None
+    body = response.response
+    if isinstance(body, list):
+        bytes_out = sum(map(len, body))
+    elif response.direct_passthrough:
+        bytes_out = int(response.headers.get('Content-Length') or 0)
+    else:
+        counter = response.response = metrics.CountingIterable(body)
+    profiler = environ.get('metrics.profiler')
+    profile_path = None
+    if profiler:
+        profile_path = os.path.join(app.config['PROFILES_FOLDER'],
+                                    f'{time.strftime("%y-%m-%d_%H-%M-%S")}-{req.endpoint}-{id(profiler):x}')
+        response.headers['X-Profile'] = os.path.basename(profile_path) + '.txt'
+
+    def finish():
+        # 指标和性能分析报告只做记录，出错时不影响请求
+        try:
+            metrics.observe_request(route, method, status, time.perf_counter() - start, bytes_in,
+                                    counter.count if counter else bytes_out)
+            if profiler:
+                metrics.write_profile(profiler, profile_path)
+                log.info('请求性能分析', route=route, report=profile_path + '.txt')
+        except Exception as e:
+            log.warning('记录请求指标失败', route=route, error=str(e))
+
+    response.call_on_close(finish)
+    return response
+
+@app.route('/metrics')
+def get_metrics():
+    # Prometheus 文本格式的进程内指标
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
 # 添加CORS支
 @app.after_request
 def after_request(response):
     response.headers.update({
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization, Range, If-None-Match, If-Modified-Since, X-Chunk-SHA256',
+        'Access-Control-Expose-Headers': 'ETag, Last-Modified, Content-Range, Accept-Ranges, X-Next-Cursor, Link',
         'Access-Control-Allow-Credentials': 'true',
     })
     return response
@@ -265,50 +1079,23 @@ def rename_scene(old_filename):
         # URL解码文件名，处理中文和特殊字符
         old_filename = unquote(old_filename)
             
-        old_path = os.path.join(app.config['SCENES_FOLDER'], old_filename)
-        new_path = os.path.join(app.config['SCENES_FOLDER'], new_name)
-        
-        print(f"重命名: {old_path} -> {new_path}")  # 调试日志
+        log.debug('重命名场景', old=old_filename, new=new_name)
         
-        if not os.path.exists(old_path):
-            print(f"原文件不存在: {old_path}")  # 调试日志
-            return jsonify({'success': True})  # 即使文件不存在也返回成功
-            
-        if os.path.exists(new_path) and old_path != new_path:
-            print(f"新文件名已存在: {new_path}")  # 调试日志
+        # 场景和所有相关的原图一起移到新名称下
+        try:
+            scene_data = store.rename(old_filename, new_name)
+        except scene_store.SceneNotFound:
+            log.debug('原场景不存在', scene=old_filename)
+            return jsonify({'success': True})  # 即使场景不存在也返回成功
+        except scene_store.SceneExists:
+            log.debug('新文件名已存在', scene=new_name)
             return jsonify({'error': '文件名已存在'}), 400
-            
-        # 读取场景数据以获取原图信息
-        with open(old_path, 'r', encoding='utf-8') as f:
-            scene_data = json.load(f)
+        catalog.rename(old_filename, new_name, scene_data)
         
-        # 重命名场景文件
-        os.rename(old_path, new_path)
-        
-        # 获取旧的和新的场景名（不包含.json后缀）
-        old_scene_name = old_filename.replace('.json', '')
-        new_scene_name = new_name.replace('.json', '')
-        
-        # 重命名所有相关的原图文件
-        if 'original_images' in scene_data:
-            for image in scene_data['original_images']:
-                old_image_name = image['filename']
-                new_image_name = old_image_name.replace(old_scene_name, new_scene_name)
-                old_image_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], old_image_name)
-                new_image_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], new_image_name)
-                if os.path.exists(old_image_path):
-                    os.rename(old_image_path, new_image_path)
-                    image['filename'] = new_image_name
-                    print(f"重命名原图: {old_image_path} -> {new_image_path}")  # 调试日志
-        
-        # 保存更新后的场景数据
-        with open(new_path, 'w', encoding='utf-8') as f:
-            json.dump(scene_data, f, ensure_ascii=False)
-        
-        print(f"重命名成功")  # 调试日志
+        log.info('重命名场景', old=old_filename, new=new_name)
         return jsonify({'success': True, 'newFilename': new_name})
     except Exception as e:
-        print(f"重命名错误: {str(e)}")  # 调试日志
+        log.error('重命名错误', error=str(e))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/share/<path:filename>')
@@ -316,20 +1103,15 @@ def share_scene(filename):
     try:
         # URL解码文件名，处理中文和特殊字符
         decoded_filename = unquote(filename)
-        filepath = os.path.join(app.config['SCENES_FOLDER'], decoded_filename)
         
-        if not os.path.exists(filepath):
+        if not store.exists(decoded_filename):
             return jsonify({'error': '场景不存在'}), 404
             
-        # 读取场景数据以获取标题
-        with open(filepath, 'r', encoding='utf-8') as f:
-            scene_data = json.load(f)
-            
         # 创建HTML内容，包含动态标题
         title = decoded_filename.replace('.json', '')
         
         # 读取原始index.html文件
-        with open('public/index.html', 'r', encoding='utf-8') as f:
+        with open(os.path.join(app.root_path, 'public', 'index.html'), 'r', encoding='utf-8') as f:
             original_html = f.read()
             
         # 在 <head> 标签后立即插入新的 meta 标签
@@ -349,7 +1131,7 @@ def share_scene(filename):
         return modified_html
         
     except Exception as e:
-        print(f"分享场景错误: {str(e)}")
+        log.error('分享场景错误', error=str(e))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/scenes/<path:filename>/download')
@@ -357,122 +1139,110 @@ def download_scene(filename):
     try:
         # URL解码文件名
         decoded_filename = unquote(filename)
-        scene_path = os.path.join(app.config['SCENES_FOLDER'], decoded_filename)
         
-        if not os.path.exists(scene_path):
-            return jsonify({'error': '场景不存在'}), 404
-            
         # 读取场景数据
-        with open(scene_path, 'r', encoding='utf-8') as f:
-            scene_data = json.load(f)
-            
-        # 创建内存中的ZIP文件
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            # 使用场景名称作为主文件夹名（移除.json后缀）
-            base_folder = os.path.splitext(decoded_filename)[0]
+        try:
+            document, _, _ = store.document(decoded_filename)
+        except scene_store.SceneNotFound:
+            return jsonify({'error': '场景不存在'}), 404
+        scene_data = json.loads(document)
             
-            # 添加所有模型文件
-            if 'models' in scene_data:
-                for i, model in enumerate(scene_data['models'], 1):
-                    # 在主文件夹下创建模型子文件夹
-                    model_folder = f'{base_folder}/模型{i}'
-                    
-                    # 添加OBJ文件
-                    if 'objFile' in model:
-                        obj_path = os.path.join(app.root_path, model['objFile'].lstrip('/'))
-                        if os.path.exists(obj_path):
-                            zf.write(obj_path, f'{model_folder}/{os.path.basename(obj_path)}')
-                    
-                    # 添加MTL文件
-                    if 'mtlFile' in model:
-                        mtl_path = os.path.join(app.root_path, model['mtlFile'].lstrip('/'))
-                        if os.path.exists(mtl_path):
-                            zf.write(mtl_path, f'{model_folder}/{os.path.basename(mtl_path)}')
-                    
-                    # 添加贴图文件
-                    if 'textureFile' in model:
-                        texture_path = os.path.join(app.root_path, model['textureFile'].lstrip('/'))
-                        if os.path.exists(texture_path):
-                            zf.write(texture_path, f'{model_folder}/{os.path.basename(texture_path)}')
-                    
-                    # 检查并添加原图（如果存在）
-                    scene_name = base_folder
-                    for filename in os.listdir(app.config['ORIGINAL_IMAGES_FOLDER']):
-                        if filename.startswith(f"{scene_name}_model_{i-1}_"):
-                            original_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], filename)
-                            # 保持原始扩展名
-                            original_ext = os.path.splitext(filename)[1]
-                            zf.write(original_path, f'{model_folder}/original{original_ext}')
-                            break
+        # 先收集要打包的文件，再边压缩边发送
+        # 使用场景名称作为主文件夹名（移除.json后缀）
+        base_folder = os.path.splitext(decoded_filename)[0]
+        # 场景数据（摆放、相机、设置）一起打包，/import-scenes 导入时据此恢复场景
+        entries = [(document, f'{base_folder}/{scene_archive.SCENE_DOCUMENT}')]
+        originals = dict(original_index.list_scene(base_folder))
         
-        # 将文件指针移到开始
-        memory_file.seek(0)
+        # 添加所有模型文件
+        if 'models' in scene_data:
+            for i, model in enumerate(scene_data['models'], 1):
+                # 在主文件夹下创建模型子文件夹
+                model_folder = f'{base_folder}/模型{i}'
+                
+                # 添加OBJ、MTL和贴图文件
+                for key in ('objFile', 'mtlFile', 'textureFile'):
+                    if key in model:
+                        path = resolve_upload_path(model[key])
+                        if path:
+                            entries.append((path, f'{model_folder}/{os.path.basename(model[key])}'))
+                
+                # 检查并添加原图（如果存在）
+                original = originals.get(i - 1)
+                if original and os.path.exists(original_index.path(original)):
+                    # 保持原始扩展名
+                    original_ext = os.path.splitext(original)[1]
+                    entries.append((original_index.path(original), f'{model_folder}/original{original_ext}'))
         
         # 使用时间戳作为下载文件名
         timestamp = time.strftime("%y-%m-%d_%H-%M-%S", time.localtime())
         
-        return send_file(
-            memory_file,
+        return Response(
+            zip_stream.stream_zip(entries),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=f'{timestamp}.zip'
+            headers={'Content-Disposition': f'attachment; filename={timestamp}.zip'}
         )
         
     except Exception as e:
-        print(f"下载场景错误: {str(e)}")
+        log.error('下载场景错误', error=str(e))
         return jsonify({'error': str(e)}), 500
 
+def parse_model_index(value):
+    # 模型序号：非负整数或其字符串形式，无效时返回 None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if value >= 0 else None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
 @app.route('/upload_original_image', methods=['POST'])
 def upload_original_image():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
     file = request.files['file']
     scene_name = request.form.get('scene_name')
-    model_index = request.form.get('model_index')
+    model_index = parse_model_index(request.form.get('model_index'))
+    
+    log.debug('上传原图', scene=scene_name, model=model_index)
     
-    print(f"上传原图: scene_name={scene_name}, model_index={model_index}")  # 调试日志
+    if not scene_name or model_index is None:
+        return jsonify({'success': False, 'error': '缺少场景名或模型序号无效'}), 400
     
     if file and allowed_file(file.filename):
         # 修改这里：使用scene_name作为前缀，而不是temp_timestamp
-        filename = f"{scene_name}_model_{model_index}_{secure_filename(file.filename)}"
-        
-        # 删除已存在的原图
-        for existing_file in os.listdir(app.config['ORIGINAL_IMAGES_FOLDER']):
-            if existing_file.startswith(f"{scene_name}_model_{model_index}_"):
-                os.remove(os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], existing_file))
-        
-        file_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], filename)
-        file.save(file_path)
-        print(f"保存原图: {filename}")  # 调试日志
+        # 保存新原图并替换索引中已存在的原图
+        filename = original_index.save(scene_name, model_index, secure_filename(file.filename), file)
+        catalog.refresh_originals(scene_name)
+        log.info('保存原图', file=filename)
         return jsonify({'success': True, 'filename': filename})
     
     return jsonify({'error': 'Invalid file'}), 400
 
 @app.route('/delete_original_image', methods=['POST'])
 def delete_original_image():
-    scene_name = request.json.get('scene_name')
-    model_index = request.json.get('model_index')
+    data = request.get_json(silent=True) or {}
+    scene_name = data.get('scene_name')
+    model_index = parse_model_index(data.get('model_index'))
+    if not scene_name or model_index is None:
+        return jsonify({'success': False, 'error': '缺少场景名或模型序号无效'}), 400
     
-    for filename in os.listdir(app.config['ORIGINAL_IMAGES_FOLDER']):
-        if filename.startswith(f"{scene_name}_model_{model_index}_"):
-            os.remove(os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], filename))
-            return jsonify({'success': True})
+    if original_index.delete(scene_name, model_index):
+        catalog.refresh_originals(scene_name)
+        return jsonify({'success': True})
     
     return jsonify({'error': 'File not found'}), 404
 
 @app.route('/get_original_image/<scene_name>/<model_index>')
 def get_original_image(scene_name, model_index):
     scene_name = unquote(scene_name)
-    print(f"查找原图: scene_name={scene_name}, model_index={model_index}")  # 调试日志
+    log.debug('查找原图', scene=scene_name, model=model_index)
     
-    for filename in os.listdir(app.config['ORIGINAL_IMAGES_FOLDER']):
-        print(f"检查文件: {filename}")  # 调试日志
-        if filename.startswith(f"{scene_name}_model_{model_index}_"):
-            print(f"找到匹配文件: {filename}")  # 调试日志
-            return send_from_directory(app.config['ORIGINAL_IMAGES_FOLDER'], filename)
+    filename = original_index.get(scene_name, model_index) if model_index.isdigit() else None
+    if filename and os.path.exists(original_index.path(filename)):
+        path = original_index.path(filename)
+        return send_asset(path, asset_store.cached_digest(path))
     
-    print("未找到匹配的原图")  # 调试日志
+    log.debug('未找到匹配的原图', scene=scene_name, model=model_index)
     return jsonify({'error': 'Image not found'}), 404
 
 @app.route('/copy_original_image', methods=['POST'])
@@ -482,37 +1252,29 @@ def copy_original_image():
         old_scene_name = data.get('oldSceneName')
         new_scene_name = data.get('newSceneName')
         model_index = data.get('modelIndex')
+        # 不指定序号时移动该场景的全部原图
+        if model_index is not None:
+            model_index = parse_model_index(model_index)
+            if model_index is None:
+                return jsonify({'success': False, 'error': '模型序号无效'}), 400
         
-        # 查找旧的原图
-        old_image = None
-        for filename in os.listdir(app.config['ORIGINAL_IMAGES_FOLDER']):
-            if filename.startswith(f"{old_scene_name}_model_{model_index}_"):
-                old_image = filename
-                break
-        
-        if old_image:
-            # 构建新的文件名
-            new_image = old_image.replace(old_scene_name, new_scene_name)
-            
-            # 复制文件
-            old_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], old_image)
-            new_path = os.path.join(app.config['ORIGINAL_IMAGES_FOLDER'], new_image)
-            shutil.copy2(old_path, new_path)
-            
-            # 删除旧文件
-            os.remove(old_path)
-            
+        # 把旧场景下的原图移到新场景名下
+        if original_index.move(old_scene_name, new_scene_name, model_index):
+            catalog.refresh_originals(old_scene_name)
+            catalog.refresh_originals(new_scene_name)
             return jsonify({'success': True})
+        
+        return jsonify({'error': 'File not found'}), 404
             
     except Exception as e:
-        print(f"复制原图错误: {str(e)}")
+        log.error('复制原图错误', error=str(e))
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    print("Starting Flask server...")
-    print(f"上传目录: {UPLOAD_FOLDER}")
-    print(f"场景目录: {SCENES_FOLDER}")
-    print(f"原始图像目录: {ORIGINAL_IMAGES_FOLDER}")
+    # debug 模式下重载器的父进程只监视文件变化，由它启动的子进程（设置了 WERKZEUG_RUN_MAIN）提供服务并执行任务
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_queue.start()
+    log.info('Starting Flask server', uploads=UPLOAD_FOLDER, scenes=SCENES_FOLDER, originals=ORIGINAL_IMAGES_FOLDER)
     
     # 启动服务器
     app.run(debug=True, host='0.0.0.0', port=3000, threaded=True) 
\ No newline at end of file
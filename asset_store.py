@@ -0,0 +1,243 @@
+import os
+import sys
+import gzip
+import hashlib
+import shutil
+import tempfile
+from werkzeug.security import safe_join
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    # brotli 为可选依赖，未安装时只生成 gzip
+    brotli = None
+
+# 内容寻址的资源存储：每个文件按 sha256 存为 blobs/<前两位>/<哈希>，
+# uploads/<时间戳>/<文件名> 通过硬链接（或 .blobref 引用文件）指向同一份数据
+
+CHUNK_SIZE = 1024 * 1024
+REF_SUFFIX = '.blobref'
+
+# 预压缩副本的编码和后缀，按协商时的优先级排列
+COMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+
+
+class HashingWriter:
+    # 写入文件的同时计算哈希，避免保存后再读一遍
+    def __init__(self, f):
+        self.f = f
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha.update(data)
+        self.f.write(data)
+        self.size += len(data)
+
+    def hexdigest(self):
+        return self.sha.hexdigest()
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def blob_path(blob_folder, digest):
+    return os.path.join(blob_folder, digest[:2], digest)
+
+
+def derived_path(blob_folder, digest, suffix):
+    # 由源文件派生的缓存（如二进制网格）与源 blob 放在一起，源内容变化时哈希随之变化
+    return blob_path(blob_folder, digest) + suffix
+
+
+_digest_cache = {}
+_DIGEST_CACHE_SIZE = 10000
+
+
+def remember_digest(path, digest):
+    # 刚收入存储的文件哈希已知，直接记入缓存，之后查询不用再读一遍文件
+    try:
+        st = os.stat(path)
+    except OSError:
+        return
+    if len(_digest_cache) >= _DIGEST_CACHE_SIZE:
+        _digest_cache.clear()
+    _digest_cache[(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)] = digest
+
+
+def cached_digest(path):
+    # 上传路径只会被整体替换为新的链接，按 inode、大小和修改时间缓存哈希即可
+    st = os.stat(path)
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    digest = _digest_cache.get(key)
+    if digest is None:
+        digest = file_digest(path)
+        if len(_digest_cache) >= _DIGEST_CACHE_SIZE:
+            _digest_cache.clear()
+        _digest_cache[key] = digest
+    return digest
+
+
+def new_temp_file(blob_folder):
+    # 临时文件放在 blob 目录下，保证之后的 rename 不跨文件系统
+    os.makedirs(blob_folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=blob_folder, suffix='.part')
+    return os.fdopen(fd, 'wb'), tmp_path
+
+
+def commit_blob(tmp_path, blob_folder, dest_path, digest=None):
+    # 把临时文件收入存储并链接到 dest_path，返回内容哈希
+    if digest is None:
+        digest = file_digest(tmp_path)
+    target = blob_path(blob_folder, digest)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target):
+        # 已有相同内容，丢弃这次写入的数据
+        os.remove(tmp_path)
+    else:
+        with metrics.fs_timer('rename'):
+            os.replace(tmp_path, target)
+    link_blob(target, dest_path)
+    remember_digest(target, digest)
+    return digest
+
+
+def link_blob(target, dest_path):
+    for path in (dest_path, dest_path + REF_SUFFIX):
+        if os.path.lexists(path):
+            os.remove(path)
+    try:
+        with metrics.fs_timer('link'):
+            os.link(target, dest_path)
+    except OSError:
+        # 文件系统不支持硬链接时退化为引用文件
+        with open(dest_path + REF_SUFFIX, 'w', encoding='utf-8') as f:
+            f.write(os.path.basename(target))
+
+
+def save_stream(stream, blob_folder, dest_path):
+    f, tmp_path = new_temp_file(blob_folder)
+    try:
+        with f:
+            writer = HashingWriter(f)
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                writer.write(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return commit_blob(tmp_path, blob_folder, dest_path, writer.hexdigest())
+
+
+def resolve(base_folder, rel_path, blob_folder):
+    # 把 uploads 下的相对路径解析为实际文件路径，找不到时返回 None
+    path = safe_join(base_folder, rel_path)
+    if path is None:
+        return None
+    if os.path.isfile(path):
+        return path
+    ref_path = path + REF_SUFFIX
+    if os.path.isfile(ref_path):
+        with open(ref_path, 'r', encoding='utf-8') as f:
+            digest = f.read().strip()
+        target = blob_path(blob_folder, digest)
+        if os.path.isfile(target):
+            return target
+    return None
+
+
+def available_encodings():
+    return [encoding for encoding in COMPRESSED_SUFFIXES if encoding != 'br' or brotli is not None]
+
+
+def _write_compressed(src_path, dst_path, encoding):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst_path), suffix='.part')
+    try:
+        with open(src_path, 'rb') as src, os.fdopen(fd, 'wb') as raw:
+            if encoding == 'gzip':
+                # mtime 固定为 0，相同内容生成相同的压缩文件
+                with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as dst:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                        dst.write(chunk)
+            else:
+                compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    raw.write(compressor.process(chunk))
+                raw.write(compressor.finish())
+        os.replace(tmp_path, dst_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def precompress(path, blob_folder, digest):
+    # 为文本资源生成 .gz/.br 副本，放在源 blob 旁边，已存在的跳过
+    for encoding in available_encodings():
+        target = derived_path(blob_folder, digest, COMPRESSED_SUFFIXES[encoding])
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write_compressed(path, target, encoding)
+
+
+def compressed_variant(blob_folder, digest, accept_encodings):
+    # 按客户端 Accept-Encoding 选择已生成的预压缩副本，返回 (编码, 路径) 或 None
+    for encoding in available_encodings():
+        if accept_encodings[encoding] > 0:
+            target = derived_path(blob_folder, digest, COMPRESSED_SUFFIXES[encoding])
+            if os.path.exists(target):
+                return encoding, target
+    return None
+
+
+def has_compressed(blob_folder, digest):
+    # 所有可用编码的预压缩副本是否都已生成
+    return all(os.path.exists(derived_path(blob_folder, digest, COMPRESSED_SUFFIXES[encoding]))
+               for encoding in available_encodings())
+
+
+def dedupe(upload_folder, blob_folder):
+    # 把历史上传目录中的重复文件收入存储并改为硬链接（不支持硬链接时改为引用文件）
+    saved = 0
+    for root, dirs, files in os.walk(upload_folder):
+        for name in files:
+            if name.endswith(REF_SUFFIX):
+                continue
+            path = os.path.join(root, name)
+            digest = file_digest(path)
+            target = blob_path(blob_folder, digest)
+            if os.path.exists(target):
+                if os.path.samefile(target, path):
+                    continue
+                saved += os.path.getsize(path)
+                link_blob(target, path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    # 文件系统不支持硬链接时复制一份收入存储，原路径改为引用文件（与 link_blob 相同）
+                    f, tmp_path = new_temp_file(blob_folder)
+                    try:
+                        with f, open(path, 'rb') as src:
+                            shutil.copyfileobj(src, f, CHUNK_SIZE)
+                    except Exception:
+                        os.remove(tmp_path)
+                        raise
+                    commit_blob(tmp_path, blob_folder, path, digest)
+    return saved
+
+
+if __name__ == '__main__':
+    base_dir = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+    if len(sys.argv) > 1 and sys.argv[1] == 'dedupe':
+        saved = dedupe(os.path.join(base_dir, 'uploads'), os.path.join(base_dir, 'blobs'))
+        print(f"去重完成，节省 {saved} 字节")
+    else:
+        print("用法: python asset_store.py dedupe")
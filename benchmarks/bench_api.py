@@ -0,0 +1,464 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.synthetic import write_obj, write_mtl, write_texture
+
+# 接口基准与压力测试：用 Flask 测试客户端在临时数据目录中对主要接口计时，不需要网络
+# 每个接口报告延迟分位数、吞吐、响应字节数和峰值 RSS，--concurrency 指定并发线程数（可给多个值）
+# 输出 JSON 的结构固定（schema），可以保存下来与其他提交的结果比较：
+#   python benchmarks/bench_api.py --mesh-mb 1 --scenes 1000 --requests 50 --concurrency 1 8 --output head.json
+#   python benchmarks/bench_api.py --compare base.json head.json
+# 未包含的接口：/import-scenes（见 bench_import.py）、/metrics、/copy_original_image，
+# 以及分块上传的查询和取消（GET/DELETE /upload/chunked/<id>，上传的各阶段已计入 upload_chunked）
+
+SCHEMA = 1
+# 超过此大小的 OBJ 走分块上传（/upload 的请求大小上限为 16MB）
+DIRECT_UPLOAD_LIMIT = 15 * 1024 * 1024
+UPLOAD_CHUNK = 8 * 1024 * 1024
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * q / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def reset_peak_rss():
+    # Linux 下写入 5 可把 VmHWM 重置为当前 RSS，这样每个接口的峰值互不影响
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, timeout=60).stdout.strip())
+        return commit or None, dirty
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+
+
+class Endpoint:
+    # name: 结果中的键；route: 说明用的请求；calls(n) 返回 n 个请求函数，每个接收测试客户端并返回响应
+    # warm(client) 在计时前执行一次（例如先生成缩略图、完成偏差计算），计时只包含读取已缓存结果的请求
+    def __init__(self, name, route, calls, drain=False, warm=None):
+        self.name = name
+        self.route = route
+        self.calls = calls
+        # 会安排后台任务的接口，计时结束后等待任务完成再测下一个接口
+        self.drain = drain
+        self.warm = warm
+
+
+def consume(response):
+    # 以流的方式读完响应体（下载等大响应不整体放入内存），返回 (状态码, 字节数)
+    size = 0
+    try:
+        for chunk in response.iter_encoded():
+            size += len(chunk)
+    finally:
+        response.close()
+    return response.status_code, size
+
+
+def measure(app, endpoint, requests, concurrency):
+    if endpoint.warm:
+        endpoint.warm(app.test_client())
+    calls = endpoint.calls(requests)
+    local = threading.local()
+    latencies = []
+    statuses = {}
+    total_bytes = [0]
+    lock = threading.Lock()
+
+    def run(call):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        status, size = consume(call(client))
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            total_bytes[0] += size
+
+    reset_peak_rss()
+    start = time.perf_counter()
+    if concurrency == 1:
+        for call in calls:
+            run(call)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run, calls))
+    wall = time.perf_counter() - start
+    errors = sum(count for status, count in statuses.items() if not status.startswith(('2', '3')))
+    return {
+        'endpoint': endpoint.name,
+        'route': endpoint.route,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': dict(sorted(statuses.items())),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p90': round(percentile(latencies, 90) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(max(latencies) * 1000, 3),
+        },
+        'seconds': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 2),
+        'bytes_out': total_bytes[0],
+        'mb_per_second': round(total_bytes[0] / wall / 1e6, 2),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def drain(app_module):
+    while app_module.job_queue.pending():
+        time.sleep(0.05)
+
+
+def make_fixtures(folder, args):
+    paths = {name: os.path.join(folder, name) for name in ('model.obj', 'model.mtl', 'model.jpg')}
+    write_obj(paths['model.obj'], int(args.mesh_mb * 1024 * 1024))
+    write_mtl(paths['model.mtl'], 'model.jpg')
+    write_texture(paths['model.jpg'], int(args.texture_mb * 1024 * 1024))
+    return paths
+
+
+def upload_call(path, name, chunked=False):
+    size = os.path.getsize(path)
+    if size <= DIRECT_UPLOAD_LIMIT and not chunked:
+        def call(client):
+            with open(path, 'rb') as f:
+                return client.post('/upload', data={'file': (f, name)}, buffered=False)
+        return call
+
+    def call(client):
+        # 大文件按前端的方式分块上传，计时包含创建、全部分块和完成三个阶段
+        created = client.post('/upload/chunked', json={'filename': name, 'size': size, 'chunkSize': UPLOAD_CHUNK})
+        upload_id = created.get_json()['uploadId']
+        with open(path, 'rb') as f:
+            for offset in range(0, size, UPLOAD_CHUNK):
+                client.put(f'/upload/chunked/{upload_id}?offset={offset}', data=f.read(UPLOAD_CHUNK))
+        return client.post(f'/upload/chunked/{upload_id}/complete', buffered=False)
+    return call
+
+
+def scene_models(urls, count):
+    return [{'objFile': urls['model.obj'], 'mtlFile': urls['model.mtl'], 'textureFile': urls['model.jpg'],
+             'position': {'x': i, 'y': 0, 'z': 0}, 'rotation': {'x': 0, 'y': 0, 'z': 0},
+             'scale': {'x': 1, 'y': 1, 'z': 1}, 'wireframe': False, 'brightness': 1}
+            for i in range(count)]
+
+
+def seed_scenes(app_module, urls, names, models):
+    # 直接写入场景存储和目录索引（不经过 /save-scene），大量场景也能很快准备好
+    import scene_store
+    scene_data = {'models': scene_models(urls, models)}
+    # 上传后已等待后台任务完成，统计已生成
+    stats = app_module.model_stats(urls['model.obj'], time.monotonic())
+    for model in scene_data['models']:
+        model['stats'] = stats
+    for filename in names:
+        app_module.store.put_document(filename, scene_store.encode(scene_data))
+        app_module.catalog.put(filename, scene_data)
+
+
+def build_endpoints(app_module, fixtures, urls, scenes, pool, args):
+    rng = random.Random(0)
+    obj_path = urls['model.obj'][len('/uploads/'):]
+    pool_names = iter(pool)
+    renamed = []
+
+    def repeat(make):
+        return lambda n: [make() for _ in range(n)]
+
+    def any_scene():
+        return rng.choice(scenes)
+
+    def rename_call():
+        name = next(pool_names)
+        new_name = 'renamed-' + name[:-len('.json')]
+        renamed.append(new_name + '.json')
+        return lambda client: client.post(f'/scenes/{name}/rename', json={'newName': new_name}, buffered=False)
+
+    def delete_calls(n):
+        targets = [renamed.pop() if renamed else next(pool_names) for _ in range(n)]
+        return [lambda client, target=target: client.delete(f'/scenes/{target}', buffered=False) for target in targets]
+
+    list_etag = {}
+
+    def list_not_modified(client):
+        if 'etag' not in list_etag:
+            list_etag['etag'] = client.get('/list-scenes?limit=100').headers['ETag']
+        return client.get('/list-scenes?limit=100', headers={'If-None-Match': list_etag['etag']}, buffered=False)
+
+    # 原图：上传到不同的 (场景, 模型序号)，读取和删除使用已上传的原图
+    originals = []
+
+    def upload_original_call():
+        scene, index = scenes[len(originals) % len(scenes)][:-len('.json')], len(originals) // len(scenes)
+        originals.append((scene, index))
+
+        def call(client):
+            with open(fixtures['model.jpg'], 'rb') as f:
+                return client.post('/upload_original_image', data={
+                    'file': (f, 'original.jpg'), 'scene_name': scene, 'model_index': str(index)}, buffered=False)
+        return call
+
+    def get_original_call():
+        scene, index = rng.choice(originals)
+        return lambda client: client.get(f'/get_original_image/{scene}/{index}', buffered=False)
+
+    def delete_original_calls(n):
+        targets = [originals.pop() for _ in range(min(n, len(originals)))]
+        return [lambda client, target=target: client.post('/delete_original_image', json={
+            'scene_name': target[0], 'model_index': target[1]}, buffered=False) for target in targets]
+
+    def batch_call(client):
+        # 一组 OBJ + MTL + 贴图，文件名与前面上传的相同，各组保存到独立的文件夹
+        files = [open(fixtures[name], 'rb') for name in ('model.obj', 'model.mtl', 'model.jpg')]
+        try:
+            return client.post('/upload/batch', data={'group': [(f, os.path.basename(f.name)) for f in files]},
+                               buffered=False)
+        finally:
+            for f in files:
+                f.close()
+
+    def warm_get(url):
+        def warm(client):
+            client.get(url).close()
+            drain(app_module)
+        return warm
+
+    # 所有场景的模型相同，缩略图和偏差结果生成一次后被所有场景共用
+    deviation_url = f'/scenes/{scenes[0]}/deviation?a=0&b=1'
+    job_ids = []
+
+    def warm_jobs(client):
+        job_ids.extend(job['id'] for job in client.get('/jobs?limit=1000').get_json())
+
+    scene_body = {'models': scene_models(urls, args.models)}
+    accept = {'Accept-Encoding': 'gzip, br'}
+    endpoints = [
+        Endpoint('upload_obj', 'POST /upload (OBJ)', repeat(lambda: upload_call(fixtures['model.obj'], 'model.obj')),
+                 drain=True),
+        Endpoint('upload_texture', 'POST /upload (JPG)',
+                 repeat(lambda: upload_call(fixtures['model.jpg'], 'model.jpg')), drain=True),
+        Endpoint('upload_chunked', 'POST /upload/chunked + PUT chunks + complete (OBJ)',
+                 repeat(lambda: upload_call(fixtures['model.obj'], 'model.obj', chunked=True)), drain=True),
+        Endpoint('upload_batch', 'POST /upload/batch (OBJ + MTL + JPG)', repeat(lambda: batch_call), drain=True),
+        Endpoint('save_scene', 'POST /save-scene',
+                 repeat(lambda: lambda client: client.post('/save-scene', json=scene_body, buffered=False)),
+                 drain=True),
+        Endpoint('list_scenes_page', 'GET /list-scenes?limit=100',
+                 repeat(lambda: lambda client: client.get('/list-scenes?limit=100', buffered=False))),
+        Endpoint('list_scenes_all', 'GET /list-scenes',
+                 repeat(lambda: lambda client: client.get('/list-scenes', buffered=False))),
+        Endpoint('list_scenes_304', 'GET /list-scenes?limit=100 (If-None-Match)', repeat(lambda: list_not_modified)),
+        Endpoint('get_scene', 'GET /scenes/<filename>',
+                 repeat(lambda: lambda client, name=any_scene(): client.get(f'/scenes/{name}', buffered=False))),
+        Endpoint('get_obj', 'GET /uploads/<obj> (gzip, br)',
+                 repeat(lambda: lambda client: client.get(urls['model.obj'], headers=accept, buffered=False))),
+        Endpoint('get_mesh', 'GET /uploads/mesh/<obj>',
+                 repeat(lambda: lambda client: client.get(f'/uploads/mesh/{obj_path}', buffered=False))),
+        Endpoint('get_texture', 'GET /uploads/<jpg>',
+                 repeat(lambda: lambda client: client.get(urls['model.jpg'], buffered=False))),
+        Endpoint('download_scene', 'GET /scenes/<filename>/download',
+                 repeat(lambda: lambda client, name=any_scene(): client.get(f'/scenes/{name}/download',
+                                                                           buffered=False))),
+        Endpoint('share_scene', 'GET /share/<filename>',
+                 repeat(lambda: lambda client, name=any_scene(): client.get(f'/share/{name}', buffered=False))),
+        Endpoint('get_model_thumbnail', 'GET /uploads/thumbnail/<obj> (cached)',
+                 repeat(lambda: lambda client: client.get(f'/uploads/thumbnail/{obj_path}', buffered=False)),
+                 warm=warm_get(f'/uploads/thumbnail/{obj_path}')),
+        Endpoint('get_scene_thumbnail', 'GET /scenes/<filename>/thumbnail (cached)',
+                 repeat(lambda: lambda client, name=any_scene(): client.get(f'/scenes/{name}/thumbnail',
+                                                                           buffered=False)),
+                 warm=warm_get(f'/scenes/{scenes[0]}/thumbnail')),
+        Endpoint('upload_original', 'POST /upload_original_image', repeat(upload_original_call)),
+        Endpoint('get_original', 'GET /get_original_image/<scene>/<index>', repeat(get_original_call)),
+        Endpoint('delete_original', 'POST /delete_original_image', delete_original_calls),
+        Endpoint('list_jobs', 'GET /jobs?limit=100',
+                 repeat(lambda: lambda client: client.get('/jobs?limit=100', buffered=False))),
+        Endpoint('get_job', 'GET /jobs/<id>',
+                 repeat(lambda: lambda client: client.get(f'/jobs/{rng.choice(job_ids)}', buffered=False)),
+                 warm=warm_jobs),
+        Endpoint('rename_scene', 'POST /scenes/<filename>/rename', repeat(rename_call)),
+        Endpoint('delete_scene', 'DELETE /scenes/<filename>', delete_calls),
+    ]
+    if args.models >= 2:
+        # 偏差需要场景中至少两个模型
+        endpoints.insert(-2, Endpoint('scene_deviation', 'GET /scenes/<filename>/deviation (cached)',
+                                      repeat(lambda: lambda client: client.get(deviation_url, buffered=False)),
+                                      warm=warm_get(deviation_url)))
+    return endpoints
+
+
+def run(args):
+    data_dir = tempfile.mkdtemp(prefix='bench-api-')
+    # app 在导入时按 DATA_DIR 建立各目录和数据库，必须在导入前设置
+    os.environ['DATA_DIR'] = data_dir
+    if args.scene_store:
+        os.environ['SCENE_STORE'] = args.scene_store
+    # 默认只输出警告以上的日志，可用 LOG_LEVEL 覆盖；app 的输出不混入结果 JSON
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    devnull = open(os.devnull, 'w')
+    stdout = sys.stdout
+    sys.stdout = devnull
+    import app as app_module
+    app = app_module.app
+    try:
+        fixture_dir = os.path.join(data_dir, 'fixtures')
+        os.makedirs(fixture_dir)
+        start = time.perf_counter()
+        fixtures = make_fixtures(fixture_dir, args)
+        generate_seconds = time.perf_counter() - start
+
+        client = app.test_client()
+        urls = {}
+        for name in ('model.obj', 'model.mtl', 'model.jpg'):
+            urls[name] = upload_call(fixtures[name], name)(client).get_json()['filepath']
+        drain(app_module)
+        start = time.perf_counter()
+        scenes = [f'bench-{i:06d}.json' for i in range(args.scenes)]
+        pool = [f'pool-{i:06d}.json' for i in range(args.requests * len(args.concurrency))]
+        seed_scenes(app_module, urls, scenes + pool, args.models)
+        seed_seconds = time.perf_counter() - start
+
+        endpoints = build_endpoints(app_module, fixtures, urls, scenes, pool, args)
+        selected = [endpoint for endpoint in endpoints if not args.endpoints or endpoint.name in args.endpoints]
+        results = []
+        for endpoint in selected:
+            for concurrency in args.concurrency:
+                results.append(measure(app, endpoint, args.requests, concurrency))
+                if endpoint.drain:
+                    drain(app_module)
+        commit, dirty = git_revision()
+        report = {
+            'schema': SCHEMA,
+            'commit': commit,
+            'dirty': dirty,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'config': {
+                'mesh_bytes': os.path.getsize(fixtures['model.obj']),
+                'texture_bytes': os.path.getsize(fixtures['model.jpg']),
+                'scenes': args.scenes,
+                'models_per_scene': args.models,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'scene_store': app.config['SCENE_STORE'],
+            },
+            'setup_seconds': {'generate_fixtures': round(generate_seconds, 3), 'seed_scenes': round(seed_seconds, 3)},
+            'endpoints': results,
+        }
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+        app_module.job_queue.shutdown()
+        if not args.keep:
+            import shutil
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return report
+
+
+def compare(base_path, head_path):
+    # 按 (接口, 并发数) 对齐两次结果，给出 p50/p99 延迟和吞吐的变化比例（head / base）
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    with open(head_path, 'r', encoding='utf-8') as f:
+        head = json.load(f)
+    if base.get('schema') != head.get('schema'):
+        raise SystemExit('两份结果的 schema 不同，无法比较')
+    base_rows = {(row['endpoint'], row['concurrency']): row for row in base['endpoints']}
+    rows = []
+    for row in head['endpoints']:
+        old = base_rows.get((row['endpoint'], row['concurrency']))
+        if old is None:
+            continue
+
+        def ratio(new_value, old_value):
+            return round(new_value / old_value, 3) if old_value else None
+        rows.append({
+            'endpoint': row['endpoint'],
+            'concurrency': row['concurrency'],
+            'p50_ratio': ratio(row['latency_ms']['p50'], old['latency_ms']['p50']),
+            'p99_ratio': ratio(row['latency_ms']['p99'], old['latency_ms']['p99']),
+            'throughput_ratio': ratio(row['throughput_rps'], old['throughput_rps']),
+            'peak_rss_mb_delta': round(row['peak_rss_mb'] - old['peak_rss_mb'], 1),
+            'errors': {'base': old['errors'], 'head': row['errors']},
+        })
+    return {
+        'base': {'commit': base.get('commit'), 'config': base.get('config')},
+        'head': {'commit': head.get('commit'), 'config': head.get('config')},
+        'config_matches': base.get('config') == head.get('config'),
+        'endpoints': rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mesh-mb', type=float, default=1, help='合成 OBJ 的大小（MB），1~1024')
+    parser.add_argument('--texture-mb', type=float, default=1)
+    parser.add_argument('--scenes', type=int, default=1000, help='预先写入的场景数，10~100000')
+    parser.add_argument('--models', type=int, default=2, help='每个场景的模型数')
+    parser.add_argument('--requests', type=int, default=50, help='每个接口（每个并发数）的请求数')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1])
+    parser.add_argument('--endpoints', nargs='+', help='只测这些接口')
+    parser.add_argument('--scene-store', choices=('files', 'sqlite'))
+    parser.add_argument('--output', help='结果写入此 JSON 文件（同时输出到标准输出）')
+    parser.add_argument('--keep', action='store_true', help='保留临时数据目录')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='比较两份结果 JSON')
+    args = parser.parse_args()
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), indent=2, ensure_ascii=False))
+        return
+    report = run(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import write_obj, write_mtl, write_texture
+
+# 上传吞吐：逐个文件调用 /upload（每个模型 3 次请求）与一次 /upload/batch 对比
+# 使用 Flask 测试客户端，不含真实网络往返，实际部署中逐个上传的差距会更大
+# 用法: python benchmarks/bench_batch_upload.py --models 8 --obj-mb 2 --texture-mb 1
+
+
+def make_models(tmp, count, obj_bytes, texture_bytes):
+    models = []
+    for i in range(count):
+        folder = os.path.join(tmp, f'src{i}')
+        os.makedirs(folder)
+        write_obj(os.path.join(folder, f'model{i}.obj'), obj_bytes, seed=i)
+        write_mtl(os.path.join(folder, f'model{i}.mtl'), f'model{i}.jpg')
+        write_texture(os.path.join(folder, f'model{i}.jpg'), texture_bytes, seed=i)
+        files = []
+        # 与前端一致，贴图最后上传（收到图片时结束当前时间戳文件夹）
+        for name in (f'model{i}.obj', f'model{i}.mtl', f'model{i}.jpg'):
+            with open(os.path.join(folder, name), 'rb') as f:
+                files.append((name, f.read()))
+        models.append(files)
+    return models
+
+
+def drain_background(app_module):
+    # 等待上一轮安排的网格/预压缩任务结束，避免影响下一轮计时
+    while app_module.job_queue.pending():
+        time.sleep(0.05)
+
+
+def per_file(app_module, models):
+    client = app_module.app.test_client()
+    for files in models:
+        for name, data in files:
+            response = client.post('/upload', data={'file': (io.BytesIO(data), name)})
+            assert response.status_code == 200, response.get_json()
+    return sum(len(files) for files in models)
+
+
+def batch(app_module, models):
+    client = app_module.app.test_client()
+    form = {f'model{i}': [(io.BytesIO(data), name) for name, data in files] for i, files in enumerate(models)}
+    response = client.post('/upload/batch', data=form)
+    assert response.status_code == 200, response.get_json()
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', type=int, default=8)
+    parser.add_argument('--obj-mb', type=float, default=2)
+    parser.add_argument('--texture-mb', type=float, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # app 在导入时按 DATA_DIR 建立各目录和数据库并启动任务队列，必须在导入前设置
+        os.environ['DATA_DIR'] = tmp
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        import app as app_module
+        models = make_models(tmp, args.models, int(args.obj_mb * 1024 * 1024), int(args.texture_mb * 1024 * 1024))
+        total_bytes = sum(len(data) for files in models for _, data in files)
+
+        results = {'models': args.models, 'total_bytes': total_bytes, 'modes': []}
+        for name, func in (('per-file /upload', per_file), ('/upload/batch', batch)):
+            best = None
+            for _ in range(args.repeat):
+                drain_background(app_module)
+                start = time.perf_counter()
+                requests = func(app_module, models)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results['modes'].append({'mode': name, 'requests': requests, 'seconds': round(best, 3),
+                                     'models_per_second': round(args.models / best, 1),
+                                     'mb_per_second': round(total_bytes / best / 1e6, 1)})
+        drain_background(app_module)
+        app_module.job_queue.shutdown()
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
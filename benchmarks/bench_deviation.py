@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import deviation
+from bench_thumbnail import torus
+
+# 网格偏差耗时：两个不同分辨率的环面（源网格顶点加噪声），逐顶点到对方表面的最近距离
+# 抽样与暴力计算（对全部三角形求点到三角形距离）比对，确认结果精确
+# 用法: python benchmarks/bench_deviation.py --vertices 500000 --workers 4
+
+
+def brute_force(points, positions, faces):
+    tri = positions[faces]
+    return np.array([np.sqrt(deviation.point_triangle_distance2(
+        np.repeat(point[None], len(tri), axis=0), tri[:, 0], tri[:, 1], tri[:, 2]).min()) for point in points])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vertices', type=int, default=500000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--noise', type=float, default=0.002)
+    parser.add_argument('--samples', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # torus(faces) 的顶点数约为面数的一半
+    source, source_faces, _ = torus(args.vertices * 2)
+    source = source + rng.normal(0, args.noise, source.shape).astype(np.float32)
+    target, target_faces, _ = torus(int(args.vertices * 1.2))
+
+    results = []
+    for name, points, positions, faces in (('a_to_b', source, target, target_faces),
+                                           ('b_to_a', target, source, source_faces)):
+        start = time.perf_counter()
+        deviation.TriangleBVH(positions, faces)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        distances = deviation.nearest_distances(points, positions, faces, workers=args.workers)
+        total_seconds = time.perf_counter() - start
+        sample = rng.choice(len(points), min(args.samples, len(points)), replace=False)
+        error = np.abs(brute_force(points[sample], positions, faces) - distances[sample]).max()
+        summary = deviation.summarize(distances, positions, faces)
+        results.append({
+            'direction': name,
+            'source_vertices': len(points),
+            'target_faces': len(faces),
+            'workers': args.workers or os.cpu_count(),
+            'build_seconds': round(build_seconds, 3),
+            'total_seconds': round(total_seconds, 3),
+            'vertices_per_second': round(len(points) / total_seconds),
+            'mean': round(summary['mean'], 6),
+            'max': round(summary['max'], 6),
+            'max_error_vs_brute_force': float(error),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
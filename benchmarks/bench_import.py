@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import write_obj, write_mtl, write_texture
+from benchmarks.bench_api import reset_peak_rss, peak_rss_mb
+
+# 场景压缩包导入：一次 /import-scenes 与逐个文件上传再保存场景（每个模型 3 次 /upload、1 次原图上传，最后 /save-scene）对比
+# 压缩包按 /scenes/<filename>/download 的布局生成，请求体直接为 ZIP，计时包含解压、OBJ 修正、登记原图和写入场景；
+# 同时报告导入期间的峰值 RSS，确认内存占用与压缩包大小无关
+# 用法: python benchmarks/bench_import.py --models 50 --obj-mb 2 --texture-mb 1
+
+
+def make_archive(tmp, name, count, obj_bytes, texture_bytes, seed):
+    # 各模型内容不同（不同随机种子），两种方式也使用不同的内容，避免内容寻址存储把重复文件合并后低估写入量
+    source = os.path.join(tmp, name)
+    os.makedirs(source)
+    path = os.path.join(tmp, f'{name}.zip')
+    models = []
+    with zipfile.ZipFile(path, 'w') as zf:
+        for i in range(1, count + 1):
+            folder = f'bench-import/模型{i}'
+            files = {name: os.path.join(source, f'{i}-{name}') for name in ('model.obj', 'model.mtl', 'model.jpg')}
+            write_obj(files['model.obj'], obj_bytes, seed=seed + i)
+            write_mtl(files['model.mtl'], 'model.jpg')
+            write_texture(files['model.jpg'], texture_bytes, seed=seed + i)
+            for name, file_path in files.items():
+                compress = zipfile.ZIP_STORED if name.endswith('.jpg') else zipfile.ZIP_DEFLATED
+                zf.write(file_path, f'{folder}/{name}', compress_type=compress)
+            zf.write(files['model.jpg'], f'{folder}/original.jpg', compress_type=zipfile.ZIP_STORED)
+            models.append(files)
+        zf.writestr('bench-import/scene.json', json.dumps({'models': [
+            {'position': {'x': i, 'y': 0, 'z': 0}, 'rotation': {'x': 0, 'y': 0, 'z': 0}, 'scale': {'x': 1, 'y': 1, 'z': 1}}
+            for i in range(count)]}))
+    return path, models
+
+
+def drain(app_module):
+    while app_module.job_queue.pending():
+        time.sleep(0.05)
+
+
+def import_archive(app_module, path):
+    client = app_module.app.test_client()
+    # 以 input_stream 传入，测试客户端不会先把整个压缩包读入内存
+    with open(path, 'rb') as f:
+        response = client.post('/import-scenes', input_stream=f, content_length=os.path.getsize(path),
+                               content_type='application/zip')
+    assert response.status_code == 200, response.get_json()
+    return 1
+
+
+def per_file(app_module, models):
+    client = app_module.app.test_client()
+    requests = 0
+    scene_models = []
+    for index, files in enumerate(models):
+        urls = {}
+        # 与前端一致，贴图最后上传（收到图片时结束当前时间戳文件夹）
+        # 文件名各不相同，同一秒内的模型落在同一个时间戳文件夹中也不会互相覆盖
+        for key, name in (('objFile', 'model.obj'), ('mtlFile', 'model.mtl'), ('textureFile', 'model.jpg')):
+            with open(files[name], 'rb') as f:
+                response = client.post('/upload', data={'file': (f, f'{index}-{name}')})
+            assert response.status_code == 200, response.get_json()
+            urls[key] = response.get_json()['filepath']
+        with open(files['model.jpg'], 'rb') as f:
+            response = client.post('/upload_original_image', data={
+                'file': (f, 'original.jpg'), 'scene_name': f'temp_{index}', 'model_index': str(index)})
+        assert response.status_code == 200, response.get_json()
+        requests += 4
+        scene_models.append(urls)
+    response = client.post('/save-scene', json={'models': scene_models})
+    assert response.status_code == 200, response.get_json()
+    return requests + 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', type=int, default=50)
+    parser.add_argument('--obj-mb', type=float, default=2)
+    parser.add_argument('--texture-mb', type=float, default=1)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='bench-import-')
+    # app 在导入时按 DATA_DIR 建立各目录和数据库，必须在导入前设置
+    os.environ['DATA_DIR'] = data_dir
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import app as app_module
+    try:
+        obj_bytes, texture_bytes = int(args.obj_mb * 1024 * 1024), int(args.texture_mb * 1024 * 1024)
+        _, models = make_archive(data_dir, 'per-file', args.models, obj_bytes, texture_bytes, 0)
+        path, _ = make_archive(data_dir, 'import', args.models, obj_bytes, texture_bytes, args.models)
+        with zipfile.ZipFile(path) as zf:
+            extracted = sum(info.file_size for info in zf.infolist())
+        results = {'models': args.models, 'archive_bytes': os.path.getsize(path), 'extracted_bytes': extracted,
+                   'modes': []}
+        # 每种方式只运行一次：再次写入相同内容时存储会直接复用已有文件，计时不再反映实际写入
+        for name, func in (('per-file /upload + /save-scene', lambda: per_file(app_module, models)),
+                           ('/import-scenes', lambda: import_archive(app_module, path))):
+            drain(app_module)
+            reset_peak_rss()
+            start = time.perf_counter()
+            requests = func()
+            elapsed = time.perf_counter() - start
+            results['modes'].append({'mode': name, 'requests': requests, 'seconds': round(elapsed, 3),
+                                     'models_per_second': round(args.models / elapsed, 1),
+                                     'mb_per_second': round(extracted / elapsed / 1e6, 1),
+                                     'peak_rss_mb': peak_rss_mb()})
+        drain(app_module)
+    finally:
+        app_module.job_queue.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
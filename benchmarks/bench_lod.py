@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mesh_utils
+from benchmarks.synthetic import write_obj
+
+# LOD 简化吞吐量随网格规模的变化
+# 用法: python benchmarks/bench_lod.py --sizes-mb 2 8 32 128
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes-mb', type=int, nargs='+', default=[2, 8, 32, 128])
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes_mb:
+            path = os.path.join(tmp, f'{size_mb}.obj')
+            write_obj(path, size_mb * 1024 * 1024)
+            start = time.perf_counter()
+            buffers = mesh_utils.to_buffers(mesh_utils.parse_obj(path))
+            parse_seconds = time.perf_counter() - start
+            face_count = len(buffers[3]) // 3
+            for level in mesh_utils.LOD_LEVELS:
+                target = max(1, face_count * level // 100)
+                start = time.perf_counter()
+                simplified = mesh_utils.simplify(*buffers, target)
+                seconds = time.perf_counter() - start
+                results.append({
+                    'size_mb': size_mb,
+                    'faces': face_count,
+                    'parse_seconds': round(parse_seconds, 3),
+                    'level': level,
+                    'target_faces': target,
+                    'output_faces': len(simplified[3]) // 3,
+                    'seconds': round(seconds, 3),
+                    'input_faces_per_second': round(face_count / seconds),
+                })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
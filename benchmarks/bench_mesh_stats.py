@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mesh_utils
+from benchmarks.synthetic import write_obj
+
+# 网格统计的单核吞吐（MB/s），并与完整解析 parse_obj 后计算的表面积核对
+# 用法: python benchmarks/bench_mesh_stats.py --sizes-mb 16 100
+
+
+def reference_area(path):
+    mesh = mesh_utils.parse_obj(path)
+    faces = mesh.face_v[mesh_utils.valid_triangles(mesh)]
+    p = mesh.vertices.astype(np.float64)[faces]
+    return float(np.linalg.norm(np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]), axis=1).sum() / 2)
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes-mb', type=int, nargs='+', default=[16, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes_mb:
+            path = os.path.join(tmp, f'{size_mb}.obj')
+            write_obj(path, size_mb * 1024 * 1024)
+            megabytes = os.path.getsize(path) / 1e6
+            stats, seconds = best_of(lambda: mesh_utils.mesh_stats(path), args.repeat)
+            _, parse_seconds = best_of(lambda: mesh_utils.parse_obj(path), 1)
+            area = reference_area(path)
+            results.append({
+                'obj_mb': round(megabytes, 1),
+                'triangles': stats['triangles'],
+                'stats_seconds': round(seconds, 3),
+                'stats_mb_per_second': round(megabytes / seconds, 1),
+                'parse_obj_mb_per_second': round(megabytes / parse_seconds, 1),
+                'surface_area_matches': bool(np.isclose(stats['surfaceArea'], area, rtol=1e-4)),
+                'valid': stats['validity']['valid'],
+            })
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
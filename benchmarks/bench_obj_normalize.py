@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mesh_utils
+from benchmarks.synthetic import write_obj
+
+# 对比上传时的 OBJ 材质声明检查：旧实现（整读整写）与流式实现的耗时和峰值内存
+# 用法: python benchmarks/bench_obj_normalize.py --size-mb 128
+
+
+def legacy_normalize(src, dst):
+    # app.py 原来的做法：保存后整体读回、split、插入、整体写回
+    with open(src, 'rb') as f, open(dst, 'wb') as out:
+        out.write(f.read())
+    with open(dst, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if 'usemtl material_0' not in content:
+        lines = content.split('\n')
+        insert_index = 0
+        for i, line in enumerate(lines):
+            if line.startswith('mtllib'):
+                insert_index = i + 1
+                break
+        lines.insert(insert_index, 'usemtl material_0')
+        with open(dst, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+
+def streaming_normalize(src, dst):
+    with open(src, 'rb') as f, open(dst, 'wb') as out:
+        normalizer = mesh_utils.normalize_obj(f, out)
+    if normalizer.needs_rewrite:
+        normalizer.rewrite(dst)
+
+
+def run_one(mode, src, dst):
+    start = time.perf_counter()
+    (legacy_normalize if mode == 'legacy' else streaming_normalize)(src, dst)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss 在 Linux 上以 KB 为单位
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': elapsed, 'peak_rss_kb': peak}))
+
+
+def files_equal(a, b):
+    if os.path.getsize(a) != os.path.getsize(b):
+        return False
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        for chunk in iter(lambda: fa.read(mesh_utils.CHUNK_SIZE), b''):
+            if chunk != fb.read(len(chunk)):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, default=128)
+    parser.add_argument('--run', nargs=3, metavar=('MODE', 'SRC', 'DST'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run_one(*args.run)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for usemtl in (False, True):
+            src = os.path.join(tmp, 'model.obj')
+            size = write_obj(src, args.size_mb * 1024 * 1024, usemtl=usemtl)
+            outputs = {}
+            for mode in ('legacy', 'streaming'):
+                dst = os.path.join(tmp, f'{mode}.obj')
+                # 每种实现在独立进程中运行，峰值内存互不干扰
+                proc = subprocess.run([sys.executable, __file__, '--run', mode, src, dst],
+                                      check=True, capture_output=True, text=True)
+                result = json.loads(proc.stdout)
+                result.update({'mode': mode, 'usemtl_present': usemtl, 'bytes': size})
+                results.append(result)
+                outputs[mode] = dst
+            same = files_equal(outputs['legacy'], outputs['streaming'])
+            for result in results[-2:]:
+                result['identical_output'] = same
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
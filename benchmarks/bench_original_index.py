@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from original_index import OriginalImageIndex
+
+# 原图查找延迟：SQLite 索引与原来的 os.listdir 扫描对比
+# 用法: python benchmarks/bench_original_index.py --counts 10 1000 100000
+
+
+def legacy_lookup(folder, scene_name, model_index):
+    for filename in os.listdir(folder):
+        if filename.startswith(f"{scene_name}_model_{model_index}_"):
+            return filename
+    return None
+
+
+def measure(func, keys):
+    samples = []
+    for scene, index in keys:
+        start = time.perf_counter()
+        func(scene, index)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {'p50_us': round(statistics.median(samples), 1),
+            'p99_us': round(sorted(samples)[int(len(samples) * 0.99)], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = []
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = os.path.join(tmp, 'original_images')
+            os.makedirs(folder)
+            for i in range(count):
+                open(os.path.join(folder, f'scene-{i // 2}_model_{i % 2}_image.jpg'), 'wb').close()
+            start = time.perf_counter()
+            index = OriginalImageIndex(os.path.join(tmp, 'index.db'), folder)
+            build_seconds = time.perf_counter() - start
+            keys = [(f'scene-{i // 2}', i % 2) for i in (rng.randrange(count) for _ in range(args.lookups))]
+            # listdir 扫描在大目录上很慢，只取少量样本
+            legacy_keys = keys[:max(20, args.lookups * 100 // count)]
+            results.append({
+                'images': count,
+                'index_build_seconds': round(build_seconds, 3),
+                'index': measure(index.get, keys),
+                'listdir': measure(lambda scene, i: legacy_lookup(folder, scene, i), legacy_keys),
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
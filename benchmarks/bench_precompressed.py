@@ -0,0 +1,72 @@
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asset_store
+from benchmarks.synthetic import write_obj
+
+# 每个请求的传输字节数和服务端 CPU：原始 OBJ、预压缩副本、以及每次请求现场压缩
+# 用法: python benchmarks/bench_precompressed.py --size-mb 32
+
+
+def send(path):
+    # 模拟服务器把文件读出发送
+    with open(path, 'rb') as f:
+        for _ in iter(lambda: f.read(asset_store.CHUNK_SIZE), b''):
+            pass
+    return os.path.getsize(path)
+
+
+def gzip_on_the_fly(path):
+    size = 0
+    with open(path, 'rb') as f:
+        compressor = gzip.compress
+        for chunk in iter(lambda: f.read(asset_store.CHUNK_SIZE), b''):
+            size += len(compressor(chunk, compresslevel=6))
+    return size
+
+
+def measure(func, path, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        size = func(path)
+    return size, (time.process_time() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.obj')
+        write_obj(path, args.size_mb * 1024 * 1024)
+        blob_folder = os.path.join(tmp, 'blobs')
+        digest = asset_store.file_digest(path)
+        start = time.process_time()
+        asset_store.precompress(path, blob_folder, digest)
+        ingest_cpu = time.process_time() - start
+
+        cases = [('raw', send, path), ('gzip (request-time, level 6)', gzip_on_the_fly, path)]
+        for encoding in asset_store.available_encodings():
+            sidecar = asset_store.derived_path(blob_folder, digest, asset_store.COMPRESSED_SUFFIXES[encoding])
+            cases.append((f'{encoding} (precompressed)', send, sidecar))
+
+        results = {'obj_bytes': os.path.getsize(path), 'one_time_ingest_cpu_seconds': round(ingest_cpu, 3),
+                   'per_request': []}
+        for name, func, target in cases:
+            size, cpu = measure(func, target, args.repeat)
+            results['per_request'].append({'variant': name, 'bytes_on_wire': size,
+                                           'ratio': round(results['obj_bytes'] / size, 2),
+                                           'cpu_ms': round(cpu * 1000, 2)})
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from original_index import OriginalImageIndex
+from scene_catalog import SceneCatalog
+
+# 场景列表单页延迟：场景索引的键集分页与原来的 os.listdir 扫描对比
+# 用法: python benchmarks/bench_scene_catalog.py --counts 10 1000 100000 --limit 50
+
+
+def legacy_page(folder, limit):
+    # 原实现：扫描目录、排序后返回文件名（排序/分页只能在全部结果上做）
+    names = sorted((name for name in os.listdir(folder) if name.endswith('.json')), reverse=True)
+    return names[:limit]
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {'p50_us': round(statistics.median(samples), 1),
+            'p99_us': round(sorted(samples)[int(len(samples) * 0.99)], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 1000, 10000, 100000])
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = []
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = os.path.join(tmp, 'scenes')
+            os.makedirs(folder)
+            for i in range(count):
+                models = [{'objFile': f'/uploads/{i}/model{j}.obj'} for j in range(rng.randint(1, 4))]
+                with open(os.path.join(folder, f'scene-{i:06d}.json'), 'w', encoding='utf-8') as f:
+                    json.dump({'models': models}, f)
+            database = os.path.join(tmp, 'index.db')
+            os.makedirs(os.path.join(tmp, 'original_images'))
+            originals = OriginalImageIndex(database, os.path.join(tmp, 'original_images'))
+            start = time.perf_counter()
+            catalog = SceneCatalog(database, folder, lambda url: None, originals)
+            build_seconds = time.perf_counter() - start
+
+            # 取一个中间位置的游标，测量深翻页
+            _, deep_cursor = catalog.page('models', True, limit=max(count // 2, 1))
+            results.append({
+                'scenes': count,
+                'index_build_seconds': round(build_seconds, 3),
+                'first_page': measure(lambda: catalog.page('name', True, limit=args.limit), args.pages),
+                'deep_page_by_models': measure(
+                    lambda: catalog.page('models', True, cursor=deep_cursor, limit=args.limit), args.pages),
+                'prefix_page': measure(
+                    lambda: catalog.page('name', False, prefix='scene-0000', limit=args.limit), args.pages),
+                'listdir': measure(lambda: legacy_page(folder, args.limit), max(5, args.pages * 100 // count)),
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
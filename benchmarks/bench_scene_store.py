@@ -0,0 +1,80 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from werkzeug.datastructures import FileStorage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scene_store
+from original_index import OriginalImageIndex
+
+# 场景存储吞吐：files 与 sqlite 两种后端的保存、重命名（含原图）、列出并读取全部场景
+# 用法: python benchmarks/bench_scene_store.py --scenes 1000 --originals 2
+
+
+def scene_data(i, models):
+    return {'models': [{'objFile': f'/uploads/{i}/model{j}.obj', 'mtlFile': f'/uploads/{i}/model{j}.mtl',
+                        'textureFile': f'/uploads/{i}/model{j}.jpg',
+                        'position': {'x': j, 'y': 0, 'z': 0}, 'rotation': {'x': 0, 'y': 0, 'z': 0},
+                        'scale': {'x': 1, 'y': 1, 'z': 1}, 'wireframe': False, 'brightness': 1}
+                       for j in range(models)]}
+
+
+def timed(func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    return {'seconds': round(elapsed, 3), 'per_second': round(count / elapsed, 1)}
+
+
+def run(backend, tmp, args):
+    originals_folder = os.path.join(tmp, 'original_images')
+    os.makedirs(originals_folder)
+    originals = OriginalImageIndex(os.path.join(tmp, 'index.db'), originals_folder)
+    store = scene_store.open_store(backend, os.path.join(tmp, 'scenes'), originals)
+    count = args.scenes
+
+    def save():
+        for i in range(count):
+            # 原图先以临时场景名上传，保存时移到场景名下
+            for j in range(args.originals):
+                originals.save(f'temp_{i}', j, 'image.jpg', FileStorage(io.BytesIO(b'jpeg')))
+            store.save(f'scene-{i}.json', scene_data(i, args.models), [f'temp_{i}'])
+
+    def rename():
+        for i in range(count):
+            store.rename(f'scene-{i}.json', f'renamed-{i}.json')
+
+    def list_all():
+        for filename in store.names():
+            store.load(filename)
+
+    return {
+        'backend': backend,
+        # 保存的计时包含原图上传，单独列出便于扣除
+        'upload_originals_and_save': timed(save, count),
+        'rename': timed(rename, count),
+        'list_and_load': timed(list_all, count),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenes', type=int, default=1000)
+    parser.add_argument('--models', type=int, default=4)
+    parser.add_argument('--originals', type=int, default=2)
+    args = parser.parse_args()
+
+    results = []
+    for backend in scene_store.BACKENDS:
+        with tempfile.TemporaryDirectory() as tmp:
+            results.append(run(backend, tmp, args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import os
+import io
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asset_store
+import textures
+
+# 贴图派生文件：生成各级缩小副本和 WebP 副本的耗时，以及各副本相对原图的字节数
+# 需要 Pillow；用法: python benchmarks/bench_textures.py --size 4096
+
+
+def synthetic_texture(size):
+    # 带噪声的渐变与格子，接近扫描贴图的压缩难度
+    rng = np.random.default_rng(0)
+    y, x = np.indices((size, size))
+    base = np.stack(((x * 255 // size), (y * 255 // size), ((x // 64 + y // 64) % 2) * 120 + 60), axis=-1)
+    return np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=4096)
+    args = parser.parse_args()
+    if not textures.available():
+        print(json.dumps({'error': '需要安装 Pillow'}))
+        return
+
+    from PIL import Image
+    with tempfile.TemporaryDirectory() as tmp:
+        buf = io.BytesIO()
+        Image.fromarray(synthetic_texture(args.size)).save(buf, 'JPEG', quality=92)
+        digest = hashlib.sha256(buf.getvalue()).hexdigest()
+        path = asset_store.blob_path(tmp, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(buf.getvalue())
+        start = time.perf_counter()
+        manifest = textures.build_variants(path, tmp, digest)
+        seconds = time.perf_counter() - start
+        original = os.path.getsize(path)
+        variants = [{
+            'size': variant['size'] or 'full',
+            'format': variant['format'],
+            'bytes': os.path.getsize(textures.variant_path(tmp, digest, variant['size'], variant['format'])),
+        } for variant in manifest['variants']]
+        for variant in variants:
+            variant['ratio'] = round(variant['bytes'] / original, 4)
+        print(json.dumps({'source': f'{args.size}x{args.size}', 'original_bytes': original,
+                          'build_seconds': round(seconds, 3), 'variants': variants}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
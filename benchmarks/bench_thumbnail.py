@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import thumbnail
+
+# 缩略图渲染耗时：闭合曲面（环面，有遮挡和背面）上 4 个视角的 2x2 模型缩略图
+# 目标：20 万个三角形在 1 秒内完成（单核 CPU）
+# 用法: python benchmarks/bench_thumbnail.py --faces 50000 200000 1000000
+
+
+def torus(faces):
+    # 生成约 faces 个三角形的起伏环面，返回 (位置, 面, 每个角点的 UV)
+    minor = max(8, int(np.sqrt(faces / 2 / 2.5)))
+    major = max(8, faces // 2 // minor)
+    u = np.linspace(0, 2 * np.pi, major, endpoint=False)
+    v = np.linspace(0, 2 * np.pi, minor, endpoint=False)
+    uu, vv = np.meshgrid(u, v, indexing='ij')
+    r = 0.35 + 0.05 * np.sin(7 * uu)
+    positions = np.stack(((1 + r * np.cos(vv)) * np.cos(uu), r * np.sin(vv), (1 + r * np.cos(vv)) * np.sin(uu)),
+                         axis=-1).reshape(-1, 3).astype(np.float32)
+    uvs = np.stack((uu / (2 * np.pi), vv / (2 * np.pi)), axis=-1).reshape(-1, 2).astype(np.float32)
+    i, j = np.meshgrid(np.arange(major), np.arange(minor), indexing='ij')
+    a = i * minor + j
+    b = (i + 1) % major * minor + j
+    c = i * minor + (j + 1) % minor
+    d = (i + 1) % major * minor + (j + 1) % minor
+    faces = np.concatenate((np.stack((a, b, c), axis=-1).reshape(-1, 3), np.stack((b, d, c), axis=-1).reshape(-1, 3)))
+    return positions, faces, uvs[faces]
+
+
+def checker(size=256, cells=8):
+    cell = (np.arange(size) * cells // size) % 2
+    pattern = cell[:, None] ^ cell[None, :]
+    return np.where(pattern[..., None] == 1, [200, 90, 40], [240, 220, 180]).astype(np.uint8)
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--faces', type=int, nargs='+', default=[50000, 200000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='把最后一个网格的缩略图写入此 PNG 文件')
+    args = parser.parse_args()
+
+    results = []
+    for count in args.faces:
+        positions, faces, corner_uvs = torus(count)
+        image, flat_seconds = best_of(lambda: thumbnail.model_thumbnail(positions, faces), args.repeat)
+        _, textured_seconds = best_of(
+            lambda: thumbnail.model_thumbnail(positions, faces, corner_uvs, checker()), args.repeat)
+        results.append({
+            'faces': len(faces),
+            'views': len(thumbnail.VIEWS),
+            'view_pixels': thumbnail.VIEW_SIZE * thumbnail.SUPERSAMPLE,
+            'flat_seconds': round(flat_seconds, 3),
+            'textured_seconds': round(textured_seconds, 3),
+            'under_1s': textured_seconds < 1.0,
+        })
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.write(thumbnail.encode_png(image))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import os
+import math
+import random
+
+# 基准测试用的合成 OBJ/MTL/贴图生成器
+
+# 每个网格顶点大约对应的 OBJ 字节数（v/vt/vn 各一行加两个三角面）
+BYTES_PER_GRID_VERTEX = 208
+
+
+def write_obj(path, target_bytes, usemtl=False, seed=0):
+    # 生成约 target_bytes 字节的起伏网格曲面，按真实导出文件的顺序分块写入 v/vt/vn/f
+    rng = random.Random(seed)
+    side = max(2, int(math.sqrt(target_bytes / BYTES_PER_GRID_VERTEX)))
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('mtllib model.mtl\n')
+        if usemtl:
+            f.write('usemtl material_0\n')
+        for row in range(side):
+            z = row / (side - 1) * 2 - 1
+            lines = []
+            for col in range(side):
+                x = col / (side - 1) * 2 - 1
+                y = 0.1 * math.sin(3 * x) * math.cos(3 * z) + rng.uniform(-1e-3, 1e-3)
+                lines.append(f'v {x:.6f} {y:.6f} {z:.6f}\n')
+            f.write(''.join(lines))
+        for row in range(side):
+            f.write(''.join(f'vt {col / (side - 1):.6f} {row / (side - 1):.6f}\n' for col in range(side)))
+        for row in range(side):
+            z = row / (side - 1) * 2 - 1
+            lines = []
+            for col in range(side):
+                x = col / (side - 1) * 2 - 1
+                nx, ny, nz = -0.3 * math.cos(3 * x) * math.cos(3 * z), 1.0, 0.3 * math.sin(3 * x) * math.sin(3 * z)
+                length = math.sqrt(nx * nx + ny * ny + nz * nz)
+                lines.append(f'vn {nx / length:.6f} {ny / length:.6f} {nz / length:.6f}\n')
+            f.write(''.join(lines))
+        for row in range(side - 1):
+            lines = []
+            for col in range(side - 1):
+                a = row * side + col + 1
+                b, c, d = a + 1, a + side, a + side + 1
+                lines.append(f'f {a}/{a}/{a} {c}/{c}/{c} {b}/{b}/{b}\n')
+                lines.append(f'f {b}/{b}/{b} {c}/{c}/{c} {d}/{d}/{d}\n')
+            f.write(''.join(lines))
+    return os.path.getsize(path)
+
+
+def write_mtl(path, texture_name='model.jpg'):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('newmtl material_0\nKa 0.1 0.1 0.1\nKd 1.0 1.0 1.0\nillum 2\n')
+        f.write(f'map_Kd {texture_name}\n')
+
+
+def write_texture(path, size_bytes, seed=0):
+    # 随机字节模拟已压缩的贴图（JPEG 头 + 不可压缩数据）
+    rng = random.Random(seed)
+    with open(path, 'wb') as f:
+        f.write(b'\xff\xd8\xff\xe0')
+        remaining = size_bytes - 4
+        while remaining > 0:
+            n = min(remaining, 1024 * 1024)
+            f.write(rng.randbytes(n))
+            remaining -= n
@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import metrics
+
+# 分块上传：每个上传在 <folder>/<上传ID>/ 下保存元数据、预分配大小的数据文件，
+# 以及每个已接收分块的标记文件；各分块用 pwrite 写入各自的区间，可以并行上传、断点续传
+
+CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+# 超过这个时间没有完成的上传会被清理
+EXPIRE_SECONDS = 24 * 3600
+
+_UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ChunkError(Exception):
+    pass
+
+
+class UploadNotFound(ChunkError):
+    pass
+
+
+def _upload_dir(folder, upload_id):
+    if not _UPLOAD_ID_PATTERN.match(upload_id or ''):
+        raise ChunkError('无效的上传ID')
+    path = os.path.join(folder, upload_id)
+    if not os.path.isdir(path):
+        raise UploadNotFound('上传不存在或已过期')
+    return path
+
+
+def data_path(folder, upload_id):
+    return os.path.join(_upload_dir(folder, upload_id), 'data.part')
+
+
+def load_meta(folder, upload_id):
+    with open(os.path.join(_upload_dir(folder, upload_id), 'meta.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def create(folder, filename, size, chunk_size=CHUNK_SIZE, sha256=None):
+    if size < 0:
+        raise ChunkError('文件大小无效')
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ChunkError(f'分块大小必须在 1 到 {MAX_CHUNK_SIZE} 字节之间')
+    cleanup(folder)
+    upload_id = uuid.uuid4().hex
+    path = os.path.join(folder, upload_id)
+    os.makedirs(os.path.join(path, 'chunks'))
+    # 预分配（稀疏）文件，分块直接写到最终位置，完成时不需要再拼接
+    with open(os.path.join(path, 'data.part'), 'wb') as f:
+        f.truncate(size)
+    meta = {
+        'filename': filename,
+        'size': size,
+        'chunk_size': chunk_size,
+        'chunk_count': (size + chunk_size - 1) // chunk_size,
+        'sha256': sha256,
+        'created': time.time(),
+    }
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return upload_id, meta
+
+
+def write_chunk(folder, upload_id, offset, stream, checksum=None):
+    # 边读请求体边写入并计算校验和，校验通过后才记录该分块
+    meta = load_meta(folder, upload_id)
+    chunk_size = meta['chunk_size']
+    if offset < 0 or offset % chunk_size or offset >= max(meta['size'], 1):
+        raise ChunkError('分块偏移无效')
+    expected = min(chunk_size, meta['size'] - offset)
+    index = offset // chunk_size
+    sha = hashlib.sha256()
+    written = 0
+    fd = os.open(data_path(folder, upload_id), os.O_WRONLY)
+    try:
+        for data in iter(lambda: stream.read(READ_SIZE), b''):
+            if written + len(data) > expected:
+                raise ChunkError('分块数据超出长度')
+            os.pwrite(fd, data, offset + written)
+            sha.update(data)
+            written += len(data)
+    finally:
+        os.close(fd)
+    if written != expected:
+        raise ChunkError(f'分块长度不符: 期望 {expected}，收到 {written}')
+    if checksum and checksum.lower() != sha.hexdigest():
+        raise ChunkError('分块校验和不匹配')
+    open(os.path.join(_upload_dir(folder, upload_id), 'chunks', str(index)), 'wb').close()
+    return index
+
+
+def received_chunks(folder, upload_id):
+    with metrics.fs_timer('listdir'):
+        names = os.listdir(os.path.join(_upload_dir(folder, upload_id), 'chunks'))
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def progress(folder, upload_id):
+    meta = load_meta(folder, upload_id)
+    received = received_chunks(folder, upload_id)
+    received_set = set(received)
+    received_bytes = sum(min(meta['chunk_size'], meta['size'] - i * meta['chunk_size']) for i in received)
+    return {
+        'uploadId': upload_id,
+        'filename': meta['filename'],
+        'size': meta['size'],
+        'chunkSize': meta['chunk_size'],
+        'chunkCount': meta['chunk_count'],
+        'receivedChunks': received,
+        'missingChunks': [i for i in range(meta['chunk_count']) if i not in received_set],
+        'receivedBytes': received_bytes,
+    }
+
+
+def check_complete(folder, upload_id):
+    # 返回 (元数据, 数据文件路径)；分块未齐或整体校验失败时抛出 ChunkError
+    info = progress(folder, upload_id)
+    if info['missingChunks']:
+        raise ChunkError(f"还有 {len(info['missingChunks'])} 个分块未上传")
+    meta = load_meta(folder, upload_id)
+    path = data_path(folder, upload_id)
+    if meta.get('sha256'):
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(READ_SIZE), b''):
+                sha.update(data)
+        if sha.hexdigest() != meta['sha256'].lower():
+            raise ChunkError('文件校验和不匹配')
+    return meta, path
+
+
+def remove(folder, upload_id):
+    shutil.rmtree(_upload_dir(folder, upload_id), ignore_errors=True)
+
+
+def cleanup(folder, max_age=EXPIRE_SECONDS):
+    now = time.time()
+    for name in os.listdir(folder) if os.path.isdir(folder) else []:
+        path = os.path.join(folder, name)
+        if _UPLOAD_ID_PATTERN.match(name) and now - os.path.getmtime(path) > max_age:
+            shutil.rmtree(path, ignore_errors=True)
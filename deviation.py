@@ -0,0 +1,232 @@
+import os
+import json
+import hashlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# 网格偏差：源网格每个顶点到目标网格表面的最近距离（点到三角形的精确距离）。
+# 目标三角形按质心的 Morton 码排序，构成隐式的二叉 BVH（叶子为 LEAF_SIZE 个相邻三角形），
+# 查询按块向量化，自顶向下逐层展开并用包围盒下界剪枝；各块在线程池中并行（numpy 运算期间释放 GIL）
+
+DEVIATION_VERSION = 1
+DISTANCE_SUFFIX = f'.dev.v{DEVIATION_VERSION}.f32'
+SUMMARY_SUFFIX = f'.dev.v{DEVIATION_VERSION}.json'
+
+LEAF_SIZE = 8
+# 每块查询的顶点数，限制展开后的临时数组大小
+QUERY_CHUNK = 8192
+DEFAULT_BINS = 32
+MAX_BINS = 1024
+# 填充三角形的坐标：平方后仍在 float32 范围内，距离远大于任何真实距离
+_FAR = np.float32(1e18)
+
+
+def pair_key(digest_from, digest_to):
+    # 有方向的缓存键：digest_from 网格的顶点到 digest_to 网格表面的距离
+    return hashlib.sha256(f'deviation:{digest_from}:{digest_to}'.encode('utf-8')).hexdigest()
+
+
+def _spread_bits(values):
+    # 10 位整数的各位之间插入两个 0，用于交织三个坐标
+    v = values.astype(np.uint32) & 0x3ff
+    v = (v | (v << 16)) & 0x030000ff
+    v = (v | (v << 8)) & 0x0300f00f
+    v = (v | (v << 4)) & 0x030c30c3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+
+def _morton(points, origin, extent):
+    cell = np.clip((points - origin) / extent * 1023, 0, 1023)
+    return (_spread_bits(cell[:, 0]) << 2) | (_spread_bits(cell[:, 1]) << 1) | _spread_bits(cell[:, 2])
+
+
+def _dot(u, v):
+    return np.einsum('ij,ij->i', u, v)
+
+
+def point_triangle_distance2(p, a, b, c):
+    # 点到三角形最近点距离的平方（Ericson《Real-Time Collision Detection》5.1.5 的分区方法，向量化）
+    # 最近点表示为 a + v * ab + w * ac，按区域优先级从低到高依次覆盖 (v, w)
+    ab = b - a
+    ac = c - a
+    ap = p - a
+    d1 = _dot(ab, ap)
+    d2 = _dot(ac, ap)
+    bp = p - b
+    d3 = _dot(ab, bp)
+    d4 = _dot(ac, bp)
+    cp = p - c
+    d5 = _dot(ab, cp)
+    d6 = _dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    def ratio(num, den):
+        # 退化三角形的分母可能为 0，此时取 0（结果仍是三角形上的点）
+        safe = np.where(den != 0, den, 1)
+        return np.where(den != 0, num / safe, 0)
+
+    # 面内部
+    v = ratio(vb, va + vb + vc)
+    w = ratio(vc, va + vb + vc)
+    # 边 BC
+    bc = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+    t = ratio(d4 - d3, (d4 - d3) + (d5 - d6))
+    v = np.where(bc, 1 - t, v)
+    w = np.where(bc, t, w)
+    # 边 AC
+    edge_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+    v = np.where(edge_ac, 0, v)
+    w = np.where(edge_ac, ratio(d2, d2 - d6), w)
+    # 顶点 C
+    vertex_c = (d6 >= 0) & (d5 <= d6)
+    v = np.where(vertex_c, 0, v)
+    w = np.where(vertex_c, 1, w)
+    # 边 AB
+    edge_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+    v = np.where(edge_ab, ratio(d1, d1 - d3), v)
+    w = np.where(edge_ab, 0, w)
+    # 顶点 B
+    vertex_b = (d3 >= 0) & (d4 <= d3)
+    v = np.where(vertex_b, 1, v)
+    w = np.where(vertex_b, 0, w)
+    # 顶点 A
+    vertex_a = (d1 <= 0) & (d2 <= 0)
+    v = np.where(vertex_a, 0, v)
+    w = np.where(vertex_a, 0, w)
+
+    diff = ap - v[:, None] * ab - w[:, None] * ac
+    return _dot(diff, diff)
+
+
+class TriangleBVH:
+    def __init__(self, positions, faces):
+        positions = np.asarray(positions, dtype=np.float32)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        tri = positions[faces]
+        self.empty = not len(tri)
+        if len(tri):
+            self.origin = tri.reshape(-1, 3).min(axis=0)
+            self.extent = np.maximum(tri.reshape(-1, 3).max(axis=0) - self.origin, 1e-12)
+        else:
+            self.origin = np.zeros(3, dtype=np.float32)
+            self.extent = np.ones(3, dtype=np.float32)
+        codes = _morton(tri.mean(axis=1), self.origin, self.extent) if len(tri) else np.zeros(0, dtype=np.uint32)
+        order = np.argsort(codes, kind='stable')
+
+        # 叶子数补齐为 2 的幂，多出的位置用远处的退化三角形填充（距离极大，自然被剪枝）
+        leaves = max(1, -(-len(tri) // LEAF_SIZE))
+        self.depth = int(np.ceil(np.log2(leaves))) if leaves > 1 else 0
+        padded = (1 << self.depth) * LEAF_SIZE
+        sorted_tri = np.full((padded, 3, 3), _FAR, dtype=np.float32)
+        sorted_tri[:len(tri)] = tri[order]
+        self.codes = np.full(padded, np.iinfo(np.uint32).max, dtype=np.uint32)
+        self.codes[:len(tri)] = codes[order]
+        self.a = np.ascontiguousarray(sorted_tri[:, 0])
+        self.b = np.ascontiguousarray(sorted_tri[:, 1])
+        self.c = np.ascontiguousarray(sorted_tri[:, 2])
+
+        # 每层节点的包围盒，下标 0 为根
+        corners = sorted_tri.reshape(1 << self.depth, LEAF_SIZE * 3, 3)
+        lower = [corners.min(axis=1)]
+        upper = [corners.max(axis=1)]
+        for _ in range(self.depth):
+            lower.append(np.minimum(lower[-1][0::2], lower[-1][1::2]))
+            upper.append(np.maximum(upper[-1][0::2], upper[-1][1::2]))
+        self.lower = lower[::-1]
+        self.upper = upper[::-1]
+
+    def _leaf_distance2(self, points, query, leaf):
+        # query[i] 到 leaf[i] 中每个三角形的距离平方，返回 (查询序号, 距离平方)
+        q = np.repeat(query, LEAF_SIZE)
+        t = (leaf[:, None] * LEAF_SIZE + np.arange(LEAF_SIZE)).ravel()
+        return q, point_triangle_distance2(points[q], self.a[t], self.b[t], self.c[t])
+
+    def distance2(self, points):
+        points = np.asarray(points, dtype=np.float32)
+        n = len(points)
+        if self.empty:
+            return np.full(n, np.inf, dtype=np.float32)
+        # 初始上界：Morton 码相邻的叶子，与查询点在空间上通常也相近
+        guess = np.searchsorted(self.codes, _morton(points, self.origin, self.extent)) // LEAF_SIZE
+        guess = np.minimum(guess, (1 << self.depth) - 1)
+        best = np.full(n, np.inf, dtype=np.float32)
+        q, d2 = self._leaf_distance2(points, np.arange(n), guess)
+        np.minimum.at(best, q, d2)
+
+        query = np.arange(n)
+        node = np.zeros(n, dtype=np.int64)
+        for level in range(self.depth + 1):
+            if level:
+                query = np.repeat(query, 2)
+                node = (node[:, None] * 2 + np.arange(2)).ravel()
+            p = points[query]
+            gap = np.maximum(np.maximum(self.lower[level][node] - p, p - self.upper[level][node]), 0)
+            gap2 = _dot(gap, gap)
+            keep = gap2 <= best[query]
+            query = query[keep]
+            node = node[keep]
+            gap2 = gap2[keep]
+        # 叶子按包围盒下界从近到远分轮计算：先算最近的叶子收紧上界，其余叶子大多随之被剪掉
+        order = np.lexsort((gap2, query))
+        query, node, gap2 = query[order], node[order], gap2[order]
+        rank = np.arange(len(query)) - np.searchsorted(query, query)
+        round_ = 0
+        while len(query):
+            current = rank == round_
+            q, d2 = self._leaf_distance2(points, query[current], node[current])
+            np.minimum.at(best, q, d2)
+            rest = ~current & (gap2 <= best[query])
+            query, node, gap2, rank = query[rest], node[rest], gap2[rest], rank[rest]
+            round_ += 1
+        return best
+
+
+def nearest_distances(points, positions, faces, workers=None, progress=None):
+    # 每个点到 (positions, faces) 表面的最近距离；没有三角形时为 inf
+    points = np.asarray(points, dtype=np.float32)
+    bvh = TriangleBVH(positions, faces)
+    result = np.empty(len(points), dtype=np.float32)
+
+    def run(start):
+        stop = min(start + QUERY_CHUNK, len(points))
+        result[start:stop] = np.sqrt(bvh.distance2(points[start:stop]))
+        return stop
+
+    # 进度在调用线程中汇报（任务队列的进度回调不能跨线程使用数据库连接）
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for stop in executor.map(run, range(0, len(points), QUERY_CHUNK)):
+            if progress:
+                progress(stop / len(points))
+    return result
+
+
+def summarize(distances, positions, faces):
+    # 单方向的统计：顶点数、平均、均方根、最大（单向 Hausdorff）以及目标包围盒对角线长度
+    finite = distances[np.isfinite(distances)].astype(np.float64)
+    used = np.asarray(positions)[np.unique(np.asarray(faces).ravel())] if len(faces) else np.zeros((0, 3))
+    return {
+        'vertices': int(len(distances)),
+        'mean': float(finite.mean()) if len(finite) else None,
+        'rms': float(np.sqrt((finite ** 2).mean())) if len(finite) else None,
+        'max': float(finite.max()) if len(finite) else None,
+        'targetDiagonal': float(np.linalg.norm(used.max(axis=0) - used.min(axis=0))) if len(used) else 0.0,
+    }
+
+
+def histogram(distances, bins=DEFAULT_BINS, upper=None):
+    finite = distances[np.isfinite(distances)]
+    upper = float(upper if upper is not None else (finite.max() if len(finite) else 0.0)) or 1.0
+    counts, _ = np.histogram(finite, bins=bins, range=(0.0, upper))
+    return {'max': upper, 'counts': counts.tolist()}
+
+
+def read_summary(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_distances(path):
+    return np.fromfile(path, dtype='<f4')
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# 后台任务队列：任务记录保存在 SQLite 中，重启后继续执行未完成的任务；
+# 任务在进程池中运行，不占用请求线程，也不受 GIL 限制。
+# 同一种任务对同一个键（内容哈希）只保留一条记录，重复提交直接返回已有任务
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# 失败的任务重复提交时最多重试的次数
+MAX_ATTEMPTS = 3
+# 工作进程写入进度的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    args TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (kind, key)
+)
+'''
+
+_COLUMNS = ('id', 'kind', 'key', 'status', 'progress', 'message', 'error', 'attempts', 'created', 'updated')
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _update(conn, job_id, **fields):
+    fields['updated'] = time.time()
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    with conn:
+        conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+
+def _resolve_task(task):
+    module_name, func_name = task.split(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _run(db_path, job_id, task, args):
+    # 在工作进程中执行，状态和进度直接写入数据库
+    conn = _connect(db_path)
+    last_report = [0.0]
+
+    def progress(value, message=None):
+        now = time.monotonic()
+        if now - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = now
+            _update(conn, job_id, progress=round(min(max(value, 0.0), 1.0), 3), message=message)
+
+    try:
+        _update(conn, job_id, status=RUNNING, progress=0, message=None, error=None)
+        _resolve_task(task)(*args, progress=progress)
+        _update(conn, job_id, status=DONE, progress=1, message=None)
+    except Exception as e:
+        _update(conn, job_id, status=FAILED, error=str(e))
+    finally:
+        conn.close()
+
+
+class JobQueue:
+    def __init__(self, db_path, tasks, max_workers=None):
+        # tasks: {任务种类: 'module:function'}，函数签名为 func(*args, progress=None)
+        self.db_path = db_path
+        self.tasks = dict(tasks)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.local = threading.local()
+        self.pool_lock = threading.Lock()
+        # 恢复任务与提交新任务互斥：否则刚提交、尚未开始运行的任务会被恢复时再派发一次
+        self.submit_lock = threading.Lock()
+        self.pool = None
+        self.started = False
+        with self.connection() as conn:
+            conn.execute(_SCHEMA)
+
+    def connection(self):
+        # 每个线程使用独立连接（Flask 以 threaded=True 运行）
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = _connect(self.db_path)
+            self.local.conn = conn
+        return conn
+
+    def start(self):
+        # 开始执行任务并恢复上次退出时未完成的任务，只执行一次，返回恢复的任务数；
+        # 由提供服务的进程在建立应用时调用（工作进程和 debug 重载器的父进程都不应恢复任务）
+        with self.submit_lock:
+            if self.started:
+                return 0
+            self.started = True
+            conn = self.connection()
+            with conn:
+                conn.execute('UPDATE jobs SET status = ? WHERE status = ?', (QUEUED, RUNNING))
+                rows = conn.execute('SELECT id, kind, args FROM jobs WHERE status = ? ORDER BY created',
+                                    (QUEUED,)).fetchall()
+            for job_id, kind, args in rows:
+                self._dispatch(job_id, kind, json.loads(args))
+        return len(rows)
+
+    def _executor(self):
+        with self.pool_lock:
+            if self.pool is None:
+                # 使用 spawn：父进程有请求线程和数据库连接，fork 出的子进程可能继承被占用的锁
+                self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            return self.pool
+
+    def _dispatch(self, job_id, kind, args):
+        future = self._executor().submit(_run, self.db_path, job_id, self.tasks[kind], args)
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+
+    def _finished(self, job_id, future):
+        # 任务本身的异常在工作进程中记录；这里只处理工作进程崩溃等进程池错误
+        error = future.exception()
+        if error is None:
+            return
+        with self.pool_lock:
+            self.pool = None
+        _update(self.connection(), job_id, status=FAILED, error=f'工作进程异常: {error}')
+
+    def submit(self, kind, key, *args):
+        # 返回任务ID；相同 (kind, key) 的任务已排队、运行中或已完成时不重复执行。
+        # 队列尚未 start() 时只记录任务，启动时和其他未完成的任务一起派发
+        if kind not in self.tasks:
+            raise ValueError(f'未知的任务类型: {kind}')
+        now = time.time()
+        encoded = json.dumps(args, ensure_ascii=False)
+        conn = self.connection()
+        with self.submit_lock:
+            with conn:
+                inserted = conn.execute(
+                    'INSERT OR IGNORE INTO jobs (id, kind, key, args, status, created, updated) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (uuid.uuid4().hex, kind, key, encoded, QUEUED, now, now)).rowcount == 1
+                requeued = not inserted and conn.execute(
+                    'UPDATE jobs SET status = ?, args = ?, progress = 0, message = NULL, error = NULL, '
+                    'attempts = attempts + 1, updated = ? WHERE kind = ? AND key = ? AND status = ? AND attempts < ?',
+                    (QUEUED, encoded, now, kind, key, FAILED, MAX_ATTEMPTS - 1)).rowcount == 1
+                job_id = conn.execute('SELECT id FROM jobs WHERE kind = ? AND key = ?', (kind, key)).fetchone()[0]
+            if (inserted or requeued) and self.started:
+                self._dispatch(job_id, kind, list(args))
+        return job_id
+
+    def find(self, kind, key):
+        # 只读查询 (kind, key) 对应的任务，没有时返回 None；请求路径上先用它判断，避免每次都写数据库
+        row = self.connection().execute(
+            f'SELECT {", ".join(_COLUMNS)} FROM jobs WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def get(self, job_id):
+        row = self.connection().execute(
+            f'SELECT {", ".join(_COLUMNS)} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def list(self, status=None, limit=100):
+        query = f'SELECT {", ".join(_COLUMNS)} FROM jobs'
+        params = ()
+        if status:
+            query += ' WHERE status = ?'
+            params = (status,)
+        rows = self.connection().execute(query + ' ORDER BY updated DESC LIMIT ?', (*params, limit)).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def pending(self):
+        # 排队中和运行中的任务数
+        return self.connection().execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)',
+                                          (QUEUED, RUNNING)).fetchone()[0]
+
+    def shutdown(self, wait=True):
+        with self.pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import time
+import logging
+
+# 结构化日志：级别由环境变量 LOG_LEVEL 控制（默认 INFO），调试信息用 debug 级别，默认既不格式化也不输出。
+# 每条日志是一个事件名加若干字段；LOG_FORMAT=json 时每行输出一个 JSON 对象，否则为
+#   2024-11-18 14:30:45 INFO app 文件保存成功 path=uploads/... bytes=1024
+
+
+class Formatter(logging.Formatter):
+    def __init__(self, as_json=False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.created))
+        if self.as_json:
+            entry = {'time': timestamp, 'level': record.levelname, 'logger': record.name,
+                     'event': record.getMessage(), **fields}
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        line = f'{timestamp} {record.levelname} {record.name} {record.getMessage()}'
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class StructuredLogger:
+    # log.info('事件', key=value, ...)：先判断级别，未启用时只有一次整数比较
+    def __init__(self, logger):
+        self.logger = logger
+
+    def _log(self, level, event, fields, exc_info=False):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, extra={'fields': fields}, exc_info=exc_info)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+    def enabled(self, level):
+        return self.logger.isEnabledFor(level)
+
+
+_configured = False
+
+
+def setup(level=None, fmt=None):
+    # 只配置一次：日志输出到 stderr，级别和格式默认取环境变量
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(Formatter((fmt or os.environ.get('LOG_FORMAT', 'text')) == 'json'))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel((level or os.environ.get('LOG_LEVEL', 'INFO')).upper())
+
+
+def get(name):
+    return StructuredLogger(logging.getLogger(name))
@@ -0,0 +1,692 @@
+import os
+import re
+import struct
+import tempfile
+import numpy as np
+
+# OBJ 网格处理工具
+
+CHUNK_SIZE = 1024 * 1024
+USEMTL_LINE = b'usemtl material_0'
+# 在决定插入位置之前最多缓冲的文件开头字节数
+HEAD_LIMIT = 64 * 1024
+_MTLLIB_LINE = b'\nmtllib'
+_TAIL_SIZE = max(len(USEMTL_LINE), len(_MTLLIB_LINE)) - 1
+
+
+def _mtllib_insert_offset(head, at_eof):
+    # 返回插入 usemtl 的位置（第一行 mtllib 之后），mtllib 行不完整时返回 -1，没有 mtllib 时返回 None
+    if head.startswith(b'mtllib'):
+        start = 0
+    else:
+        start = head.find(_MTLLIB_LINE)
+        if start < 0:
+            last_line = head[head.rfind(b'\n') + 1:]
+            if not at_eof and last_line and b'mtllib'.startswith(last_line):
+                # 末尾可能是被截断的 mtllib，等下一块数据
+                return -1
+            return None
+        start += 1
+    end = head.find(b'\n', start)
+    if end < 0:
+        return len(head) if at_eof else -1
+    return end + 1
+
+
+class ObjNormalizer:
+    # 流式版本的材质声明检查：文件中不含 usemtl material_0 时，在第一行 mtllib 之后插入
+    # 只缓冲文件开头的一小段；开头没看到 usemtl 时乐观地先插入，结尾发现判断失误再逐行重写
+    def __init__(self, out):
+        self.out = out
+        self.head = bytearray()
+        self.decided = False
+        self.found = False
+        self.inserted_at = None
+        self.watch_mtllib = False
+        self.late_mtllib = False
+        self.tail = b''
+        self.needs_rewrite = False
+
+    def write(self, chunk):
+        window = self.tail + chunk
+        if USEMTL_LINE in window:
+            self.found = True
+        if self.watch_mtllib and _MTLLIB_LINE in window:
+            self.late_mtllib = True
+        self.tail = window[-_TAIL_SIZE:]
+
+        if self.decided:
+            self.out.write(chunk)
+            return
+        self.head += chunk
+        if self.found:
+            self._flush_head(None)
+        elif len(self.head) >= HEAD_LIMIT:
+            offset = _mtllib_insert_offset(self.head, False)
+            if offset is None:
+                # 开头没有 mtllib，先按原逻辑插在文件开头，之后留意是否出现 mtllib
+                self.watch_mtllib = True
+                self.tail = bytes(self.head[-_TAIL_SIZE:])
+                self._flush_head(0)
+            elif offset >= 0:
+                self._flush_head(offset)
+
+    def _flush_head(self, offset):
+        head = bytes(self.head)
+        self.head = bytearray()
+        self.decided = True
+        if offset is None:
+            self.out.write(head)
+            return
+        self.inserted_at = offset
+        self.out.write(head[:offset])
+        if offset == len(head) and head and not head.endswith(b'\n'):
+            # mtllib 是最后一行且没有换行符
+            self.out.write(b'\n' + USEMTL_LINE)
+        else:
+            self.out.write(USEMTL_LINE + b'\n')
+        self.out.write(head[offset:])
+
+    def close(self):
+        if not self.decided:
+            if self.found:
+                self._flush_head(None)
+            else:
+                offset = _mtllib_insert_offset(self.head, True)
+                self._flush_head(offset or 0)
+        elif self.inserted_at is not None and (self.found or self.late_mtllib):
+            self.needs_rewrite = True
+
+    @property
+    def inserted(self):
+        return not self.found
+
+    def rewrite(self, path):
+        # 乐观插入判断失误时的兜底：去掉已插入的行，再按最终结果逐行重写
+        tmp_path = path + '.fix'
+        insert = not self.found
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            pos = 0
+            for line in src:
+                line_start = pos
+                pos += len(line)
+                if line_start == self.inserted_at:
+                    continue
+                dst.write(line)
+                if insert and line.startswith(b'mtllib'):
+                    dst.write(USEMTL_LINE + b'\n' if line.endswith(b'\n') else b'\n' + USEMTL_LINE)
+                    insert = False
+        os.replace(tmp_path, path)
+        self.needs_rewrite = False
+
+
+def normalize_obj(stream, out):
+    normalizer = ObjNormalizer(out)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        normalizer.write(chunk)
+    normalizer.close()
+    return normalizer
+
+
+# ---- OBJ 解析与二进制网格格式 ----
+#
+# 二进制网格文件（.mesh）为小端序的平铺布局：
+#   头部 20 字节: magic 'MLVB' | uint32 版本 | uint32 标志位 | uint32 顶点数 | uint32 索引数
+#   float32 位置[顶点数 * 3]
+#   float32 法线[顶点数 * 3]   （标志位 bit0）
+#   float32 UV[顶点数 * 2]     （标志位 bit1）
+#   uint32  三角形索引[索引数]
+# 每个 (v, vt, vn) 组合对应一个输出顶点，可直接作为 BufferGeometry 的属性上传
+
+MESH_MAGIC = b'MLVB'
+MESH_VERSION = 1
+MESH_SUFFIX = f'.v{MESH_VERSION}.mesh'
+MESH_HAS_NORMALS = 1
+MESH_HAS_UVS = 2
+_MESH_HEADER = struct.Struct('<4sIIII')
+
+_LINE_V, _LINE_VT, _LINE_VN, _LINE_F, _LINE_USEMTL = 1, 2, 3, 4, 5
+_LINE_PREFIX = {_LINE_V: b'v', _LINE_VT: b'vt', _LINE_VN: b'vn', _LINE_F: b'f'}
+_COMMENT = re.compile(rb'#[^\n]*')
+_INDENT = re.compile(rb'(?m)^[ \t]+')
+
+
+class UnsupportedMesh(ValueError):
+    # 二进制网格格式表示不了的 OBJ（例如多个材质），前端改用 OBJLoader 加载原文件
+    pass
+
+
+class ObjMesh:
+    # 解析后的 OBJ：原始属性数组和三角化后的面索引（从 0 开始，缺失的属性为 None），
+    # materials 为带有面的 usemtl 材质名（第一个 usemtl 之前的面记为 None）
+    def __init__(self, vertices, texcoords, normals, face_v, face_t, face_n, materials=()):
+        self.vertices = vertices
+        self.texcoords = texcoords
+        self.normals = normals
+        self.face_v = face_v
+        self.face_t = face_t
+        self.face_n = face_n
+        self.materials = materials
+
+
+def _line_runs(data):
+    # 按行首标记把文件切成同类行的连续区段，逐段交给 numpy 批量解析。
+    # 行内注释（# 及之后的内容）先去掉；有行首空白时去掉后重新切分，使每行都以 v/vt/vn/f 等标记开头
+    if b'#' in data:
+        data = _COMMENT.sub(b'', data)
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(buf)]))
+    padded = np.concatenate((buf, np.zeros(2, dtype=np.uint8)))
+    c0 = padded[starts]
+    if ((c0 == ord(' ')) | (c0 == ord('\t'))).any():
+        yield from _line_runs(_INDENT.sub(b'', data))
+        return
+    c1 = padded[starts + 1]
+    space1 = (c1 == ord(' ')) | (c1 == ord('\t'))
+    codes = np.zeros(len(starts), dtype=np.int8)
+    codes[(c0 == ord('v')) & space1] = _LINE_V
+    codes[(c0 == ord('v')) & (c1 == ord('t'))] = _LINE_VT
+    codes[(c0 == ord('v')) & (c1 == ord('n'))] = _LINE_VN
+    codes[(c0 == ord('f')) & space1] = _LINE_F
+    codes[(c0 == ord('u')) & (c1 == ord('s'))] = _LINE_USEMTL
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    run_starts = np.concatenate(([0], boundaries))
+    run_ends = np.concatenate((boundaries, [len(codes)]))
+    for first, last in zip(run_starts, run_ends):
+        code = int(codes[first])
+        if code:
+            yield code, data[starts[first]:ends[last - 1]], int(last - first)
+
+
+def _parse_numbers(text, prefix, dtype):
+    if prefix == b'f':
+        text = text.replace(b'/', b' ')
+    return np.fromstring(text.replace(prefix, b' ' * len(prefix)), dtype=dtype, sep=' ')
+
+
+def _parse_rows(text, prefix, lines, width):
+    # 每行取前 width 个数；各行分量数一致时整段 reshape，否则（或含有非数字内容时）逐行解析
+    try:
+        numbers = _parse_numbers(text, prefix, np.float32)
+    except ValueError:
+        numbers = None
+    if numbers is not None and lines and len(numbers) % lines == 0 and len(numbers) // lines >= width:
+        return numbers.reshape(lines, -1)[:, :width]
+    rows = [_parse_row(line, width) for line in text.split(b'\n')]
+    return np.array([row + [0.0] * (width - len(row)) for row in rows], dtype=np.float32).reshape(-1, width)
+
+
+def _parse_row(line, width):
+    # 取行首标记之后的前 width 个数，遇到不是数字的内容为止
+    row = []
+    for token in line.split()[1:width + 1]:
+        try:
+            row.append(float(token))
+        except ValueError:
+            break
+    return row
+
+
+def _parse_faces(text, lines):
+    # 返回 (角点索引[角点数, 3]（v/vt/vn，缺失为 0）, 每个面的角点数)
+    # 按第一个角点的格式（v、v/vt、v//vn、v/vt/vn）整段解析；段内格式不一致时改为逐行解析
+    first_line = text[:text.find(b'\n')] if b'\n' in text else text
+    first_token = first_line.split()[1]
+    parts = first_token.split(b'/')
+    slots = [i for i, part in enumerate(parts) if part]
+    try:
+        numbers = _parse_numbers(text, b'f', np.int64)
+    except ValueError:
+        return _parse_faces_by_line(text)
+    width = len(slots)
+    if len(numbers) == lines * 3 * width:
+        counts = np.full(lines, 3, dtype=np.int64)
+    else:
+        counts = np.array([len(line.split()) - 1 for line in text.split(b'\n')], dtype=np.int64)
+    # 数字个数、斜杠数和 // 数都与第一个角点的格式相符，才说明整段格式一致
+    total = int(counts.sum())
+    if (total * width != len(numbers) or text.count(b'/') != total * (len(parts) - 1)
+            or text.count(b'//') != total * first_token.count(b'//')):
+        return _parse_faces_by_line(text)
+    corners = np.zeros((total, 3), dtype=np.int64)
+    corners[:, slots] = numbers.reshape(-1, width)
+    return corners, counts
+
+
+def _parse_faces_by_line(text):
+    # 逐行解析，跳过不是索引的内容
+    rows, counts = [], []
+    for line in text.split(b'\n'):
+        count = 0
+        for token in line.split()[1:]:
+            parts = token.split(b'/')[:3]
+            try:
+                row = [int(part) if part else 0 for part in parts]
+            except ValueError:
+                continue
+            if row[0] == 0:
+                continue
+            rows.append(row + [0] * (3 - len(parts)))
+            count += 1
+        counts.append(count)
+    return np.array(rows, dtype=np.int64).reshape(-1, 3), np.array(counts, dtype=np.int64)
+
+
+def _triangulate(counts):
+    # 多边形按扇形拆成三角形，返回每个三角形三个角点在角点数组中的位置
+    counts = np.maximum(counts, 2)
+    face_starts = np.cumsum(counts) - counts
+    tri_counts = counts - 2
+    face_of_tri = np.repeat(np.arange(len(counts)), tri_counts)
+    offset = np.arange(int(tri_counts.sum())) - np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts) + 1
+    a = face_starts[face_of_tri]
+    b = a + offset
+    return np.stack((a, b, b + 1), axis=1)
+
+
+def _resolve_relative(indices, count):
+    # 负数索引相对于面所在位置之前已定义的数量（-1 为最近定义的一个），转换为从 1 开始的索引；
+    # 超出范围的记为 -1，与表示缺失的 0 区分
+    resolved = np.where(indices < 0, indices + count + 1, indices)
+    resolved[(indices < 0) & (resolved <= 0)] = -1
+    return resolved
+
+
+def parse_obj(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    parts = {_LINE_V: [], _LINE_VT: [], _LINE_VN: []}
+    # 已读到的 v/vt/vn 数量，用于解析面中的负数（相对）索引
+    defined = {_LINE_V: 0, _LINE_VT: 0, _LINE_VN: 0}
+    corner_parts, count_parts = [], []
+    material, materials = None, []
+    for code, text, lines in _line_runs(data):
+        if code == _LINE_USEMTL:
+            tokens = text[text.rfind(b'\n') + 1:].split()
+            material = tokens[1].decode('utf-8', 'replace') if len(tokens) > 1 else ''
+        elif code == _LINE_F:
+            if material not in materials:
+                materials.append(material)
+            corners, counts = _parse_faces(text, lines)
+            if (corners < 0).any():
+                for column, kind in enumerate((_LINE_V, _LINE_VT, _LINE_VN)):
+                    corners[:, column] = _resolve_relative(corners[:, column], defined[kind])
+            corner_parts.append(corners)
+            count_parts.append(counts)
+        else:
+            width = 2 if code == _LINE_VT else 3
+            rows = _parse_rows(text, _LINE_PREFIX[code], lines, width)
+            parts[code].append(rows)
+            defined[code] += len(rows)
+    del data
+
+    def stack(code, width):
+        return np.concatenate(parts[code]) if parts[code] else np.zeros((0, width), dtype=np.float32)
+
+    vertices = stack(_LINE_V, 3)
+    texcoords = stack(_LINE_VT, 2)
+    normals = stack(_LINE_VN, 3)
+    if corner_parts:
+        corners = np.concatenate(corner_parts)
+        triangles = _triangulate(np.concatenate(count_parts))
+    else:
+        corners = np.zeros((0, 3), dtype=np.int64)
+        triangles = np.zeros((0, 3), dtype=np.int64)
+
+    def face_indices(column, values_array):
+        # 全部为 0 表示该属性没有出现在面定义中；OBJ 索引从 1 开始。
+        # 只有部分面带 vt/vn 时（混用 v、v//vn 等格式），缺失的角点指向末尾补的一行 0，面照常保留
+        values = corners[:, column]
+        if not values.any():
+            return None, values_array
+        missing = values == 0
+        if column and missing.any():
+            values = np.where(missing, len(values_array) + 1, values)
+            values_array = np.concatenate((values_array, np.zeros((1, values_array.shape[1]), dtype=np.float32)))
+        return (values - 1)[triangles], values_array
+
+    face_v, _ = face_indices(0, vertices)
+    face_t, texcoords = face_indices(1, texcoords)
+    face_n, normals = face_indices(2, normals)
+    return ObjMesh(vertices, texcoords, normals, face_v, face_t, face_n, materials)
+
+
+def valid_triangles(mesh):
+    # 所有索引都在范围内的三角形
+    mask = np.ones(len(mesh.face_v) if mesh.face_v is not None else 0, dtype=bool)
+    for faces, values in ((mesh.face_v, mesh.vertices), (mesh.face_t, mesh.texcoords), (mesh.face_n, mesh.normals)):
+        if faces is not None:
+            mask &= ((faces >= 0) & (faces < len(values))).all(axis=1)
+    return mask
+
+
+def to_buffers(mesh):
+    # 把 (v, vt, vn) 组合去重为渲染用顶点，返回 (位置, 法线, UV, 索引)
+    if mesh.face_v is None:
+        empty = np.zeros(0, dtype=np.uint32)
+        return mesh.vertices.astype(np.float32), None, None, empty
+    mask = valid_triangles(mesh)
+    columns = [faces[mask].ravel() for faces in (mesh.face_v, mesh.face_t, mesh.face_n) if faces is not None]
+    sizes = [len(values) for faces, values in ((mesh.face_v, mesh.vertices), (mesh.face_t, mesh.texcoords),
+                                               (mesh.face_n, mesh.normals)) if faces is not None]
+    key = columns[0].copy()
+    for column, size in zip(columns[1:], sizes[1:]):
+        key = key * size + column
+    unique_keys, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    del unique_keys
+    v_index = mesh.face_v[mask].ravel()[first]
+    positions = mesh.vertices[v_index].astype(np.float32)
+    normals = mesh.normals[mesh.face_n[mask].ravel()[first]].astype(np.float32) if mesh.face_n is not None else None
+    uvs = mesh.texcoords[mesh.face_t[mask].ravel()[first]].astype(np.float32) if mesh.face_t is not None else None
+    return positions, normals, uvs, inverse.astype(np.uint32)
+
+
+def write_mesh(path, positions, normals, uvs, indices):
+    flags = (MESH_HAS_NORMALS if normals is not None else 0) | (MESH_HAS_UVS if uvs is not None else 0)
+    # 写入唯一的临时文件后原子替换，并发请求同时转换也不会读到半个文件
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_MESH_HEADER.pack(MESH_MAGIC, MESH_VERSION, flags, len(positions), len(indices)))
+        for array in (positions, normals, uvs, indices):
+            if array is not None:
+                f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_mesh(path):
+    with open(path, 'rb') as f:
+        magic, version, flags, vertex_count, index_count = _MESH_HEADER.unpack(f.read(_MESH_HEADER.size))
+        if magic != MESH_MAGIC or version != MESH_VERSION:
+            raise ValueError('不支持的网格文件格式')
+        positions = np.fromfile(f, dtype='<f4', count=vertex_count * 3).reshape(-1, 3)
+        normals = np.fromfile(f, dtype='<f4', count=vertex_count * 3).reshape(-1, 3) if flags & MESH_HAS_NORMALS else None
+        uvs = np.fromfile(f, dtype='<f4', count=vertex_count * 2).reshape(-1, 2) if flags & MESH_HAS_UVS else None
+        indices = np.fromfile(f, dtype='<u4', count=index_count)
+    return positions, normals, uvs, indices
+
+
+# ---- 网格统计 ----
+
+STATS_SUFFIX = '.stats.json'
+# 统计时按行边界分块读取；块较小时 numpy 的临时数组都在 CPU 缓存中，比整块处理快
+STATS_BLOCK_SIZE = 256 * 1024
+
+_DIGIT_0 = ord('0')
+_SLASH = ord('/')
+_MINUS = ord('-')
+
+
+def _read_blocks(path, size):
+    with open(path, 'rb') as f:
+        rest = b''
+        for data in iter(lambda: f.read(size), b''):
+            data = rest + data
+            cut = data.rfind(b'\n') + 1
+            rest = data[cut:]
+            if cut:
+                yield data[:cut]
+        if rest:
+            yield rest
+
+
+def _parse_digits(buf, starts, ends):
+    # 把 buf[starts:ends] 中的十进制数字串批量转成整数：每个数取结尾对齐的 8 字节，
+    # 按字节去掉 ASCII 偏移后用三次乘加合并（SWAR），超过 8 位的少数数字逐个解析
+    lengths = ends - starts
+    padded = np.concatenate((np.zeros(8, dtype=np.uint8), buf))
+    # 每个字节偏移处的（非对齐）8 字节视图，padded[e:e + 8] 即以 buf[e - 1] 结尾的 8 个字节
+    words = np.ndarray((len(padded) - 7,), dtype='<u8', buffer=padded, strides=(1,))[ends]
+    words ^= np.uint64(0x3030303030303030)
+    # 数字串在 8 字节的高位一侧，低位多取到的字符清零，相当于前导零
+    shift = np.uint64(8) * (np.uint64(8) - np.minimum(lengths, 8).astype(np.uint64))
+    words &= np.left_shift(np.uint64(0xFFFFFFFFFFFFFFFF), shift)
+    words = (words * np.uint64(10) + (words >> np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    words = (words * np.uint64(100) + (words >> np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    words = (words * np.uint64(10000) + (words >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+    values = words.astype(np.int64)
+    for i in np.flatnonzero(lengths > 8):
+        values[i] = int(bytes(buf[starts[i]:ends[i]]))
+    return values
+
+
+def _face_corners(text, lines):
+    # 向量化解析一段 f 行中的整数，不经过 np.fromstring
+    # 返回 (v, vt, vn 三列原始 OBJ 索引[角点数, 3]，缺失为 0；每个面的角点数)
+    buf = np.frombuffer(text, dtype=np.uint8)
+    digit = np.zeros(len(buf) + 2, dtype=np.int8)
+    np.less(buf - _DIGIT_0, 10, out=digit[1:-1].view(bool))
+    # 两端补 0 后，数字串的起点和终点在变化位置中严格交替出现
+    edges = np.flatnonzero(np.diff(digit))
+    del digit
+    starts = edges[0::2]
+    ends = edges[1::2]
+    values = _parse_digits(buf, starts, ends)
+
+    # 数字前面的字符决定它是哪个槽位：空白后是顶点索引，'/' 后是 vt 或 vn，'-' 表示相对索引
+    before = buf[starts - 1]
+    negative = before == _MINUS
+    if negative.any():
+        values[negative] *= -1
+        before = np.where(negative, buf[starts - 2], before)
+    slashed = before == _SLASH
+    is_v = ~slashed
+    corner_count = int(is_v.sum())
+    width = len(values) // corner_count if corner_count else 0
+    if width and width * corner_count == len(values) and is_v[::width].all() and (width == 1 or not negative.any()):
+        # 常见情况：所有角点格式相同（v、v/vt、v//vn 或 v/vt/vn），直接按列取
+        rows = values.reshape(-1, width)
+        corners = np.zeros((corner_count, 3), dtype=np.int64)
+        corners[:, 0] = rows[:, 0]
+        if width == 3:
+            corners[:, 1:] = rows[:, 1:]
+        elif width == 2:
+            # v//vn 的第二个数前面是两个 '/'
+            corners[:, 1 if buf[starts[1] - 2] != _SLASH else 2] = rows[:, 1]
+        corner_starts = starts[::width]
+    else:
+        # a//c 中的 c 前面是两个 '/'；a/b/c 中紧跟顶点索引的是 vt，其后的是 vn
+        double = slashed & (buf[np.maximum(starts - 2 - negative, 0)] == _SLASH)
+        after_v = np.concatenate(([False], is_v[:-1]))
+        is_vt = slashed & ~double & after_v
+        is_vn = slashed & ~is_vt
+        corner = np.cumsum(is_v) - 1
+        corners = np.zeros((corner_count, 3), dtype=np.int64)
+        corners[:, 0] = values[is_v]
+        corners[corner[is_vt], 1] = values[is_vt]
+        corners[corner[is_vn], 2] = values[is_vn]
+        corner_starts = starts[is_v]
+
+    newlines = np.flatnonzero(buf == ord('\n'))
+    counts = np.bincount(np.searchsorted(newlines, corner_starts), minlength=lines)[:lines]
+    return corners, counts
+
+
+def _out_of_range(values, count):
+    # 原始 OBJ 索引（1..count 或 -count..-1，0 表示该角点没有这个属性）中越界的个数
+    return int(((values > count) | (values < -count)).sum())
+
+
+def mesh_stats(path):
+    # 一次扫描计算 OBJ 的统计信息：顶点/面/UV 数、包围盒、质心、表面积和有效性检查
+    # 按小块读取，块内数组能留在缓存中；vt/vn 只计数并检查引用，面只解析整数索引
+    # 面引用的元素按 OBJ 规范须在它之前定义，索引按读到该行时已定义的元素数检查
+    vertex_parts, index_parts, count_parts = [], [], []
+    counts = {_LINE_V: 0, _LINE_VT: 0, _LINE_VN: 0}
+    out_of_range = {'v': 0, 'vt': 0, 'vn': 0}
+    for block in _read_blocks(path, STATS_BLOCK_SIZE):
+        for code, text, lines in _line_runs(block):
+            if code == _LINE_F:
+                corners, face_counts = _face_corners(text, lines)
+                vertex_count = counts[_LINE_V]
+                out_of_range['vt'] += _out_of_range(corners[:, 1], counts[_LINE_VT])
+                out_of_range['vn'] += _out_of_range(corners[:, 2], counts[_LINE_VN])
+                bad = (corners[:, 0] > vertex_count) | (corners[:, 0] < -vertex_count) | (corners[:, 0] == 0)
+                out_of_range['v'] += int(bad.sum())
+                # 越界的顶点索引记为 -1，对应的三角形不参与几何计算
+                indices = np.where(corners[:, 0] < 0, corners[:, 0] + vertex_count, corners[:, 0] - 1)
+                indices[bad] = -1
+                index_parts.append(indices)
+                count_parts.append(face_counts)
+            elif code in counts:
+                if code == _LINE_V:
+                    vertex_parts.append(_parse_rows(text, b'v', lines, 3))
+                counts[code] += lines
+
+    vertices = np.concatenate(vertex_parts) if vertex_parts else np.zeros((0, 3), dtype=np.float32)
+    indices = np.concatenate(index_parts) if index_parts else np.zeros(0, dtype=np.int64)
+    face_counts = np.concatenate(count_parts) if count_parts else np.zeros(0, dtype=np.int64)
+
+    if len(face_counts) and (face_counts == 3).all():
+        triangles = indices.reshape(-1, 3)
+    else:
+        triangles = indices[_triangulate(face_counts)] if len(face_counts) else np.zeros((0, 3), dtype=np.int64)
+    triangle_count = len(triangles)
+    triangles = triangles[(triangles >= 0).all(axis=1)]
+
+    p0 = vertices[triangles[:, 0]]
+    e1 = vertices[triangles[:, 1]] - p0
+    e2 = vertices[triangles[:, 2]] - p0
+    cross = np.empty_like(e1)
+    cross[:, 0] = e1[:, 1] * e2[:, 2] - e1[:, 2] * e2[:, 1]
+    cross[:, 1] = e1[:, 2] * e2[:, 0] - e1[:, 0] * e2[:, 2]
+    cross[:, 2] = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+    cross_squared = np.einsum('ij,ij->i', cross, cross)
+    double_area = np.sqrt(cross_squared)
+    # 两条边夹角的正弦小于 1e-6（含零长度边）的三角形视为退化，与模型尺寸无关
+    degenerate = cross_squared <= 1e-12 * np.einsum('ij,ij->i', e1, e1) * np.einsum('ij,ij->i', e2, e2)
+    area = double_area.sum(dtype=np.float64) / 2
+    if area > 0:
+        centers = p0 + (e1 + e2) / 3
+        centroid = (centers * double_area[:, None]).sum(axis=0, dtype=np.float64) / (2 * area)
+    elif len(vertices):
+        centroid = vertices.mean(axis=0, dtype=np.float64)
+    else:
+        centroid = None
+
+    bbox = None
+    if len(vertices):
+        bbox = {'min': vertices.min(axis=0).astype(np.float64).tolist(),
+                'max': vertices.max(axis=0).astype(np.float64).tolist()}
+
+    short_faces = int((face_counts < 3).sum())
+    degenerate_count = int(degenerate.sum())
+    return {
+        'vertices': len(vertices),
+        'faces': len(face_counts),
+        'triangles': triangle_count,
+        'uvs': counts[_LINE_VT],
+        'normals': counts[_LINE_VN],
+        'bbox': bbox,
+        'centroid': centroid.tolist() if centroid is not None else None,
+        'surfaceArea': float(area),
+        'validity': {
+            'valid': not (short_faces or degenerate_count or any(out_of_range.values())),
+            'degenerateTriangles': degenerate_count,
+            'shortFaces': short_faces,
+            'outOfRangeIndices': out_of_range,
+        },
+    }
+
+
+# ---- 细节层次（LOD）----
+
+# 每个 LOD 保留的面数百分比
+LOD_LEVELS = (50, 10, 2)
+
+
+def lod_suffix(level):
+    return f'.lod{level}{MESH_SUFFIX}'
+
+
+def _cluster(positions, uvs, resolution, origin, cell):
+    # 顶点聚类：落在同一网格单元（且 UV 相近，避免跨接缝合并）的顶点合并为一个
+    grid = np.floor((positions - origin) / cell).astype(np.int64)
+    grid = np.clip(grid, 0, resolution - 1)
+    key = (grid[:, 0] * resolution + grid[:, 1]) * resolution + grid[:, 2]
+    if uvs is not None:
+        uv_grid = np.clip(np.floor(uvs * resolution).astype(np.int64), 0, resolution - 1)
+        key = (key * resolution + uv_grid[:, 0]) * resolution + uv_grid[:, 1]
+    _, labels = np.unique(key, return_inverse=True)
+    return labels.ravel()
+
+
+def _collapse(triangles, labels):
+    faces = labels[triangles]
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    return faces[keep]
+
+
+def simplify(positions, normals, uvs, indices, target_faces):
+    # 按目标面数选择聚类网格分辨率：曲面面数约与分辨率平方成正比，迭代几次逼近目标
+    triangles = indices.reshape(-1, 3).astype(np.int64)
+    if target_faces >= len(triangles) or len(positions) == 0:
+        return positions, normals, uvs, indices
+    origin = positions.min(axis=0)
+    extent = float((positions.max(axis=0) - origin).max()) or 1.0
+    # uv 参与聚类时 key 需要 5 个维度，分辨率上限保证不溢出 int64
+    max_resolution = 4096 if uvs is None else 6000
+    resolution = max(2, int(np.sqrt(target_faces / 2)))
+    best = None
+    for _ in range(8):
+        resolution = int(min(max(resolution, 2), max_resolution))
+        cell = extent / resolution * (1 + 1e-6)
+        labels = _cluster(positions, uvs, resolution, origin, cell)
+        faces = _collapse(triangles, labels)
+        if best is None or abs(len(faces) - target_faces) < abs(len(best[1]) - target_faces):
+            best = (labels, faces)
+        if abs(len(faces) - target_faces) <= target_faces * 0.1 or resolution == max_resolution:
+            break
+        resolution = resolution * np.sqrt(target_faces / max(len(faces), 1))
+    labels, faces = best
+
+    # 每个聚类取成员的平均值作为新顶点
+    count = labels.max() + 1
+    weights = np.bincount(labels, minlength=count).astype(np.float64)
+
+    def average(values):
+        if values is None:
+            return None
+        result = np.empty((count, values.shape[1]), dtype=np.float32)
+        for axis in range(values.shape[1]):
+            result[:, axis] = np.bincount(labels, weights=values[:, axis], minlength=count) / weights
+        return result
+
+    new_positions = average(positions)
+    new_normals = average(normals)
+    if new_normals is not None:
+        length = np.linalg.norm(new_normals, axis=1, keepdims=True)
+        new_normals /= np.where(length > 0, length, 1)
+    new_uvs = average(uvs)
+
+    # 去掉重复的面，并丢弃不再被引用的顶点
+    ordered = np.sort(faces, axis=1)
+    face_key = (ordered[:, 0] * count + ordered[:, 1]) * count + ordered[:, 2]
+    faces = faces[np.sort(np.unique(face_key, return_index=True)[1])]
+    used, remap = np.unique(faces, return_inverse=True)
+    return (new_positions[used], new_normals[used] if new_normals is not None else None,
+            new_uvs[used] if new_uvs is not None else None, remap.reshape(-1).astype(np.uint32))
+
+
+def build_levels(obj_path, mesh_path, lod_paths, progress=None):
+    # 解析一次 OBJ，写出完整二进制网格和各级 LOD；已存在的文件跳过
+    # progress(完成比例, 说明) 用于向任务队列报告进度
+    if os.path.exists(mesh_path) and all(os.path.exists(path) for path in lod_paths.values()):
+        return
+    mesh = parse_obj(obj_path)
+    if len(mesh.materials) > 1:
+        # 二进制网格只有一个材质，多个 usemtl 分组的模型由前端用 OBJLoader 加载
+        raise UnsupportedMesh(f'模型使用了 {len(mesh.materials)} 个材质，二进制网格只支持一个')
+    buffers = to_buffers(mesh)
+    if not os.path.exists(mesh_path):
+        write_mesh(mesh_path, *buffers)
+    if progress:
+        progress(0.5, '二进制网格已生成')
+    face_count = len(buffers[3]) // 3
+    for done, (level, path) in enumerate(lod_paths.items(), 1):
+        if not os.path.exists(path):
+            write_mesh(path, *simplify(*buffers, max(1, face_count * level // 100)))
+        if progress:
+            progress(0.5 + 0.5 * done / len(lod_paths), f'LOD {level}% 已生成')
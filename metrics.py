@@ -0,0 +1,204 @@
+import os
+import io
+import time
+import bisect
+import pstats
+import cProfile
+import threading
+
+# 进程内指标：计数器和直方图，GET /metrics 以 Prometheus 文本格式输出。
+# 每次观测只是一次加锁的字典更新，热路径上的开销为微秒级；工作进程中的观测不会汇总到这里
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 1KB ~ 4GB，每级 4 倍
+SIZE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(12))
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+_started = time.time()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [各区间计数..., 超出最大上界的计数, 总和]
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def time(self, labels=()):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            items = sorted((labels, list(state)) for labels, state in self.values.items())
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, labels, [le])} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, labels)} {_number(state[-1])}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, labels)} {cumulative}')
+        return lines
+
+
+class Gauge:
+    # 输出时调用 func 取值
+    def __init__(self, name, help, func):
+        self.name = name
+        self.help = help
+        self.func = func
+        _registry.append(self)
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge', f'{self.name} {_number(self.func())}']
+
+
+class RequestMetrics:
+    # 请求计数、耗时直方图和收发字节数放在同一个状态里，每个请求只加一次锁、查一次字典
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.labels = ('route', 'method', 'status')
+        # (route, method, status) -> [各区间计数..., 超出最大上界的计数, 耗时总和, 请求字节, 响应字节]
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, labels, seconds, bytes_in, bytes_out):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0, 0]
+            state[index] += 1
+            state[-3] += seconds
+            state[-2] += bytes_in
+            state[-1] += bytes_out
+
+    def render(self):
+        with self.lock:
+            items = sorted((labels, list(state)) for labels, state in self.values.items())
+        requests = ['# HELP http_requests_total 按路由、方法、状态码统计的请求数', '# TYPE http_requests_total counter']
+        seconds = ['# HELP http_request_duration_seconds 请求耗时（含流式响应体的发送）',
+                   '# TYPE http_request_duration_seconds histogram']
+        bytes_in = ['# HELP http_request_bytes_total 请求体字节数', '# TYPE http_request_bytes_total counter']
+        bytes_out = ['# HELP http_response_bytes_total 响应体字节数', '# TYPE http_response_bytes_total counter']
+        for labels, state in items:
+            text = _label_text(self.labels, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-3]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_number(bound)}"'
+                seconds.append(f'http_request_duration_seconds_bucket{_label_text(self.labels, labels, [le])} {cumulative}')
+            seconds.append(f'http_request_duration_seconds_sum{text} {_number(state[-3])}')
+            seconds.append(f'http_request_duration_seconds_count{text} {cumulative}')
+            requests.append(f'http_requests_total{text} {cumulative}')
+            bytes_in.append(f'http_request_bytes_total{text} {state[-2]}')
+            bytes_out.append(f'http_response_bytes_total{text} {state[-1]}')
+        return requests + seconds + bytes_in + bytes_out
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+        return False
+
+
+def _resident_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+REQUESTS = RequestMetrics()
+FS_SECONDS = Histogram('fs_operation_seconds', '文件系统操作耗时（listdir、rename、zip_write 等）', ('op',))
+UPLOAD_BYTES = Histogram('upload_size_bytes', '上传文件大小', ('type',), SIZE_BUCKETS)
+Gauge('process_resident_memory_bytes', '进程常驻内存', _resident_bytes)
+Gauge('process_uptime_seconds', '进程运行时间', lambda: round(time.time() - _started, 3))
+
+
+def fs_timer(op):
+    # with metrics.fs_timer('rename'): os.replace(...)
+    return _Timer(FS_SECONDS, (op,))
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    return '\n'.join(lines) + '\n'
+
+
+def observe_request(route, method, status, seconds, bytes_in, bytes_out):
+    REQUESTS.observe((route, method, status), seconds, bytes_in, bytes_out)
+
+
+class CountingIterable:
+    # 包装流式响应体，发送完毕（close）时得到实际发送的字节数
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.count = 0
+
+    def __iter__(self):
+        for chunk in self.iterable:
+            self.count += len(chunk)
+            yield chunk
+
+    def close(self):
+        close = getattr(self.iterable, 'close', None)
+        if close:
+            close()
+
+
+def start_profile():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def write_profile(profiler, base_path, limit=40):
+    # 保存 <base_path>.prof（可用 snakeviz 等工具查看）和按累计耗时排序的文本报告 <base_path>.txt
+    profiler.disable()
+    os.makedirs(os.path.dirname(base_path), exist_ok=True)
+    profiler.dump_stats(base_path + '.prof')
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+    with open(base_path + '.txt', 'w', encoding='utf-8') as f:
+        f.write(out.getvalue())
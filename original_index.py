@@ -0,0 +1,211 @@
+import os
+import re
+import sys
+import uuid
+import sqlite3
+import threading
+import metrics
+
+# 原图索引：以 (场景名, 模型序号) 为键记录 original_images 目录中的文件名，
+# 代替每次请求对整个目录做 os.listdir 线性扫描
+
+# 原图文件名格式: <场景名>_model_<序号>_<原文件名>
+_FILENAME_PATTERN = re.compile(r'^(.*?)_model_(\d+)_')
+_TEMP_SCENE_PATTERN = re.compile(r'^temp_\d+$')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS original_images (
+    scene TEXT NOT NULL,
+    model_index INTEGER NOT NULL,
+    filename TEXT NOT NULL UNIQUE,
+    PRIMARY KEY (scene, model_index)
+)
+'''
+
+
+def parse_filename(filename):
+    match = _FILENAME_PATTERN.match(filename)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def build_filename(scene, model_index, name):
+    return f"{scene}_model_{model_index}_{name}"
+
+
+def original_name(filename):
+    # 去掉 <场景名>_model_<序号>_ 前缀后的原文件名
+    match = _FILENAME_PATTERN.match(filename)
+    return filename[match.end():] if match else filename
+
+
+class OriginalImageIndex:
+    def __init__(self, db_path, folder):
+        self.db_path = db_path
+        self.folder = folder
+        self.local = threading.local()
+        exists = os.path.exists(db_path)
+        with self.connection() as conn:
+            conn.execute(_SCHEMA)
+        if not exists:
+            self.rebuild()
+
+    def connection(self):
+        # 每个线程使用独立连接（Flask 以 threaded=True 运行）
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def path(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def rebuild(self, keep_owners=False):
+        # 按磁盘上的文件重建索引；同一 (场景, 序号) 有多个文件时保留排序后的第一个。
+        # sqlite 场景存储保存、重命名场景时不改原图文件名，文件名前缀不一定是所属场景，
+        # 此时 keep_owners=True：仍存在的文件沿用索引中的归属，只有索引中没有的文件按文件名前缀归属
+        rows = {}
+        with metrics.fs_timer('listdir'):
+            filenames = sorted(os.listdir(self.folder))
+        if keep_owners:
+            owners = {filename: (scene, index) for scene, index, filename in self.connection().execute(
+                'SELECT scene, model_index, filename FROM original_images')}
+            rows = {owners[filename]: filename for filename in filenames if filename in owners}
+            filenames = [filename for filename in filenames if filename not in owners]
+        for filename in filenames:
+            key = parse_filename(filename)
+            if key and key not in rows:
+                rows[key] = filename
+        with self.connection() as conn:
+            conn.execute('DELETE FROM original_images')
+            conn.executemany('INSERT INTO original_images (scene, model_index, filename) VALUES (?, ?, ?)',
+                             [(scene, index, filename) for (scene, index), filename in rows.items()])
+        return len(rows)
+
+    def get(self, scene, model_index):
+        row = self.connection().execute(
+            'SELECT filename FROM original_images WHERE scene = ? AND model_index = ?',
+            (scene, int(model_index))).fetchone()
+        return row[0] if row else None
+
+    def list_scene(self, scene):
+        return self.connection().execute(
+            'SELECT model_index, filename FROM original_images WHERE scene = ? ORDER BY model_index',
+            (scene,)).fetchall()
+
+    def _unique_filename(self, conn, scene, model_index, name):
+        # sqlite 场景存储重命名场景时不改文件名，按新场景名生成的文件名可能已属于其他场景
+        filename = build_filename(scene, model_index, name)
+        owner = conn.execute('SELECT scene, model_index FROM original_images WHERE filename = ?',
+                             (filename,)).fetchone()
+        if owner and owner != (scene, int(model_index)):
+            filename = build_filename(scene, model_index, f'{uuid.uuid4().hex[:8]}_{name}')
+        return filename
+
+    def save(self, scene, model_index, name, file):
+        # 替换该模型已有的原图：先写新文件，提交索引后再删除旧文件
+        conn = self.connection()
+        with conn:
+            filename = self._unique_filename(conn, scene, model_index, name)
+            row = conn.execute('SELECT filename FROM original_images WHERE scene = ? AND model_index = ?',
+                               (scene, int(model_index))).fetchone()
+            file.save(self.path(filename))
+            conn.execute('INSERT OR REPLACE INTO original_images (scene, model_index, filename) VALUES (?, ?, ?)',
+                         (scene, int(model_index), filename))
+        if row and row[0] != filename and os.path.exists(self.path(row[0])):
+            os.remove(self.path(row[0]))
+        return filename
+
+    def delete(self, scene, model_index):
+        conn = self.connection()
+        with conn:
+            row = conn.execute('SELECT filename FROM original_images WHERE scene = ? AND model_index = ?',
+                               (scene, int(model_index))).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM original_images WHERE scene = ? AND model_index = ?',
+                         (scene, int(model_index)))
+            if os.path.exists(self.path(row[0])):
+                os.remove(self.path(row[0]))
+        return row[0]
+
+    def move(self, old_scene, new_scene, model_index=None):
+        # 把原图移到新场景名下（文件名前缀一并替换），返回 [(序号, 新文件名)]
+        conn = self.connection()
+        with conn:
+            moved, replaced = self.move_rows(conn, old_scene, new_scene, model_index, rename_files=True)
+        self.remove_files(replaced)
+        return moved
+
+    def move_rows(self, conn, old_scene, new_scene, model_index=None, rename_files=False):
+        # 在调用方的事务中移动原图记录，返回 ([(序号, 文件名)], 被替换的旧文件名)，旧文件由调用方在提交后删除。
+        # rename_files 为 False 时保留磁盘上的文件名，事务之外不做任何文件操作
+        if model_index is None:
+            rows = conn.execute('SELECT model_index, filename FROM original_images WHERE scene = ?',
+                                (old_scene,)).fetchall()
+        else:
+            rows = conn.execute('SELECT model_index, filename FROM original_images '
+                                'WHERE scene = ? AND model_index = ?',
+                                (old_scene, int(model_index))).fetchall()
+        moved, replaced_files = [], []
+        for index, filename in rows:
+            replaced = conn.execute('SELECT filename FROM original_images WHERE scene = ? AND model_index = ?',
+                                    (new_scene, index)).fetchone()
+            if replaced and replaced[0] != filename:
+                conn.execute('DELETE FROM original_images WHERE filename = ?', (replaced[0],))
+                replaced_files.append(replaced[0])
+            new_filename = filename
+            if rename_files:
+                new_filename = self._unique_filename(conn, new_scene, index, original_name(filename))
+            conn.execute('UPDATE original_images SET scene = ?, filename = ? WHERE filename = ?',
+                         (new_scene, new_filename, filename))
+            if new_filename != filename and os.path.exists(self.path(filename)):
+                with metrics.fs_timer('rename'):
+                    os.replace(self.path(filename), self.path(new_filename))
+            moved.append((index, new_filename))
+        # 被替换的文件与移入的文件同名时已被覆盖，不能再删除
+        kept = {filename for _, filename in moved}
+        return moved, [filename for filename in replaced_files if filename not in kept]
+
+    def remove_files(self, filenames):
+        for filename in filenames:
+            if os.path.exists(self.path(filename)):
+                os.remove(self.path(filename))
+
+    def normalize_filenames(self):
+        # 让文件名前缀与所属场景一致（files 场景存储按文件名前缀归属场景，按前缀 rebuild 也依赖这一点），
+        # 返回改名的数量
+        conn = self.connection()
+        renamed = 0
+        with conn:
+            rows = conn.execute('SELECT scene, model_index, filename FROM original_images').fetchall()
+            for scene, index, filename in rows:
+                if parse_filename(filename) == (scene, index):
+                    continue
+                new_filename = self._unique_filename(conn, scene, index, original_name(filename))
+                conn.execute('UPDATE original_images SET filename = ? WHERE filename = ?', (new_filename, filename))
+                if os.path.exists(self.path(filename)):
+                    os.replace(self.path(filename), self.path(new_filename))
+                renamed += 1
+        return renamed
+
+    def temp_scenes(self):
+        # 新建场景前上传的原图使用 temp_<时间戳> 作为场景名
+        rows = self.connection().execute(
+            "SELECT DISTINCT scene FROM original_images WHERE scene LIKE 'temp\\_%' ESCAPE '\\'").fetchall()
+        scenes = [row[0] for row in rows if _TEMP_SCENE_PATTERN.match(row[0])]
+        return sorted(scenes, key=lambda scene: int(scene[len('temp_'):]))
+
+
+if __name__ == '__main__':
+    base_dir = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        index = OriginalImageIndex(os.path.join(base_dir, 'index.db'), os.path.join(base_dir, 'original_images'))
+        # 与应用相同按 SCENE_STORE 判断场景存储后端
+        print(f"索引重建完成，共 {index.rebuild(os.environ.get('SCENE_STORE') == 'sqlite')} 张原图")
+    else:
+        print("用法: python original_index.py rebuild")
@@ -0,0 +1,101 @@
+import os
+import re
+import json
+import zipfile
+
+# 场景压缩包：读取 /scenes/<filename>/download 导出的 ZIP，布局为
+#   <场景名>/scene.json                  场景数据（摆放、相机、设置）
+#   <场景名>/模型<N>/<文件>               第 N 个模型的 OBJ、MTL、贴图
+#   <场景名>/模型<N>/original.<扩展名>    第 N 个模型的原图
+# 这里只读中央目录、把条目按场景和模型分组，条目内容由调用方以流的方式逐个解压
+
+SCENE_DOCUMENT = 'scene.json'
+ORIGINAL_STEM = 'original'
+# 只有图片才可能是原图；名为 original.obj 等的模型文件按普通文件导入
+ORIGINAL_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MODEL_FOLDER_PATTERN = re.compile(r'^模型(\d+)$')
+# scene.json 只含摆放和设置，超过这个大小的视为无效
+MAX_DOCUMENT_BYTES = 16 * 1024 * 1024
+# 压缩包中 macOS 等工具附带的元数据目录和隐藏文件
+_IGNORED_PREFIXES = ('__MACOSX/', '.')
+# ZIP 的 UTF-8 标志位；未设置时文件名按 cp437 解码，Windows 中文系统压缩的文件名实际为 GBK
+_UTF8_FLAG = 0x800
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def entry_name(info):
+    if info.flag_bits & _UTF8_FLAG:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('gbk')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def read_scenes(zf, default_name, allowed, max_bytes):
+    # 返回 [{'name', 'document', 'models': {N: {'files': [(文件名, ZipInfo)], 'original': (文件名, ZipInfo) 或 None}}, 'skipped'}]
+    # 没有顶层场景文件夹（直接压缩了 模型N/ 文件夹）时场景名为 default_name；allowed(文件名) 判断文件类型
+    scenes = {}
+    total = 0
+    for info in zf.infolist():
+        name = entry_name(info)
+        if info.is_dir() or name.startswith(_IGNORED_PREFIXES):
+            continue
+        parts = name.split('/')
+        if len(parts) > 1 and not MODEL_FOLDER_PATTERN.match(parts[0]):
+            scene_name, parts = parts[0], parts[1:]
+        else:
+            scene_name = default_name
+        scene = scenes.setdefault(scene_name, {'name': scene_name, 'document': None, 'models': {}, 'skipped': 0})
+        if parts == [SCENE_DOCUMENT]:
+            if info.file_size > MAX_DOCUMENT_BYTES:
+                raise ArchiveError(f'场景数据过大: {name}')
+            scene['document'] = info
+            continue
+        match = MODEL_FOLDER_PATTERN.match(parts[0]) if len(parts) == 2 else None
+        filename = parts[-1]
+        if not match or filename.startswith('.') or not allowed(filename):
+            scene['skipped'] += 1
+            continue
+        total += info.file_size
+        if total > max_bytes:
+            raise ArchiveError('压缩包解压后的大小超出限制')
+        model = scene['models'].setdefault(int(match.group(1)), {'files': [], 'original': None, 'candidates': []})
+        stem, extension = os.path.splitext(filename)
+        if stem.lower() == ORIGINAL_STEM and extension.lower() in ORIGINAL_EXTENSIONS:
+            model['candidates'].append((filename, info))
+        else:
+            model['files'].append((filename, info))
+    for scene in scenes.values():
+        for model in scene['models'].values():
+            # 只有一张 original.<图片扩展名> 时才作为原图，有多张时无法区分原图和贴图，全部按普通文件导入
+            candidates = model.pop('candidates')
+            if len(candidates) == 1:
+                model['original'] = candidates[0]
+            else:
+                model['files'] += candidates
+    found = [scene for scene in scenes.values() if scene['models']]
+    if not found:
+        raise ArchiveError('压缩包中没有 模型N/ 文件夹')
+    return sorted(found, key=lambda scene: scene['name'])
+
+
+def read_document(zf, info):
+    # 解析 scene.json，格式不对时返回 None（按没有场景数据处理，只导入模型文件）
+    with zf.open(info) as f:
+        data = f.read(MAX_DOCUMENT_BYTES + 1)
+    try:
+        document = json.loads(data)
+    except ValueError:
+        return None
+    return document if isinstance(document, dict) else None
+
+
+def open_archive(stream):
+    try:
+        return zipfile.ZipFile(stream)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ArchiveError(f'不是有效的 ZIP 文件: {str(e)}')
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import base64
+import sqlite3
+import threading
+import asset_store
+import logs
+import scene_store
+from original_index import OriginalImageIndex
+
+# 场景目录索引：每个场景一行（名称、创建/修改时间、模型数、资源大小、原图数、模型统计），
+# 由保存、重命名、删除等接口增量更新，/list-scenes 直接按索引分页查询，不再遍历场景存储
+
+log = logs.get(__name__)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scenes (
+    filename TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    modified REAL NOT NULL,
+    model_count INTEGER NOT NULL,
+    asset_bytes INTEGER NOT NULL,
+    original_images INTEGER NOT NULL,
+    models TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenes_created ON scenes (created, filename);
+CREATE INDEX IF NOT EXISTS scenes_modified ON scenes (modified, filename);
+CREATE INDEX IF NOT EXISTS scenes_model_count ON scenes (model_count, filename);
+CREATE INDEX IF NOT EXISTS scenes_asset_bytes ON scenes (asset_bytes, filename);
+CREATE TABLE IF NOT EXISTS catalog_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_state (key, value) VALUES ('version', 0);
+'''
+
+# 可排序的字段及对应的列，每列都有 (列, filename) 索引
+SORT_COLUMNS = {
+    'name': 'filename',
+    'created': 'created',
+    'modified': 'modified',
+    'models': 'model_count',
+    'size': 'asset_bytes',
+}
+MAX_LIMIT = 1000
+
+_ASSET_KEYS = ('objFile', 'mtlFile', 'textureFile')
+# 前缀查询的上界：UTF-8 编码比任何有效字符都大
+_PREFIX_END = '\U0010ffff'
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(value, filename):
+    return base64.urlsafe_b64encode(json.dumps([value, filename], ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        value, filename = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise CursorError('无效的分页游标')
+    if not isinstance(filename, str):
+        raise CursorError('无效的分页游标')
+    return value, filename
+
+
+def model_summary(scene_data):
+    # 列表 ?stats=1 时返回的各模型摘要
+    return [{'objFile': model.get('objFile'), 'stats': model.get('stats')}
+            for model in scene_data.get('models', []) if isinstance(model, dict)]
+
+
+class SceneCatalog:
+    def __init__(self, db_path, store, resolve_asset, originals):
+        # store 为场景存储（scene_store 中的任一后端）
+        # resolve_asset(url) 把场景中的 /uploads/... 解析为实际文件（不存在时返回 None）
+        # originals 为 OriginalImageIndex，用于统计每个场景的原图数
+        self.db_path = db_path
+        self.store = store
+        self.resolve_asset = resolve_asset
+        self.originals = originals
+        self.local = threading.local()
+        conn = self.connection()
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scenes'").fetchone()
+        conn.executescript(_SCHEMA)
+        if not exists:
+            self.rebuild()
+
+    def connection(self):
+        # 每个线程使用独立连接（Flask 以 threaded=True 运行）
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def _bump(self, conn):
+        # 任何修改都递增版本号，列表的 ETag 由版本号和查询参数组成
+        conn.execute("UPDATE catalog_state SET value = value + 1 WHERE key = 'version'")
+
+    def version(self):
+        return self.connection().execute("SELECT value FROM catalog_state WHERE key = 'version'").fetchone()[0]
+
+    def describe(self, filename, scene_data, created=None):
+        # 由场景数据计算索引行；资源大小在写入时统计，列表时不再访问模型文件
+        models = [model for model in scene_data.get('models', []) if isinstance(model, dict)]
+        asset_bytes = 0
+        for model in models:
+            for key in _ASSET_KEYS:
+                path = self.resolve_asset(model[key]) if model.get(key) else None
+                if path:
+                    asset_bytes += os.path.getsize(path)
+        modified = self.store.modified(filename)
+        summary = model_summary(scene_data)
+        return (filename, created if created is not None else modified, modified, len(models), asset_bytes,
+                len(self.originals.list_scene(filename[:-len('.json')])), json.dumps(summary, ensure_ascii=False))
+
+    def put(self, filename, scene_data=None, created=None):
+        # 保存或更新场景后调用；scene_data 为空时从文件读取
+        if scene_data is None:
+            scene_data = self.store.load(filename)
+        row = self.describe(filename, scene_data, created)
+        conn = self.connection()
+        with conn:
+            existing = conn.execute('SELECT created FROM scenes WHERE filename = ?', (filename,)).fetchone()
+            if existing and created is None:
+                row = (filename, existing[0]) + row[2:]
+            conn.execute('INSERT OR REPLACE INTO scenes (filename, created, modified, model_count, asset_bytes, '
+                         'original_images, models) VALUES (?, ?, ?, ?, ?, ?, ?)', row)
+            self._bump(conn)
+
+    def rename(self, old_filename, new_filename, scene_data=None):
+        # 重命名保留创建时间
+        row = self.connection().execute('SELECT created FROM scenes WHERE filename = ?', (old_filename,)).fetchone()
+        self.delete(old_filename)
+        self.put(new_filename, scene_data, row[0] if row else None)
+
+    def delete(self, filename):
+        conn = self.connection()
+        with conn:
+            conn.execute('DELETE FROM scenes WHERE filename = ?', (filename,))
+            self._bump(conn)
+
+    def refresh_originals(self, scene_name):
+        # 原图上传、删除、移动后更新对应场景的原图数
+        conn = self.connection()
+        with conn:
+            updated = conn.execute('UPDATE scenes SET original_images = ? WHERE filename = ?',
+                                   (len(self.originals.list_scene(scene_name)), scene_name + '.json')).rowcount
+            if updated:
+                self._bump(conn)
+
+    def rebuild(self):
+        # 按场景存储重建索引（手动改动场景文件或迁移存储后使用）
+        rows = []
+        for filename in self.store.names():
+            try:
+                rows.append(self.describe(filename, self.store.load(filename)))
+            except (OSError, ValueError, scene_store.SceneNotFound) as e:
+                log.warning('跳过无法读取的场景', scene=filename, error=str(e))
+        conn = self.connection()
+        with conn:
+            conn.execute('DELETE FROM scenes')
+            conn.executemany('INSERT INTO scenes (filename, created, modified, model_count, asset_bytes, '
+                             'original_images, models) VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._bump(conn)
+        return len(rows)
+
+    def page(self, sort='name', descending=True, prefix=None, cursor=None, limit=None, with_models=False):
+        # 键集分页：按 (排序列, filename) 定位上一页的最后一行，查询代价与场景总数无关
+        # limit 为 None 时返回全部；返回 (场景列表, 下一页游标或 None)
+        column = SORT_COLUMNS[sort]
+        conditions, params = [], []
+        if prefix:
+            conditions.append('filename >= ? AND filename < ?')
+            params += [prefix, prefix + _PREFIX_END]
+        if cursor:
+            value, filename = decode_cursor(cursor)
+            if column == 'filename':
+                conditions.append(f'filename {"<" if descending else ">"} ?')
+                params.append(filename)
+            else:
+                conditions.append(f'({column}, filename) {"<" if descending else ">"} (?, ?)')
+                params += [value, filename]
+        direction = 'DESC' if descending else 'ASC'
+        order = 'filename ' + direction if column == 'filename' else f'{column} {direction}, filename {direction}'
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        if limit is not None:
+            # 多取一行判断是否还有下一页
+            params.append(limit + 1)
+        rows = self.connection().execute(
+            f'SELECT filename, created, modified, model_count, asset_bytes, original_images, models, {column} '
+            f'FROM scenes{where} ORDER BY {order}' + (' LIMIT ?' if limit is not None else ''), params).fetchall()
+
+        scenes = []
+        for filename, created, modified, model_count, asset_bytes, original_images, models, _ in rows[:limit]:
+            scene = {
+                'filename': filename,
+                'name': filename[:-len('.json')],
+                'created': created,
+                'modified': modified,
+                'modelCount': model_count,
+                'assetBytes': asset_bytes,
+                'originalImages': original_images,
+            }
+            if with_models:
+                scene['models'] = json.loads(models)
+            scenes.append(scene)
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            next_cursor = encode_cursor(rows[limit - 1][-1], rows[limit - 1][0])
+        return scenes, next_cursor
+
+
+if __name__ == '__main__':
+    base_dir = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        database = os.path.join(base_dir, 'index.db')
+        uploads = os.path.join(base_dir, 'uploads')
+        blobs = os.path.join(base_dir, 'blobs')
+
+        def resolve(url):
+            rel_path = url.lstrip('/')
+            if rel_path.startswith('uploads/'):
+                return asset_store.resolve(uploads, rel_path[len('uploads/'):], blobs)
+            return None
+
+        originals = OriginalImageIndex(database, os.path.join(base_dir, 'original_images'))
+        store = scene_store.open_store(os.environ.get('SCENE_STORE', 'files'), os.path.join(base_dir, 'scenes'), originals)
+        catalog = SceneCatalog(database, store, resolve, originals)
+        logs.setup()
+        start = time.time()
+        print(f"场景索引重建完成，共 {catalog.rebuild()} 个场景，耗时 {time.time() - start:.2f}s")
+    else:
+        print("用法: python scene_catalog.py rebuild")
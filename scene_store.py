@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import asset_store
+import metrics
+from original_index import OriginalImageIndex
+
+# 场景存储：场景文档及其原图归属的读写都通过这里，接口由两个后端共同实现
+#   files  - 原有布局，每个场景一个 scenes/<filename> JSON 文件，原图文件名前缀即场景名
+#   sqlite - 场景文档与原图索引同在 index.db，保存、重命名在一个事务内完成，
+#            重命名只改索引不改原图文件名，中途崩溃不会留下不一致的文件
+
+
+class SceneNotFound(Exception):
+    pass
+
+
+class SceneExists(Exception):
+    pass
+
+
+def scene_name(filename):
+    return filename[:-len('.json')] if filename.endswith('.json') else filename
+
+
+def encode(scene_data):
+    return json.dumps(scene_data, ensure_ascii=False).encode('utf-8')
+
+
+def _attach_originals(scene_data, moved):
+    # 把移到场景下的原图记录到场景数据中
+    scene_data['original_images'] = [{'model_index': index, 'filename': filename}
+                                     for index, filename in sorted(moved.items())]
+
+
+def _rename_originals(scene_data, moved):
+    moved = dict(moved)
+    for image in scene_data.get('original_images', []):
+        if image.get('model_index') in moved:
+            image['filename'] = moved[image['model_index']]
+
+
+class FileSceneStore:
+    def __init__(self, folder, originals):
+        self.folder = folder
+        self.originals = originals
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def names(self):
+        with metrics.fs_timer('listdir'):
+            names = os.listdir(self.folder)
+        return [filename for filename in names if filename.endswith('.json')]
+
+    def exists(self, filename):
+        return os.path.exists(self.path(filename))
+
+    def modified(self, filename):
+        try:
+            return os.path.getmtime(self.path(filename))
+        except FileNotFoundError:
+            raise SceneNotFound(filename)
+
+    def load(self, filename):
+        try:
+            with open(self.path(filename), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise SceneNotFound(filename)
+
+    def document(self, filename):
+        # 返回 (JSON 字节, sha256, 修改时间)
+        path = self.path(filename)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            return data, asset_store.cached_digest(path), os.path.getmtime(path)
+        except FileNotFoundError:
+            raise SceneNotFound(filename)
+
+    def put_document(self, filename, data, modified=None):
+        # 先写临时文件再替换，写到一半崩溃不会留下残缺的场景文件
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if modified is not None:
+            os.utime(tmp_path, (modified, modified))
+        with metrics.fs_timer('rename'):
+            os.replace(tmp_path, self.path(filename))
+
+    def save(self, filename, scene_data, temp_scenes=()):
+        # 把临时原图移到场景名下并记录到场景数据中，然后写入场景
+        # 同一模型有多张临时原图时，按时间先后移动，保留最新上传的一张
+        moved = {}
+        for temp_scene in temp_scenes:
+            moved.update(self.originals.move(temp_scene, scene_name(filename)))
+        _attach_originals(scene_data, moved)
+        self.put_document(filename, encode(scene_data))
+        return scene_data
+
+    def rename(self, old_filename, new_filename):
+        # 先写新文件，再移动原图（文件名前缀一并替换），最后删除旧文件；返回更新后的场景数据
+        scene_data = self.load(old_filename)
+        if old_filename == new_filename:
+            return scene_data
+        if self.exists(new_filename):
+            raise SceneExists(new_filename)
+        self.put_document(new_filename, encode(scene_data))
+        moved = self.originals.move(scene_name(old_filename), scene_name(new_filename))
+        _rename_originals(scene_data, moved)
+        if moved:
+            self.put_document(new_filename, encode(scene_data))
+        os.remove(self.path(old_filename))
+        return scene_data
+
+    def delete(self, filename):
+        try:
+            os.remove(self.path(filename))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scene_documents (
+    filename TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    digest TEXT NOT NULL,
+    modified REAL NOT NULL
+)
+'''
+
+
+class SQLiteSceneStore:
+    def __init__(self, originals):
+        # 与原图索引共用同一个数据库和每线程连接，场景和原图的改动可以放在同一个事务中
+        self.originals = originals
+        with self.connection() as conn:
+            conn.execute(_SCHEMA)
+
+    def connection(self):
+        return self.originals.connection()
+
+    def names(self):
+        return [row[0] for row in self.connection().execute('SELECT filename FROM scene_documents')]
+
+    def exists(self, filename):
+        return self.connection().execute('SELECT 1 FROM scene_documents WHERE filename = ?',
+                                         (filename,)).fetchone() is not None
+
+    def modified(self, filename):
+        row = self.connection().execute('SELECT modified FROM scene_documents WHERE filename = ?',
+                                        (filename,)).fetchone()
+        if row is None:
+            raise SceneNotFound(filename)
+        return row[0]
+
+    def load(self, filename):
+        return json.loads(self.document(filename)[0])
+
+    def document(self, filename):
+        row = self.connection().execute('SELECT data, digest, modified FROM scene_documents WHERE filename = ?',
+                                        (filename,)).fetchone()
+        if row is None:
+            raise SceneNotFound(filename)
+        return bytes(row[0]), row[1], row[2]
+
+    def _write(self, conn, filename, data, modified=None):
+        conn.execute('INSERT OR REPLACE INTO scene_documents (filename, data, digest, modified) VALUES (?, ?, ?, ?)',
+                     (filename, data, hashlib.sha256(data).hexdigest(), modified or time.time()))
+
+    def put_document(self, filename, data, modified=None):
+        with self.connection() as conn:
+            self._write(conn, filename, data, modified)
+
+    def save(self, filename, scene_data, temp_scenes=()):
+        conn = self.connection()
+        replaced = []
+        with conn:
+            moved = {}
+            for temp_scene in temp_scenes:
+                rows, obsolete = self.originals.move_rows(conn, temp_scene, scene_name(filename))
+                moved.update(rows)
+                replaced += obsolete
+            _attach_originals(scene_data, moved)
+            self._write(conn, filename, encode(scene_data))
+        self.originals.remove_files(replaced)
+        return scene_data
+
+    def rename(self, old_filename, new_filename):
+        # 场景文档和原图记录在同一个事务中改名，原图文件名保持不变
+        conn = self.connection()
+        with conn:
+            row = conn.execute('SELECT data FROM scene_documents WHERE filename = ?', (old_filename,)).fetchone()
+            if row is None:
+                raise SceneNotFound(old_filename)
+            scene_data = json.loads(bytes(row[0]))
+            if old_filename == new_filename:
+                return scene_data
+            if conn.execute('SELECT 1 FROM scene_documents WHERE filename = ?', (new_filename,)).fetchone():
+                raise SceneExists(new_filename)
+            moved, replaced = self.originals.move_rows(conn, scene_name(old_filename), scene_name(new_filename))
+            _rename_originals(scene_data, moved)
+            conn.execute('DELETE FROM scene_documents WHERE filename = ?', (old_filename,))
+            self._write(conn, new_filename, encode(scene_data))
+        self.originals.remove_files(replaced)
+        return scene_data
+
+    def delete(self, filename):
+        with self.connection() as conn:
+            return conn.execute('DELETE FROM scene_documents WHERE filename = ?', (filename,)).rowcount > 0
+
+
+BACKENDS = ('files', 'sqlite')
+
+
+def open_store(backend, scenes_folder, originals):
+    if backend == 'files':
+        return FileSceneStore(scenes_folder, originals)
+    if backend == 'sqlite':
+        return SQLiteSceneStore(originals)
+    raise ValueError(f'未知的场景存储: {backend}')
+
+
+def migrate(source, target):
+    # 把 source 中的全部场景复制到 target（保留修改时间），返回场景数。
+    # 迁移到 files 时把原图文件名前缀改回所属场景名，并同步场景数据中记录的原图文件名
+    if isinstance(target, FileSceneStore):
+        target.originals.normalize_filenames()
+    count = 0
+    for filename in source.names():
+        data, _, modified = source.document(filename)
+        originals = dict(target.originals.list_scene(scene_name(filename)))
+        if originals:
+            scene_data = json.loads(data)
+            _rename_originals(scene_data, originals)
+            data = encode(scene_data)
+        target.put_document(filename, data, modified)
+        count += 1
+    return count
+
+
+if __name__ == '__main__':
+    base_dir = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+    if len(sys.argv) == 4 and sys.argv[1] == 'migrate' and sys.argv[2] in BACKENDS and sys.argv[3] in BACKENDS:
+        originals = OriginalImageIndex(os.path.join(base_dir, 'index.db'), os.path.join(base_dir, 'original_images'))
+        scenes_folder = os.path.join(base_dir, 'scenes')
+        start = time.time()
+        count = migrate(open_store(sys.argv[2], scenes_folder, originals),
+                        open_store(sys.argv[3], scenes_folder, originals))
+        print(f"迁移完成，共 {count} 个场景，耗时 {time.time() - start:.2f}s")
+        print(f"启动时设置 SCENE_STORE={sys.argv[3]} 使用新的存储")
+    else:
+        print("用法: python scene_store.py migrate files|sqlite files|sqlite")
@@ -0,0 +1,155 @@
+import os
+import json
+import tempfile
+import numpy as np
+import asset_store
+import deviation
+import mesh_utils
+import textures
+import thumbnail
+
+# 在任务队列工作进程中执行的后台任务。参数必须能序列化为 JSON（任务记录会持久化），
+# 且本模块不能依赖 app：工作进程按名称导入本模块执行任务，不启动 Flask 应用和任务队列
+
+
+def mesh_level_paths(blob_folder, digest):
+    # 完整二进制网格和各级 LOD 的缓存路径，均以源文件哈希为键
+    mesh_path = asset_store.derived_path(blob_folder, digest, mesh_utils.MESH_SUFFIX)
+    lod_paths = {level: asset_store.derived_path(blob_folder, digest, mesh_utils.lod_suffix(level))
+                 for level in mesh_utils.LOD_LEVELS}
+    return mesh_path, lod_paths
+
+
+def build_mesh(obj_path, blob_folder, digest, progress=None):
+    mesh_path, lod_paths = mesh_level_paths(blob_folder, digest)
+    mesh_utils.build_levels(obj_path, mesh_path, lod_paths, progress)
+
+
+def precompress(path, blob_folder, digest, progress=None):
+    asset_store.precompress(path, blob_folder, digest)
+
+
+def stats_path(blob_folder, digest):
+    return asset_store.derived_path(blob_folder, digest, mesh_utils.STATS_SUFFIX)
+
+
+def read_stats(blob_folder, digest):
+    # 读取已生成的网格统计，还没有时返回 None
+    path = stats_path(blob_folder, digest)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compute_stats(obj_path, blob_folder, digest, progress=None):
+    # 网格统计写入源 blob 旁的 JSON 文件，已存在时直接读取
+    stats = read_stats(blob_folder, digest)
+    if stats is not None:
+        return stats
+    path = stats_path(blob_folder, digest)
+    stats = mesh_utils.mesh_stats(obj_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, path)
+    return stats
+
+
+def build_texture_variants(path, blob_folder, digest, progress=None):
+    textures.build_variants(path, blob_folder, digest, progress)
+
+
+def thumbnail_path(blob_folder, key, suffix):
+    return asset_store.derived_path(blob_folder, key, suffix)
+
+
+def _load_geometry(obj_path, blob_folder, digest):
+    # 优先读取后台生成的二进制网格，否则直接解析 OBJ；返回 (位置, 面, 每个角点的 UV 或 None)
+    mesh_path, _ = mesh_level_paths(blob_folder, digest)
+    if os.path.exists(mesh_path):
+        positions, _, uvs, indices = mesh_utils.read_mesh(mesh_path)
+        faces = indices.reshape(-1, 3)
+        return positions, faces, uvs[faces] if uvs is not None else None
+    mesh = mesh_utils.parse_obj(obj_path)
+    if mesh.face_v is None:
+        return mesh.vertices, np.zeros((0, 3), dtype=np.int64), None
+    valid = mesh_utils.valid_triangles(mesh)
+    corner_uvs = mesh.texcoords[mesh.face_t[valid]] if mesh.face_t is not None else None
+    return mesh.vertices, mesh.face_v[valid], corner_uvs
+
+
+def _write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_png(path, image):
+    _write_file(path, thumbnail.encode_png(image))
+
+
+def render_model_thumbnail(obj_path, digest, mtl_path, texture_path, blob_folder, key, progress=None):
+    # 模型的多视角缩略图，以 OBJ/MTL/贴图的组合哈希为键缓存，返回 PNG 路径
+    path = thumbnail_path(blob_folder, key, thumbnail.MODEL_SUFFIX)
+    if os.path.exists(path):
+        return path
+    color = None
+    if mtl_path:
+        color, _ = thumbnail.read_material(mtl_path)
+    texture = thumbnail.load_texture(texture_path)
+    positions, faces, corner_uvs = _load_geometry(obj_path, blob_folder, digest)
+    _write_png(path, thumbnail.model_thumbnail(positions, faces, corner_uvs, texture, color))
+    return path
+
+
+def render_scene_thumbnail(models, blob_folder, key, progress=None):
+    # models: [[OBJ 路径, OBJ 哈希, MTL 路径, 贴图路径, 模型缓存键], ...]
+    # 先渲染（或读取已缓存的）各模型缩略图，再拼接为场景缩略图，返回 PNG 路径
+    path = thumbnail_path(blob_folder, key, thumbnail.SCENE_SUFFIX)
+    if os.path.exists(path):
+        return path
+    models = models[:thumbnail.SCENE_MAX_MODELS]
+    images = []
+    for i, (obj_path, digest, mtl_path, texture_path, model_key) in enumerate(models):
+        with open(render_model_thumbnail(obj_path, digest, mtl_path, texture_path, blob_folder, model_key), 'rb') as f:
+            images.append(thumbnail.decode_png(f.read()))
+        if progress:
+            progress((i + 1) / len(models))
+    _write_png(path, thumbnail.scene_thumbnail(images))
+    return path
+
+
+def deviation_paths(blob_folder, key):
+    # 单方向偏差的缓存：逐顶点距离（little-endian float32）和统计 JSON
+    return (asset_store.derived_path(blob_folder, key, deviation.DISTANCE_SUFFIX),
+            asset_store.derived_path(blob_folder, key, deviation.SUMMARY_SUFFIX))
+
+
+def _surface(mesh):
+    if mesh.face_v is None:
+        return np.zeros((0, 3), dtype=np.int64)
+    return mesh.face_v[mesh_utils.valid_triangles(mesh)]
+
+
+def compute_deviation(path_a, digest_a, path_b, digest_b, blob_folder, progress=None):
+    # 两个方向分别计算：A 的每个顶点（按 OBJ 中 v 的顺序）到 B 表面的距离，以及 B 到 A；
+    # 以有方向的内容哈希对为键缓存，已存在的方向直接跳过
+    meshes = {}
+    directions = ((path_a, digest_a, path_b, digest_b), (path_b, digest_b, path_a, digest_a))
+    for i, (source, source_digest, target, target_digest) in enumerate(directions):
+        distance_path, summary_path = deviation_paths(blob_folder, deviation.pair_key(source_digest, target_digest))
+        if os.path.exists(summary_path):
+            continue
+        for path in (source, target):
+            if path not in meshes:
+                meshes[path] = mesh_utils.parse_obj(path)
+        points = meshes[source].vertices
+        positions, faces = meshes[target].vertices, _surface(meshes[target])
+        report = (lambda value, i=i: progress((i + value) / 2)) if progress else None
+        distances = deviation.nearest_distances(points, positions, faces, progress=report)
+        _write_file(distance_path, distances.astype('<f4').tobytes())
+        _write_file(summary_path, json.dumps(deviation.summarize(distances, positions, faces)).encode('utf-8'))
@@ -0,0 +1,22 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    # app 在导入时按 DATA_DIR 建立各目录和数据库，整个测试会话共用一个临时数据目录
+    os.environ['DATA_DIR'] = str(tmp_path_factory.mktemp('data'))
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    module = importlib.import_module('app')
+    yield module
+    module.job_queue.shutdown()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,170 @@
+import io
+import hashlib
+import time
+
+OBJ = b'mtllib model.mtl\nv 0 0 0\nv 1 0 0\nv 0 1 0\nusemtl m\nf 1 2 3\n'
+
+
+def upload(client, name, data):
+    return client.post('/upload', data={'file': (io.BytesIO(data), name)})
+
+
+def test_upload_obj(client):
+    response = upload(client, 'model.obj', OBJ)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['filepath'].endswith('/model.obj')
+    assert {'mesh', 'stats', 'precompress'} <= set(result['jobs'])
+
+
+def test_upload_non_ascii_filename(client):
+    # secure_filename 去掉中文后文件名没有扩展名，上传仍然成功（与之前的行为一致）
+    response = upload(client, '模型.obj', OBJ)
+    assert response.status_code == 200
+    assert response.get_json()['filename'] == 'obj'
+    assert client.get(response.get_json()['filepath']).status_code == 200
+
+
+def wait_job(client, job_id):
+    for _ in range(600):
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'任务 {job_id} 未完成')
+
+
+def test_pending_stats_are_backfilled(client, app_module):
+    # 保存时统计尚未完成（stats 为 null）的场景，任务完成后读取时补上并写回
+    result = upload(client, 'model.obj', OBJ).get_json()
+    assert wait_job(client, result['jobs']['stats'])['status'] == 'done'
+    scene_data = {'models': [{'objFile': result['filepath'], 'stats': None}]}
+    for filename in ('scene-pending-get.json', 'scene-pending-list.json'):
+        app_module.store.put_document(filename, app_module.scene_store.encode(scene_data))
+        app_module.catalog.put(filename, scene_data)
+
+    stats = client.get('/scenes/scene-pending-get.json').get_json()['models'][0]['stats']
+    assert stats['vertices'] == 3
+    assert app_module.store.load('scene-pending-get.json')['models'][0]['stats'] == stats
+
+    scenes = client.get('/list-scenes?stats=1').get_json()
+    for scene in scenes:
+        if scene['filename'].startswith('scene-pending-'):
+            assert scene['models'][0]['stats'] == stats
+    assert app_module.store.load('scene-pending-list.json')['models'][0]['stats'] == stats
+
+
+def test_thumbnail_is_rendered_in_background(client):
+    # 尚未生成时返回 202 和任务ID，任务完成后返回 PNG
+    result = upload(client, 'thumb.obj', OBJ + b'v 0 0 1\nf 1 2 4\n').get_json()
+    url = '/uploads/thumbnail' + result['filepath'][len('/uploads'):]
+    response = client.get(url)
+    assert response.status_code == 202
+    assert response.headers['Retry-After']
+    assert wait_job(client, response.get_json()['job'])['status'] == 'done'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+
+
+def test_mesh_with_several_materials_is_rejected(client):
+    # 二进制网格只有一个材质，转换任务失败后返回 422，前端改用 OBJLoader
+    data = OBJ + b'usemtl n\nf 1 3 2\n'
+    result = upload(client, 'materials.obj', data).get_json()
+    assert wait_job(client, result['jobs']['mesh'])['status'] == 'failed'
+    assert client.get(result['mesh']).status_code == 422
+
+
+def test_upload_paths_are_revalidated(client):
+    # 按路径访问时每次用 ETag 重新验证，带 ?v=<hash> 的 URL 才允许长期缓存
+    result = upload(client, 'cache.obj', OBJ + b'# cache\n').get_json()
+    response = client.get(result['filepath'])
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+    assert response.get_etag()[0] == result['hash']
+    assert client.get(result['filepath'], headers={'If-None-Match': f'"{result["hash"]}"'}).status_code == 304
+    response = client.get(f'{result["filepath"]}?v={result["hash"]}')
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 3600
+
+
+def test_save_and_get_scene(client):
+    obj = upload(client, 'scene.obj', OBJ).get_json()
+    response = client.post('/save-scene', json={'models': [{'objFile': obj['filepath']}]})
+    assert response.status_code == 200
+    filename = response.get_json()['filename']
+    scene = client.get(f'/scenes/{filename}')
+    assert scene.status_code == 200
+    assert scene.get_json()['models'][0]['objFile'] == obj['filepath']
+    assert any(item['filename'] == filename for item in client.get('/list-scenes').get_json())
+
+    # 未变化时 304，Range 返回 206 和对应的字节
+    etag = scene.headers['ETag']
+    assert client.get(f'/scenes/{filename}', headers={'If-None-Match': etag}).status_code == 304
+    partial = client.get(f'/scenes/{filename}', headers={'Range': 'bytes=0-9'})
+    assert partial.status_code == 206
+    assert partial.data == scene.data[:10]
+    assert partial.headers['Content-Range'] == f'bytes 0-9/{len(scene.data)}'
+
+    assert client.delete(f'/scenes/{filename}').get_json()['success']
+    assert client.get(f'/scenes/{filename}').status_code == 404
+
+
+def test_upload_range(client):
+    result = upload(client, 'range.obj', OBJ + b'# range\n').get_json()
+    response = client.get(result['filepath'], headers={'Range': 'bytes=2-7', 'Accept-Encoding': 'identity'})
+    assert response.status_code == 206
+    assert response.data == (OBJ + b'# range\n')[2:8]
+
+
+def test_chunked_upload(client):
+    data = OBJ + b'# ' + b'x' * 100 + b'\n'
+    created = client.post('/upload/chunked', json={'filename': 'chunked.obj', 'size': len(data), 'chunkSize': 64})
+    assert created.status_code == 200
+    upload_id, chunk_size = created.get_json()['uploadId'], created.get_json()['chunkSize']
+    # 分块可以乱序上传
+    for offset in reversed(range(0, len(data), chunk_size)):
+        response = client.put(f'/upload/chunked/{upload_id}?offset={offset}', data=data[offset:offset + chunk_size])
+        assert response.status_code == 200
+    assert client.get(f'/upload/chunked/{upload_id}').get_json()['missingChunks'] == []
+    result = client.post(f'/upload/chunked/{upload_id}/complete').get_json()
+    assert result['filename'] == 'chunked.obj'
+    # 与 /upload 相同，OBJ 保存时会补全材质声明
+    saved = client.get(result['filepath'], headers={'Accept-Encoding': 'identity'}).data
+    assert hashlib.sha256(saved).hexdigest() == result['hash']
+    assert saved.endswith(b'x' * 100 + b'\n')
+
+
+def test_batch_upload(client):
+    form = {
+        'model0': [(io.BytesIO(OBJ), 'a.obj'), (io.BytesIO(b'newmtl m\nKd 1 0 0\n'), 'a.mtl')],
+        'model1': [(io.BytesIO(OBJ + b'# b\n'), 'b.obj')],
+    }
+    response = client.post('/upload/batch', data=form)
+    assert response.status_code == 200
+    groups = response.get_json()['groups']
+    assert [group['group'] for group in groups] == ['model0', 'model1']
+    assert groups[0]['folder'] != groups[1]['folder']
+    assert [item['filename'] for item in groups[0]['files']] == ['a.obj', 'a.mtl']
+    for group in groups:
+        for item in group['files']:
+            assert client.get(item['filepath']).status_code == 200
+
+
+def test_batch_upload_rejects_unsupported_files(client):
+    response = client.post('/upload/batch', data={'model0': [(io.BytesIO(b'x'), 'a.exe')]})
+    assert response.status_code == 400
+
+
+def test_jobs_and_metrics(client):
+    result = upload(client, 'jobs.obj', OBJ + b'# jobs\n').get_json()
+    job_id = result['jobs']['mesh']
+    assert client.get(f'/jobs/{job_id}').get_json()['kind'] == 'mesh'
+    assert job_id in [job['id'] for job in client.get('/jobs?limit=1000').get_json()]
+    assert client.get('/jobs/missing').status_code == 404
+
+    # 请求指标在响应关闭时记录
+    client.get('/jobs').close()
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'upload_size_bytes_count{type="obj"}' in text
+    assert 'http_requests_total{route="/jobs",method="GET",status="200"}' in text
@@ -0,0 +1,25 @@
+import os
+import hashlib
+
+import asset_store
+
+
+def test_dedupe_without_hardlinks(tmp_path, monkeypatch):
+    # 文件系统不支持硬链接时，上传文件复制到存储中，原路径改为引用文件
+    uploads, blobs = tmp_path / 'uploads', tmp_path / 'blobs'
+    for folder in ('a', 'b'):
+        (uploads / folder).mkdir(parents=True)
+        (uploads / folder / 'model.obj').write_bytes(b'v 0 0 0\n')
+
+    def link(src, dst):
+        raise OSError('不支持硬链接')
+    monkeypatch.setattr(os, 'link', link)
+
+    assert asset_store.dedupe(str(uploads), str(blobs)) == len(b'v 0 0 0\n')
+    digest = hashlib.sha256(b'v 0 0 0\n').hexdigest()
+    for folder in ('a', 'b'):
+        assert not (uploads / folder / 'model.obj').exists()
+        assert (uploads / folder / ('model.obj' + asset_store.REF_SUFFIX)).read_text() == digest
+        path = asset_store.resolve(str(uploads), f'{folder}/model.obj', str(blobs))
+        assert path == asset_store.blob_path(str(blobs), digest)
+    assert not [name for name in os.listdir(blobs) if name.endswith('.part')]
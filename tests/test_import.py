@@ -0,0 +1,42 @@
+import io
+import zipfile
+
+import scene_archive
+
+OBJ = 'mtllib m.mtl\nv 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n'
+
+
+def archive(entries):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def read(entries):
+    allowed = lambda name: name.rsplit('.', 1)[-1].lower() in ('obj', 'mtl', 'jpg', 'jpeg', 'png')
+    zf = zipfile.ZipFile(io.BytesIO(archive(entries)))
+    return scene_archive.read_scenes(zf, 'default', allowed, 1 << 30)
+
+
+def test_original_must_be_a_single_image():
+    scene, = read({'s/模型1/original.obj': OBJ, 's/模型1/original.jpg': b'img',
+                   's/模型2/original.jpg': b'a', 's/模型2/original.png': b'b'})
+    first, second = scene['models'][1], scene['models'][2]
+    assert first['original'][0] == 'original.jpg'
+    assert [name for name, _ in first['files']] == ['original.obj']
+    # 两张 original.* 图片无法区分哪张是原图，都按普通文件导入
+    assert second['original'] is None
+    assert sorted(name for name, _ in second['files']) == ['original.jpg', 'original.png']
+
+
+def test_import_non_ascii_entries(client):
+    data = archive({'场景/模型1/模型.obj': OBJ, '场景/模型1/材质.mtl': 'newmtl a\n', '场景/模型1/贴图.jpg': b'\xff\xd8jpeg'})
+    response = client.post('/import-scenes', data=data, content_type='application/zip')
+    assert response.status_code == 200, response.get_json()
+    scene, = response.get_json()['scenes']
+    document = client.get(f"/scenes/{scene['filename']}").get_json()
+    model, = document['models']
+    assert client.get(model['objFile']).data.startswith(b'mtllib')
+    assert client.get(model['textureFile']).data == b'\xff\xd8jpeg'
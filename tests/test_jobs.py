@@ -0,0 +1,22 @@
+import time
+
+import jobs
+
+
+def test_submit_before_start_is_dispatched_once(tmp_path):
+    # 启动前提交的任务只记录，start() 恢复时派发一次
+    queue = jobs.JobQueue(str(tmp_path / 'jobs.db'), {'check': 'os.path:isfile'}, max_workers=1)
+    job_id = queue.submit('check', 'a', str(tmp_path))
+    assert queue.pool is None
+    assert queue.get(job_id)['status'] == jobs.QUEUED
+    try:
+        assert queue.start() == 1
+        assert queue.start() == 0
+        for _ in range(600):
+            if queue.get(job_id)['status'] not in (jobs.QUEUED, jobs.RUNNING):
+                break
+            time.sleep(0.05)
+        # os.path.isfile 不接受 progress 参数，任务在工作进程中执行后记为失败
+        assert queue.get(job_id)['status'] == jobs.FAILED
+    finally:
+        queue.shutdown()
@@ -0,0 +1,94 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mesh_utils
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'model.obj'
+    path.write_text(text)
+    return str(path)
+
+
+def test_relative_indices_use_counts_at_the_face(tmp_path):
+    # 两个对象都用 f -3 -2 -1，各自引用自己的三个顶点
+    path = write(tmp_path, 'o a\nv 0 0 0\nv 1 0 0\nv 0 1 0\nf -3 -2 -1\n'
+                           'o b\nv 0 0 1\nv 1 0 1\nv 0 1 1\nf -3 -2 -1\n')
+    mesh = mesh_utils.parse_obj(path)
+    assert mesh.face_v.tolist() == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_relative_indices_for_texcoords_and_normals(tmp_path):
+    path = write(tmp_path, 'v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 0\nvt 0 1\nvn 0 0 1\n'
+                           'f -3/-3/-1 -2/-2/-1 -1/-1/-1\n'
+                           'v 0 0 1\nvt 1 1\nf 1/1/1 2/2/1 -1/-1/-1\n')
+    mesh = mesh_utils.parse_obj(path)
+    assert mesh.face_v.tolist() == [[0, 1, 2], [0, 1, 3]]
+    assert mesh.face_t.tolist() == [[0, 1, 2], [0, 1, 3]]
+    assert mesh.face_n.tolist() == [[0, 0, 0], [0, 0, 0]]
+
+
+def test_out_of_range_relative_index_is_dropped(tmp_path):
+    path = write(tmp_path, 'v 0 0 0\nv 1 0 0\nv 0 1 0\nf -4 -2 -1\nf 1 2 3\n')
+    mesh = mesh_utils.parse_obj(path)
+    assert mesh_utils.valid_triangles(mesh).tolist() == [False, True]
+
+
+def test_mixed_face_formats_in_one_run(tmp_path):
+    # 同一段面定义中混用 v、v/vt、v//vn、v/vt/vn
+    path = write(tmp_path, 'v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nvt 0 0\nvt 1 0\nvt 0 1\nvn 0 0 1\n'
+                           'f 1 2 3\nf 2/2 4/1 3/3\nf 1//1 2//1 4//1\nf 1/1/1 2/2/1 3/3/1\n')
+    mesh = mesh_utils.parse_obj(path)
+    assert mesh.face_v.tolist() == [[0, 1, 2], [1, 3, 2], [0, 1, 3], [0, 1, 2]]
+    # 缺少 vt/vn 的角点指向补在末尾的一行 0
+    assert mesh.face_t.tolist() == [[3, 3, 3], [1, 0, 2], [3, 3, 3], [0, 1, 2]]
+    assert mesh.face_n.tolist() == [[1, 1, 1], [1, 1, 1], [0, 0, 0], [0, 0, 0]]
+    assert mesh_utils.valid_triangles(mesh).all()
+
+
+def test_mixed_formats_with_quads(tmp_path):
+    path = write(tmp_path, 'v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nvn 0 0 1\n'
+                           'f 1 2 3 4\nf 1//1 2//1 3//1\n')
+    mesh = mesh_utils.parse_obj(path)
+    assert mesh.face_v.tolist() == [[0, 1, 2], [0, 2, 3], [0, 1, 2]]
+    positions, normals, uvs, indices = mesh_utils.to_buffers(mesh)
+    assert len(indices) == 9
+    assert uvs is None
+    # 四边形的 4 个角点（法线为补的 0）与三角形的 3 个角点（带法线）是不同的渲染顶点
+    assert len(positions) == len(normals) == 7
+
+
+def test_inline_comments_and_indentation(tmp_path):
+    path = write(tmp_path, '# 导出的模型\n  v 0 0 0 # a\n\tv 1 0 0\nv 0 1 0#b\n'
+                           '  f 1 2 3 # c\n')
+    mesh = mesh_utils.parse_obj(path)
+    assert mesh.vertices.tolist() == [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+    assert mesh.face_v.tolist() == [[0, 1, 2]]
+    stats = mesh_utils.mesh_stats(path)
+    assert stats['vertices'] == 3
+    assert stats['faces'] == 1
+
+
+def test_extra_tokens_are_ignored(tmp_path):
+    # 顶点颜色等多出的分量只取前 3 个，不是数字的内容丢弃
+    path = write(tmp_path, 'v 0 0 0 1 0 0\nv 1 0 0 x\nv 0 1 0\nf 1 2 3 x\n')
+    mesh = mesh_utils.parse_obj(path)
+    assert mesh.vertices.tolist() == [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+    assert mesh.face_v.tolist() == [[0, 1, 2]]
+
+
+def test_materials_with_faces(tmp_path):
+    # 没有面的 usemtl 不计入
+    path = write(tmp_path, 'v 0 0 0\nv 1 0 0\nv 0 1 0\nusemtl unused\nusemtl a\nf 1 2 3\n')
+    assert mesh_utils.parse_obj(path).materials == ['a']
+
+
+def test_multiple_materials_are_unsupported(tmp_path):
+    path = write(tmp_path, 'v 0 0 0\nv 1 0 0\nv 0 1 0\nusemtl a\nf 1 2 3\nusemtl b\nf 1 3 2\n')
+    mesh_path = str(tmp_path / 'model.mesh')
+    with pytest.raises(mesh_utils.UnsupportedMesh):
+        mesh_utils.build_levels(path, mesh_path, {})
+    assert not os.path.exists(mesh_path)
@@ -0,0 +1,23 @@
+import scene_store
+from original_index import OriginalImageIndex
+
+
+def test_migrate_between_backends(tmp_path):
+    (tmp_path / 'original_images').mkdir()
+    originals = OriginalImageIndex(str(tmp_path / 'index.db'), str(tmp_path / 'original_images'))
+    files = scene_store.open_store('files', str(tmp_path / 'scenes'), originals)
+    scene = {'models': [{'objFile': '/uploads/a/model.obj', 'stats': None}], 'name': '场景'}
+    files.put_document('scene-a.json', scene_store.encode(scene), modified=1000000000.0)
+
+    sqlite = scene_store.open_store('sqlite', str(tmp_path / 'scenes'), originals)
+    assert scene_store.migrate(files, sqlite) == 1
+    data, digest, modified = sqlite.document('scene-a.json')
+    assert sqlite.load('scene-a.json') == scene
+    assert data == files.document('scene-a.json')[0]
+    assert modified == 1000000000.0
+
+    # 迁回 files，内容和修改时间不变
+    files.delete('scene-a.json')
+    assert scene_store.migrate(sqlite, files) == 1
+    assert files.load('scene-a.json') == scene
+    assert files.modified('scene-a.json') == 1000000000.0
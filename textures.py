@@ -0,0 +1,134 @@
+import os
+import json
+import tempfile
+import asset_store
+
+try:
+    from PIL import Image, features
+except ImportError:
+    # Pillow 为可选依赖，未安装时不生成贴图派生文件，/uploads 始终返回原图
+    Image = None
+    features = None
+
+# 贴图派生文件：按长边缩小的分辨率金字塔（原格式）以及各级（含原尺寸）的 WebP 副本，
+# 与源 blob 放在一起，清单文件记录原图尺寸和已生成的派生文件，请求时只读清单选择，不在请求中编码
+
+TEXTURE_VERSION = 1
+TEXTURE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+# 金字塔各级的长边像素，从大到小；不小于原图长边的级别不生成
+TEXTURE_SIZES = (4096, 2048, 1024, 512)
+MANIFEST_SUFFIX = f'.tex.v{TEXTURE_VERSION}.json'
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# format 参数取值：original（默认）为源格式，webp，auto 按 Accept 头选择
+FORMATS = ('original', 'webp', 'auto')
+
+_MIMETYPES = {'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+
+
+def available():
+    return Image is not None
+
+
+def webp_supported():
+    return Image is not None and features.check('webp')
+
+
+def variant_suffix(size, fmt):
+    # size 为 None 表示原尺寸
+    return f'.tex{size or "full"}.v{TEXTURE_VERSION}.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def variant_path(blob_folder, digest, size, fmt):
+    return asset_store.derived_path(blob_folder, digest, variant_suffix(size, fmt))
+
+
+def manifest_path(blob_folder, digest):
+    return asset_store.derived_path(blob_folder, digest, MANIFEST_SUFFIX)
+
+
+def mimetype(fmt):
+    return _MIMETYPES[fmt]
+
+
+def _source_format(path):
+    return 'png' if path.lower().endswith('.png') else 'jpeg'
+
+
+def _write_image(image, path, fmt):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if fmt == 'jpeg':
+                image.convert('RGB').save(f, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            elif fmt == 'webp':
+                image.save(f, 'WEBP', quality=WEBP_QUALITY, method=4)
+            else:
+                image.save(f, 'PNG', optimize=True)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def build_variants(path, blob_folder, digest, progress=None):
+    # 生成源 blob 旁的各级派生文件和清单，返回清单；清单已存在时直接读取
+    target = manifest_path(blob_folder, digest)
+    if os.path.exists(target):
+        return read_manifest(target)
+    if Image is None:
+        return None
+    source_format = _source_format(path)
+    with Image.open(path) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        width, height = image.size
+        longest = max(width, height)
+        sizes = [size for size in TEXTURE_SIZES if size < longest]
+        webp = webp_supported()
+        variants = []
+        steps = len(sizes) + (1 if webp else 0)
+        if webp:
+            _write_image(image, variant_path(blob_folder, digest, None, 'webp'), 'webp')
+            variants.append({'size': None, 'format': 'webp'})
+        # 每一级由上一级缩小，比每次都从原图缩小快得多
+        current = image
+        for i, size in enumerate(sizes):
+            scale = size / longest
+            current = current.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                                     Image.LANCZOS)
+            for fmt in (source_format, 'webp') if webp else (source_format,):
+                _write_image(current, variant_path(blob_folder, digest, size, fmt), fmt)
+                variants.append({'size': size, 'format': fmt})
+            if progress:
+                progress((i + 1 + (1 if webp else 0)) / steps)
+    manifest = {'width': width, 'height': height, 'format': source_format, 'variants': variants}
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.part')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, target)
+    return manifest
+
+
+def read_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def select_variant(manifest, size, fmt):
+    # 选择能满足请求长边 size 的最小一级（size 为 None 时为原尺寸），返回 (级别, 格式) 或 None（返回原图）
+    # 所选级别没有对应格式的副本时退回源格式；源格式的原尺寸就是原图本身
+    levels = sorted({variant['size'] for variant in manifest['variants'] if variant['size']})
+    level = None
+    if size is not None:
+        level = next((candidate for candidate in levels if candidate >= size), None)
+    generated = {(variant['size'], variant['format']) for variant in manifest['variants']}
+    if fmt == 'webp' and (level, 'webp') in generated:
+        return level, 'webp'
+    if (level, manifest['format']) in generated:
+        return level, manifest['format']
+    return None
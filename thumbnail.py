@@ -0,0 +1,313 @@
+import os
+import math
+import zlib
+import struct
+import hashlib
+import numpy as np
+import logs
+
+try:
+    from PIL import Image
+except ImportError:
+    # Pillow 为可选依赖，未安装时不采样贴图，使用材质的 Kd 颜色
+    Image = None
+
+log = logs.get(__name__)
+
+# 缩略图：纯 numpy 的软件光栅化（正交投影、z-buffer、Lambert 平面着色、可选贴图采样），
+# 不需要 GPU 或 OpenGL。模型缩略图为 2x2 的多视角拼图，场景缩略图为各模型斜视图的拼图
+
+THUMBNAIL_VERSION = 1
+MODEL_SUFFIX = f'.thumb.v{THUMBNAIL_VERSION}.png'
+SCENE_SUFFIX = f'.scene-thumb.v{THUMBNAIL_VERSION}.png'
+
+# 单个视角的边长（像素），内部按 SUPERSAMPLE 倍分辨率渲染后缩小以抗锯齿
+VIEW_SIZE = 128
+SUPERSAMPLE = 2
+# 视角（绕 Y 轴、绕 X 轴旋转的角度）：斜视、正面、侧面、顶面；第一个用于场景缩略图
+VIEWS = ((-35, 25), (0, 0), (-90, 0), (0, 90))
+# 场景缩略图最多拼接的模型数
+SCENE_MAX_MODELS = 9
+BACKGROUND = (236, 238, 241)
+DEFAULT_COLOR = (0.72, 0.72, 0.72)
+AMBIENT = 0.35
+# 贴图加载后的最大边长，缩略图不需要更高的分辨率
+TEXTURE_MAX_SIZE = 512
+# 光栅化时每批处理的候选像素数，限制临时数组的内存
+_CANDIDATE_CHUNK = 1 << 20
+_LIGHT = np.array([0.35, 0.5, 1.0]) / np.linalg.norm([0.35, 0.5, 1.0])
+
+
+def model_key(*digests):
+    # 模型缩略图的缓存键：OBJ、MTL、贴图任一变化都重新渲染
+    return hashlib.sha256(f'thumbnail:{":".join(d or "" for d in digests)}'.encode('utf-8')).hexdigest()
+
+
+def scene_key(model_keys):
+    return hashlib.sha256(f'scene-thumbnail:{":".join(model_keys)}'.encode('utf-8')).hexdigest()
+
+
+# ---- 材质 ----
+
+def mtllib_name(obj_path, limit=64 * 1024):
+    # OBJ 开头声明的第一个材质库文件名
+    with open(obj_path, 'rb') as f:
+        head = f.read(limit)
+    for line in head.split(b'\n'):
+        if line.startswith(b'mtllib'):
+            name = line[len(b'mtllib'):].strip().decode('utf-8', 'replace')
+            return name or None
+    return None
+
+
+def read_material(mtl_path):
+    # 返回第一个材质的 (Kd 颜色或 None, map_Kd 贴图文件名或 None)
+    color = texture = None
+    with open(mtl_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == 'newmtl' and (color or texture):
+                break
+            if parts[0] == 'Kd' and len(parts) >= 4:
+                try:
+                    color = tuple(min(max(float(value), 0.0), 1.0) for value in parts[1:4])
+                except ValueError:
+                    pass
+            elif parts[0] == 'map_Kd' and len(parts) >= 2:
+                # 贴图文件名在选项之后，取最后一项
+                texture = os.path.basename(parts[-1])
+    return color, texture
+
+
+def load_texture(path):
+    # 返回 RGB uint8 数组；未安装 Pillow 或无法解码时返回 None
+    if Image is None or not path:
+        return None
+    try:
+        with Image.open(path) as image:
+            # JPEG 可在解码时直接缩小，大贴图不需要完整解码
+            image.draft('RGB', (TEXTURE_MAX_SIZE, TEXTURE_MAX_SIZE))
+            image = image.convert('RGB')
+            image.thumbnail((TEXTURE_MAX_SIZE, TEXTURE_MAX_SIZE))
+            return np.asarray(image, dtype=np.uint8)
+    except (OSError, ValueError) as e:
+        log.warning('贴图解码失败', path=path, error=str(e))
+        return None
+
+
+# ---- 光栅化 ----
+
+def _rotation(yaw, pitch):
+    yaw, pitch = math.radians(yaw), math.radians(pitch)
+    ry = np.array([[math.cos(yaw), 0, math.sin(yaw)], [0, 1, 0], [-math.sin(yaw), 0, math.cos(yaw)]])
+    rx = np.array([[1, 0, 0], [0, math.cos(pitch), -math.sin(pitch)], [0, math.sin(pitch), math.cos(pitch)]])
+    return rx @ ry
+
+
+def _plane_coefficients(screen):
+    # 每个三角形上 b1、b2（重心坐标）和深度关于像素坐标 (x, y) 的仿射系数，[F, 9]
+    p0, p1, p2 = screen[:, 0], screen[:, 1], screen[:, 2]
+    e1 = p1 - p0
+    e2 = p2 - p0
+    area = e1[:, 0] * e2[:, 1] - e2[:, 0] * e1[:, 1]
+    inv = 1.0 / area
+    # b1 = ((x - x0) * e2y - (y - y0) * e2x) / area，b2 = ((y - y0) * e1x - (x - x0) * e1y) / area
+    b1x, b1y = e2[:, 1] * inv, -e2[:, 0] * inv
+    b2x, b2y = -e1[:, 1] * inv, e1[:, 0] * inv
+    b1c = -(b1x * p0[:, 0] + b1y * p0[:, 1])
+    b2c = -(b2x * p0[:, 0] + b2y * p0[:, 1])
+    dz1, dz2 = e1[:, 2], e2[:, 2]
+    zx, zy = b1x * dz1 + b2x * dz2, b1y * dz1 + b2y * dz2
+    zc = p0[:, 2] + b1c * dz1 + b2c * dz2
+    return np.stack((b1x, b1y, b1c, b2x, b2y, b2c, zx, zy, zc), axis=1).astype(np.float32)
+
+
+def rasterize(screen, size):
+    # screen: [F, 3, 3] 像素坐标 x、y 和深度（越小越近）。像素中心在 (i + 0.5, j + 0.5)
+    # 返回每个像素的面序号（-1 为背景）和重心坐标 b1、b2
+    x = [np.ascontiguousarray(screen[:, i, 0]) for i in range(3)]
+    y = [np.ascontiguousarray(screen[:, i, 1]) for i in range(3)]
+    x0 = np.maximum(np.ceil(np.minimum(np.minimum(x[0], x[1]), x[2]) - 0.5), 0).astype(np.int32)
+    x1 = np.minimum(np.floor(np.maximum(np.maximum(x[0], x[1]), x[2]) - 0.5), size - 1).astype(np.int32)
+    y0 = np.maximum(np.ceil(np.minimum(np.minimum(y[0], y[1]), y[2]) - 0.5), 0).astype(np.int32)
+    y1 = np.minimum(np.floor(np.maximum(np.maximum(y[0], y[1]), y[2]) - 0.5), size - 1).astype(np.int32)
+    width = x1 - x0 + 1
+    counts = width * (y1 - y0 + 1)
+    area = (x[1] - x[0]) * (y[2] - y[0]) - (x[2] - x[0]) * (y[1] - y[0])
+    # 不覆盖任何像素中心的三角形（大多数细小三角形）不参与后续计算
+    keep = np.flatnonzero((x1 >= x0) & (y1 >= y0) & (np.abs(area) > 1e-9))
+
+    zbuffer = np.full(size * size, np.inf, dtype=np.float32)
+    face = np.full(size * size, -1, dtype=np.int32)
+    bary = np.zeros((size * size, 2), dtype=np.float32)
+    if not len(keep):
+        return face, bary
+    coefficients = _plane_coefficients(screen[keep])
+    counts = counts[keep]
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(keep):
+        # 按候选像素数分批，单个三角形很大时也只占一批
+        stop = max(int(np.searchsorted(ends, (ends[start - 1] if start else 0) + _CANDIDATE_CHUNK, 'right')),
+                   start + 1)
+        local = np.arange(start, stop)
+        n = counts[local]
+        owner = np.repeat(local, n)
+        offset = np.arange(int(n.sum()), dtype=np.int32) - np.repeat(np.cumsum(n) - n, n).astype(np.int32)
+        w = width[keep[owner]]
+        px = x0[keep[owner]] + offset % w
+        py = y0[keep[owner]] + offset // w
+        cx = px.astype(np.float32) + 0.5
+        cy = py.astype(np.float32) + 0.5
+        c = coefficients[owner]
+        b1 = c[:, 0] * cx + c[:, 1] * cy + c[:, 2]
+        b2 = c[:, 3] * cx + c[:, 4] * cy + c[:, 5]
+        inside = (b1 >= 0) & (b2 >= 0) & (b1 + b2 <= 1)
+        depth = (c[inside, 6] * cx[inside] + c[inside, 7] * cy[inside] + c[inside, 8])
+        pixel = py[inside] * size + px[inside]
+        np.minimum.at(zbuffer, pixel, depth)
+        # 深度等于该像素当前最小值的候选胜出；后面批次的更近候选会覆盖前面的结果
+        won = depth == zbuffer[pixel]
+        pixel = pixel[won]
+        face[pixel] = keep[owner[inside][won]]
+        bary[pixel, 0] = b1[inside][won]
+        bary[pixel, 1] = b2[inside][won]
+        start = stop
+    return face, bary
+
+
+def _face_normals(positions, faces):
+    p = positions[faces]
+    e1 = p[:, 1] - p[:, 0]
+    e2 = p[:, 2] - p[:, 0]
+    normals = np.stack((e1[:, 1] * e2[:, 2] - e1[:, 2] * e2[:, 1],
+                        e1[:, 2] * e2[:, 0] - e1[:, 0] * e2[:, 2],
+                        e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]), axis=1)
+    length = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+    return normals / np.maximum(length, 1e-20)[:, None]
+
+
+def _downsample(image, factor):
+    if factor == 1:
+        return image
+    h, w, _ = image.shape
+    return image.reshape(h // factor, factor, w // factor, factor, 3).mean(axis=(1, 3))
+
+
+def render_views(positions, faces, corner_uvs=None, texture=None, color=None, views=VIEWS, size=VIEW_SIZE):
+    # positions: [V, 3]；faces: [F, 3] 顶点序号；corner_uvs: [F, 3, 2] 每个角点的 UV（有贴图时使用）
+    # 返回每个视角的 RGB uint8 图像列表
+    positions = np.asarray(positions, dtype=np.float32)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    base = np.array(color or DEFAULT_COLOR, dtype=np.float32)
+    background = np.array(BACKGROUND, dtype=np.float32)
+    render_size = size * SUPERSAMPLE
+    if not len(faces) or not len(positions):
+        return [np.full((size, size, 3), BACKGROUND, dtype=np.uint8) for _ in views]
+
+    # 按包围球缩放，各视角大小一致且都不会超出画面
+    mask = np.zeros(len(positions), dtype=bool)
+    mask[faces.ravel()] = True
+    used = positions[mask]
+    center = (used.min(axis=0) + used.max(axis=0)) / 2
+    radius = float(np.sqrt(((used - center) ** 2).sum(axis=1).max())) or 1.0
+    scale = render_size * 0.46 / radius
+    normals = _face_normals(positions, faces)
+    sample_texture = texture is not None and corner_uvs is not None
+    if sample_texture:
+        th, tw, _ = texture.shape
+        uv0 = corner_uvs[:, 0]
+        du1 = corner_uvs[:, 1] - uv0
+        du2 = corner_uvs[:, 2] - uv0
+
+    images = []
+    for yaw, pitch in views:
+        rotation = _rotation(yaw, pitch).astype(np.float32)
+        view = (positions - center) @ rotation.T
+        screen = np.empty_like(view)
+        screen[:, 0] = render_size / 2 + view[:, 0] * scale
+        screen[:, 1] = render_size / 2 - view[:, 1] * scale
+        screen[:, 2] = -view[:, 2]
+        face, bary = rasterize(screen[faces], render_size)
+
+        covered = np.flatnonzero(face >= 0)
+        hit = face[covered]
+        # 双面 Lambert：扫描得到的网格朝向常不一致，按法线与光线夹角的绝对值着色
+        shade = AMBIENT + (1 - AMBIENT) * np.abs((normals[hit] @ rotation.T) @ _LIGHT.astype(np.float32))
+        if sample_texture:
+            b = bary[covered]
+            uv = uv0[hit] + b[:, :1] * du1[hit] + b[:, 1:] * du2[hit]
+            # 贴图坐标按重复方式取余，v 轴向上
+            u = ((uv[:, 0] % 1.0) * (tw - 1)).astype(np.int32)
+            v = ((1.0 - uv[:, 1] % 1.0) * (th - 1)).astype(np.int32)
+            albedo = texture[v, u].astype(np.float32) / 255
+        else:
+            albedo = base
+        image = np.empty((render_size * render_size, 3), dtype=np.float32)
+        image[:] = background
+        image[covered] = albedo * shade[:, None] * 255
+        image = _downsample(image.reshape(render_size, render_size, 3), SUPERSAMPLE)
+        images.append(np.clip(image + 0.5, 0, 255).astype(np.uint8))
+    return images
+
+
+def tile(images, columns, size=VIEW_SIZE):
+    # 把若干同样大小的图像按行拼接，空位填背景色
+    rows = max(1, math.ceil(len(images) / columns))
+    canvas = np.empty((rows * size, columns * size, 3), dtype=np.uint8)
+    canvas[:] = BACKGROUND
+    for i, image in enumerate(images):
+        r, c = divmod(i, columns)
+        canvas[r * size:(r + 1) * size, c * size:(c + 1) * size] = image
+    return canvas
+
+
+def model_thumbnail(positions, faces, corner_uvs=None, texture=None, color=None):
+    return tile(render_views(positions, faces, corner_uvs, texture, color), 2)
+
+
+def scene_thumbnail(model_images):
+    # model_images: 各模型缩略图（model_thumbnail 的结果），取其左上角的斜视图拼接
+    views = [image[:VIEW_SIZE, :VIEW_SIZE] for image in model_images[:SCENE_MAX_MODELS]]
+    return tile(views, max(1, math.ceil(math.sqrt(len(views)))))
+
+
+# ---- PNG ----
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+
+def encode_png(image):
+    # 8 位 RGB，每行使用 None 过滤
+    h, w, _ = image.shape
+    raw = np.concatenate((np.zeros((h, 1), dtype=np.uint8), image.reshape(h, w * 3)), axis=1)
+    return (_PNG_SIGNATURE + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0))
+            + _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + _png_chunk(b'IEND', b''))
+
+
+def decode_png(data):
+    # 只解码 encode_png 生成的图像（用于从缓存的模型缩略图拼接场景缩略图）
+    if not data.startswith(_PNG_SIGNATURE):
+        raise ValueError('不是PNG文件')
+    pos, idat, header = len(_PNG_SIGNATURE), [], None
+    while pos < len(data):
+        length, tag = struct.unpack('>I4s', data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if tag == b'IHDR':
+            header = struct.unpack('>IIBBBBB', body)
+        elif tag == b'IDAT':
+            idat.append(body)
+        pos += 12 + length
+    if header is None or header[2:] != (8, 2, 0, 0, 0):
+        raise ValueError('不支持的PNG格式')
+    w, h = header[0], header[1]
+    raw = np.frombuffer(zlib.decompress(b''.join(idat)), dtype=np.uint8).reshape(h, w * 3 + 1)
+    if raw[:, 0].any():
+        raise ValueError('不支持的PNG格式')
+    return raw[:, 1:].reshape(h, w, 3)
@@ -0,0 +1,70 @@
+import os
+import io
+import time
+import zipfile
+import metrics
+
+# 流式生成 ZIP：边读文件边压缩边输出，不在内存中拼出整个压缩包
+
+CHUNK_SIZE = 1024 * 1024
+# 已经压缩过的贴图直接存储，不再 deflate
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+
+class _BufferWriter(io.RawIOBase):
+    # 不可 seek 的输出流，zipfile 会自动改用数据描述符记录 CRC 和大小
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def compress_type_for(arcname):
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE):
+    # entries 为 [(文件路径, 压缩包内路径)]，逐块产出 ZIP 数据；文件路径也可以是 bytes（内存中的小文件，如场景数据）
+    out = _BufferWriter()
+    with zipfile.ZipFile(out, 'w') as zf:
+        for path, arcname in entries:
+            if isinstance(path, bytes):
+                info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+                info.compress_type = compress_type_for(arcname)
+                info.external_attr = 0o644 << 16
+                zf.writestr(info, path)
+                if out.buffer:
+                    yield out.drain()
+                continue
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = compress_type_for(arcname)
+            # 每个条目累计读取与压缩写入的耗时（不含等待客户端接收的时间）
+            seconds = 0.0
+            with open(path, 'rb') as src, zf.open(info, 'w') as dst:
+                while True:
+                    start = time.perf_counter()
+                    chunk = src.read(chunk_size)
+                    if chunk:
+                        dst.write(chunk)
+                    seconds += time.perf_counter() - start
+                    if not chunk:
+                        break
+                    if out.buffer:
+                        yield out.drain()
+            metrics.FS_SECONDS.observe(seconds, ('zip_write',))
+            if out.buffer:
+                yield out.drain()
+    # 中央目录
+    yield out.drain()